@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CineHub.settings')
+# Serve the async-native catalogue views (see movies/async_views.py).
+os.environ.setdefault('CINEHUB_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,9 +55,17 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'CineHub.urls'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Route catalogue pages to the async-native views; CineHub/asgi.py turns
+# this on so ASGI workers never block a thread on the ORM.
+ASYNC_VIEWS = os.environ.get('CINEHUB_ASYNC_VIEWS', '') == '1'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for sampled requests (core/instrumentation.py).
+        'BACKEND': 'core.instrumentation.InstrumentedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,13 +85,148 @@ WSGI_APPLICATION = 'CineHub.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite tuned for concurrent readers and writers. Each new connection runs:
+# - journal_mode=WAL, so readers keep reading while one writer commits;
+# - busy_timeout, so a blocked writer waits for the lock instead of failing
+#   at once with "database is locked";
+# - synchronous=NORMAL, which is durable in WAL mode and saves an fsync per
+#   transaction;
+# - mmap_size, cache_size and temp_store, which keep hot pages in memory.
+# IMMEDIATE transactions take the write lock when they begin: a deferred one
+# that reads and then writes cannot wait on the busy timeout. Persistent
+# connections run the pragmas once per worker thread rather than per request.
+# `manage.py benchmark_sqlite` compares this with the stock settings.
+SQLITE_TUNING = {
+    'OPTIONS': {
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA busy_timeout=5000;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=268435456;'
+            'PRAGMA cache_size=-65536;'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+    },
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **SQLITE_TUNING,
     }
 }
 
+# Read replicas (see core/replicas.py): catalogue and pricing reads go to one
+# of DATABASE_REPLICAS, writes and everything else to 'default'. Point
+# CINEHUB_REPLICA_DATABASE at a second SQLite file to try it locally and
+# refresh it from the primary with `manage.py sync_replica`.
+if os.environ.get('CINEHUB_REPLICA_DATABASE'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['CINEHUB_REPLICA_DATABASE'],
+        **SQLITE_TUNING,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+if DATABASE_REPLICAS:
+    # Without a replica every query goes to 'default' anyway, so the router
+    # and the per-request pinning (right after instrumentation) are skipped.
+    DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'core.replicas.ReplicaPinningMiddleware')
+REPLICA_READ_APPS = ('movies', 'payments')
+# Clients are kept on the primary this long after their last write.
+REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The cache must be shared by every worker process: the catalogue, plans and
+# popularity version counters live in it, and a bump in one process has to
+# invalidate the entries cached by all the others. A per-process cache
+# (LocMemCache) would keep the other workers stale until their entries
+# expire. By default every process on this host shares a file-based cache
+# under BASE_DIR (or CINEHUB_CACHE_DIR); set CINEHUB_REDIS_URL when workers
+# run on several hosts. MAX_ENTRIES is sized for the per-filter search and
+# facet entries: past it the file cache culls a random third of its files,
+# version keys included, which invalidates the whole site at once.
+if os.environ.get('CINEHUB_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CINEHUB_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CINEHUB_CACHE_DIR', BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        }
+    }
+
+# Catalogue caches are versioned and invalidated by signals, so these are
+# only upper bounds on how long an unused entry lingers.
+HOME_CACHE_TIMEOUT = 60 * 60
+FACET_CACHE_TIMEOUT = 60 * 60
+SEARCH_CACHE_TIMEOUT = 60 * 60
+# Search listings cache the ordered ids of their first rows (10 pages).
+SEARCH_RESULT_CACHE_SIZE = 240
+PLANS_CACHE_TIMEOUT = 60 * 60
+
+# Download events are buffered in memory and written in batches by a
+# background thread (see core/tracking.py).
+DOWNLOAD_TRACKING_BATCH_SIZE = 200
+DOWNLOAD_TRACKING_FLUSH_INTERVAL = 5.0
+
+# Popularity hits (views, downloads, favourites) are counted in memory and
+# folded into MoviePopularity every interval or once the threshold is hit.
+POPULARITY_FLUSH_INTERVAL = 60.0
+POPULARITY_FLUSH_THRESHOLD = 5000
+POPULARITY_HALF_LIFE = 3 * 24 * 60 * 60
+
+# Related-movie rankings of changed movies are refreshed by a background
+# worker after commit (see movies/related.py); a cascade reaches at most this
+# many other movies, the rest catch up on `manage.py rebuild_related_movies`.
+RELATED_CASCADE_LIMIT = 500
+
+# Search box typeahead (see movies/autocomplete.py): an in-process prefix
+# index, rebuilt in the background after catalogue or popularity changes.
+AUTOCOMPLETE_MAX_SUGGESTIONS = 10
+AUTOCOMPLETE_BACKGROUND = True
+
+# Avatars (see core/avatars.py): uploads are capped, then re-encoded into
+# square WebP/JPEG thumbnails by a background worker.
+AVATAR_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000
+AVATAR_SIZES = (48, 96, 160, 320)
+AVATAR_DISPLAY_SIZE = 160
+
+# Request instrumentation (see core/instrumentation.py): the share of requests
+# whose query count, SQL/template time and size are recorded, exposed as a
+# Server-Timing header and on /metrics/ for Prometheus.
+INSTRUMENTATION_SAMPLE_RATE = 0.05
+INSTRUMENTATION_SERVER_TIMING = True
+INSTRUMENTATION_METRICS_TOKEN = ''
+
+# Bearer token for partners pulling /catalogue/export.ndjson (staff can too).
+CATALOGUE_EXPORT_TOKEN = ''
+
+
+# Authentication
+# AccountBackend joins the profile, subscription and plans into the session
+# user lookup (see core/accounts.py).
+
+AUTHENTICATION_BACKENDS = [
+    'core.accounts.AccountBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -123,6 +268,19 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed, minified copies with .gz/.br siblings.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+# Link unhashed source files while collectstatic has not run. This is always
+# allowed with DEBUG; otherwise a missing manifest entry is an error.
+# core.test_runner turns it on for the test suite.
+STATIC_MANIFEST_OPTIONAL = False
+# Serve STATIC_ROOT from the app itself (precompressed, immutable caching)
+# when no front-end server does it.
+SERVE_STATIC = os.environ.get('CINEHUB_SERVE_STATIC', '') == '1'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
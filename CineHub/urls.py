@@ -1,14 +1,23 @@
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core import staticfiles
+from core.views import MetricsView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("movies.urls")),
     path("accounts/", include("core.urls")),
     path("payments/", include("payments.urls")),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.SERVE_STATIC:
+    urlpatterns.insert(0, re_path(r"^%s(?P<path>.*)$" % re.escape(settings.STATIC_URL.lstrip("/")), staticfiles.serve))
@@ -0,0 +1,92 @@
+"""Request-scoped loading of a user's profile, subscription and plan.
+
+``AccountBackend`` loads the session user together with its ``UserProfile``,
+``Subscription`` and both plans in a single joined query, so account pages
+read everything from ``request.user`` without further SELECTs. The rows
+themselves are created exactly once, by ``create_account_rows`` from the
+``post_save`` signal on new users (and a data migration for older ones).
+Views call :func:`get_account` on GET, which never writes, and
+:func:`ensure_account` right before a POST needs the rows to exist.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+
+from payments.models import Subscription
+
+from .models import UserProfile
+
+ACCOUNT_RELATED = ("profile", "profile__current_plan", "subscription", "subscription__plan")
+
+
+class AccountBackend(ModelBackend):
+    """ModelBackend whose session lookup also joins the account rows.
+
+    ``ModelBackend`` stays listed after it only so sessions created before
+    this backend existed keep working; a failed password check stops here
+    instead of hashing the password a second time.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related(*ACCOUNT_RELATED).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+@dataclass
+class Account:
+    user: object
+    profile: UserProfile
+    subscription: Subscription
+
+
+def _related(user, name):
+    try:
+        return getattr(user, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+def get_account(user) -> Account:
+    """Return the user's account rows without writing.
+
+    Missing rows are represented by unsaved defaults so a GET can still
+    render; :func:`ensure_account` persists them.
+    """
+    # Assign user_id rather than user so the placeholders are not cached on
+    # the user and saved by the profile signal later on.
+    profile = _related(user, "profile") or UserProfile(user_id=user.pk)
+    subscription = _related(user, "subscription") or Subscription(user_id=user.pk)
+    return Account(user, profile, subscription)
+
+
+def create_account_rows(user) -> Account:
+    """Create the profile and subscription rows of a brand-new user."""
+    user.profile = UserProfile.objects.create(user=user)
+    user.subscription = Subscription.objects.create(user=user)
+    return Account(user, user.profile, user.subscription)
+
+
+def ensure_account(user) -> Account:
+    """Return the account, creating any row an older user is still missing."""
+    account = get_account(user)
+    if account.profile.pk is None:
+        account.profile, _ = UserProfile.objects.get_or_create(user=user)
+        user.profile = account.profile
+    if account.subscription.pk is None:
+        account.subscription, _ = Subscription.objects.get_or_create(user=user)
+        user.subscription = account.subscription
+    return account
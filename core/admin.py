@@ -12,7 +12,7 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(DownloadHistory)
 class DownloadHistoryAdmin(admin.ModelAdmin):
-    list_display = ("user", "movie", "downloaded_at", "quality")
+    list_display = ("user", "movie", "downloaded_at", "quality", "server")
     list_filter = ("quality", "downloaded_at")
     search_fields = ("user__username", "movie__title")
 
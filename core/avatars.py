@@ -0,0 +1,210 @@
+"""Avatar upload validation and background thumbnail rendering.
+
+``ProfileForm`` validates uploads with :func:`validate_avatar` (file size,
+pixel count and format) before anything is written. Once a profile with a
+new avatar is committed, its id is handed to :data:`processor`, a
+write-behind worker that renders square WebP and JPEG thumbnails for every
+``AVATAR_SIZES`` entry. The image is rotated by its EXIF orientation and
+re-encoded without metadata. The uploaded original is then replaced by the
+largest JPEG, so camera EXIF (GPS position included) never stays in
+``MEDIA_ROOT``. Templates read the variants through
+:attr:`UserProfile.avatar_image <core.models.UserProfile.avatar_image>`.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .tracking import BUFFERS, WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+# Encoder name, file extension and save options per output format.
+OUTPUT_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+def avatar_sizes() -> tuple[int, ...]:
+    return tuple(sorted(getattr(settings, "AVATAR_SIZES", (48, 96, 160, 320))))
+
+
+def validate_avatar(upload) -> None:
+    """Reject uploads that are too large, too many pixels or not an image."""
+    max_bytes = getattr(settings, "AVATAR_MAX_UPLOAD_SIZE", 10 * 1024 * 1024)
+    if upload.size > max_bytes:
+        raise ValidationError(f"Avatars must be smaller than {max_bytes // (1024 * 1024)} MB.")
+    max_pixels = getattr(settings, "AVATAR_MAX_PIXELS", 40_000_000)
+    position = upload.tell()
+    try:
+        # Only the header is parsed; no pixels are decoded here.
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ValidationError("Upload a valid JPEG, PNG, WebP or GIF image.") from exc
+    finally:
+        upload.seek(position)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError("Upload a valid JPEG, PNG, WebP or GIF image.")
+    if width * height > max_pixels:
+        raise ValidationError(f"Avatars may have at most {max_pixels // 1_000_000} megapixels.")
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_thumbnails(source, sizes: tuple[int, ...]) -> dict[int, dict[str, bytes]]:
+    """Encode ``source`` as square thumbnails: ``{size: {"webp": ..., "jpeg": ...}}``."""
+    with Image.open(source) as image:
+        # JPEGs decode straight at a reduced scale, so a 12 MP phone photo
+        # never has to be held in memory at full resolution.
+        image.draft("RGB", (max(sizes) * 2, max(sizes) * 2))
+        image = _flatten(ImageOps.exif_transpose(image))
+    rendered = {}
+    for size in sizes:
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        rendered[size] = {}
+        for key, (encoder, _, options) in OUTPUT_FORMATS.items():
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, encoder, **options)
+            rendered[size][key] = buffer.getvalue()
+    return rendered
+
+
+def thumbnail_names(user_id: int, token: str, size: int) -> dict[str, str]:
+    return {key: f"avatars/{user_id}/{token}-{size}.{extension}" for key, (_, extension, _) in OUTPUT_FORMATS.items()}
+
+
+def _delete_files(names) -> None:
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete avatar file %s", name)
+
+
+def _variant_files(thumbnails: dict) -> list[str]:
+    return [name for variants in thumbnails.get("sizes", {}).values() for name in variants.values()]
+
+
+def needs_processing(profile) -> bool:
+    return (profile.avatar.name or "") != profile.avatar_thumbnails.get("source", "")
+
+
+def process_avatar(profile_id: int) -> bool:
+    """Render thumbnails for the profile's current avatar; True if it changed."""
+    from .models import UserProfile
+
+    profile = UserProfile.objects.filter(pk=profile_id).only("user_id", "avatar", "avatar_thumbnails").first()
+    if profile is None or not needs_processing(profile):
+        return False
+    original = profile.avatar.name or ""
+    stale = _variant_files(profile.avatar_thumbnails)
+
+    thumbnails, written = {}, []
+    if original:
+        sizes = avatar_sizes()
+        try:
+            with default_storage.open(original, "rb") as source:
+                rendered = render_thumbnails(source, sizes)
+        except (FileNotFoundError, UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            logger.warning("Could not process avatar %s of profile %s", original, profile_id, exc_info=True)
+            return False
+        token = uuid.uuid4().hex[:12]
+        variants = {}
+        for size, encoded in rendered.items():
+            names = thumbnail_names(profile.user_id, token, size)
+            variants[str(size)] = {
+                key: default_storage.save(names[key], ContentFile(encoded[key])) for key in names
+            }
+            written.extend(variants[str(size)].values())
+        # The largest sanitized JPEG stands in for the original upload.
+        cleaned = variants[str(sizes[-1])]["jpeg"]
+        thumbnails = {"source": cleaned, "sizes": variants}
+    else:
+        cleaned = ""
+
+    # Only commit if the user has not uploaded yet another avatar meanwhile.
+    current = Q(avatar=original) if original else Q(avatar="") | Q(avatar__isnull=True)
+    updated = UserProfile.objects.filter(current, pk=profile_id).update(avatar=cleaned, avatar_thumbnails=thumbnails)
+    if not updated:
+        _delete_files(written)
+        return False
+    _delete_files([*stale, original] if original else stale)
+    return True
+
+
+class AvatarProcessor(WriteBehindBuffer):
+    """Renders avatar thumbnails off the request thread, one profile at a time."""
+
+    batch_size_setting = "AVATAR_PROCESSING_BATCH_SIZE"
+    flush_interval_setting = "AVATAR_PROCESSING_FLUSH_INTERVAL"
+    background_setting = "AVATAR_PROCESSING_BACKGROUND"
+    default_batch_size = 1
+
+    def __init__(self):
+        super().__init__()
+        self._pending: set[int] = set()
+
+    def add(self, profile_id: int) -> int:
+        self._pending.add(profile_id)
+        return len(self._pending)
+
+    def drain(self) -> list[int]:
+        pending, self._pending = self._pending, set()
+        return sorted(pending)
+
+    def write(self, profile_ids: list[int]) -> int:
+        return sum(process_avatar(profile_id) for profile_id in profile_ids)
+
+
+processor = AvatarProcessor()
+BUFFERS.append(processor)
+
+
+@dataclass(frozen=True)
+class AvatarImage:
+    """URLs of one avatar's thumbnails, for ``<picture>``/``srcset`` markup."""
+
+    variants: dict
+
+    def url(self, size: int, key: str = "jpeg") -> str:
+        # The smallest variant at least ``size`` wide, else the largest.
+        sizes = sorted(int(value) for value in self.variants)
+        chosen = next((value for value in sizes if value >= size), sizes[-1])
+        return default_storage.url(self.variants[str(chosen)][key])
+
+    def srcset(self, key: str) -> str:
+        return ", ".join(
+            f"{default_storage.url(names[key])} {size}w"
+            for size, names in sorted(self.variants.items(), key=lambda item: int(item[0]))
+        )
+
+    @property
+    def src(self) -> str:
+        return self.url(getattr(settings, "AVATAR_DISPLAY_SIZE", 160))
+
+    @property
+    def webp_srcset(self) -> str:
+        return self.srcset("webp")
+
+    @property
+    def jpeg_srcset(self) -> str:
+        return self.srcset("jpeg")
@@ -0,0 +1,167 @@
+"""Concurrent read/write benchmark for the SQLite connection settings.
+
+``run_sqlite_benchmark`` seeds a scratch SQLite file per mode and lets
+``threads`` workers replay a mix of page reads and comment posts against it
+for ``seconds``. Each operation is one "request": it reads the movie, or it
+reads the movie's comment count and inserts a comment in one transaction,
+like ``movie_detail`` does. After each request the worker calls
+``close_if_unusable_or_obsolete()``, as Django's request_finished handler
+does. So ``CONN_MAX_AGE`` decides whether the next request reconnects.
+
+* ``stock``: Django's sqlite3 backend, rollback journal, deferred
+  transactions, a new connection per request (``CONN_MAX_AGE=0``).
+* ``tuned``: the project's ``SQLITE_TUNING``: WAL and the other pragmas run
+  by ``init_command``, ``BEGIN IMMEDIATE`` and persistent connections.
+
+``manage.py benchmark_sqlite`` prints the results as JSON.
+"""
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.utils import load_backend
+
+SQLITE_MODES = {
+    "stock": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "OPTIONS": {},
+        "CONN_MAX_AGE": 0,
+    },
+    "tuned": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "OPTIONS": settings.SQLITE_TUNING["OPTIONS"],
+        "CONN_MAX_AGE": None,
+    },
+}
+
+SCHEMA = (
+    "CREATE TABLE movie (id INTEGER PRIMARY KEY, title TEXT NOT NULL, comment_count INTEGER NOT NULL)",
+    "CREATE TABLE comment (id INTEGER PRIMARY KEY AUTOINCREMENT, movie_id INTEGER NOT NULL, body TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE INDEX comment_movie_idx ON comment (movie_id, created_at)",
+)
+
+
+def seed_database(path: str, movies: int) -> None:
+    with sqlite3.connect(path) as db:
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.executemany(
+            "INSERT INTO movie (id, title, comment_count) VALUES (?, ?, 0)",
+            ((index, f"Movie {index}") for index in range(1, movies + 1)),
+        )
+    db.close()
+
+
+def _wrapper(mode: str, path: str):
+    # configure_settings() fills in every key a DatabaseWrapper expects.
+    settings_dict = connections.configure_settings({"default": {**SQLITE_MODES[mode], "NAME": path}})["default"]
+    return load_backend(settings_dict["ENGINE"]).DatabaseWrapper(settings_dict, f"sqlite-benchmark-{mode}")
+
+
+def _read(wrapper, movie_id: int) -> None:
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT id, title, comment_count FROM movie WHERE id = %s", [movie_id])
+        cursor.fetchone()
+        cursor.execute(
+            "SELECT id, body FROM comment WHERE movie_id = %s ORDER BY created_at DESC LIMIT 10", [movie_id]
+        )
+        cursor.fetchall()
+
+
+def _write(wrapper, movie_id: int) -> None:
+    with wrapper.cursor() as cursor:
+        # Set from OPTIONS once the connection is open.
+        mode = wrapper.transaction_mode
+        cursor.execute(f"BEGIN {mode}" if mode else "BEGIN")
+        try:
+            cursor.execute("SELECT comment_count FROM movie WHERE id = %s", [movie_id])
+            cursor.fetchone()
+            cursor.execute(
+                "INSERT INTO comment (movie_id, body, created_at) VALUES (%s, %s, %s)",
+                [movie_id, "Benchmark comment", time.time()],
+            )
+            cursor.execute("UPDATE movie SET comment_count = comment_count + 1 WHERE id = %s", [movie_id])
+            cursor.execute("COMMIT")
+        except DatabaseError:
+            if not wrapper.connection.in_transaction:
+                raise
+            cursor.execute("ROLLBACK")
+            raise
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] * 1000, 3)
+
+
+def run_mode(mode: str, path: str, threads: int, seconds: float, write_ratio: float, movies: int) -> dict:
+    samples = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        wrapper = _wrapper(mode, path)
+        local = {"read": [], "write": []}
+        failed = {"read": 0, "write": 0}
+        try:
+            while time.perf_counter() < deadline:
+                kind = "write" if rng.random() < write_ratio else "read"
+                started = time.perf_counter()
+                try:
+                    (_write if kind == "write" else _read)(wrapper, rng.randint(1, movies))
+                    local[kind].append(time.perf_counter() - started)
+                except DatabaseError:
+                    failed[kind] += 1
+                wrapper.close_if_unusable_or_obsolete()
+        finally:
+            wrapper.close()
+        with lock:
+            for kind in samples:
+                samples[kind].extend(local[kind])
+                errors[kind] += failed[kind]
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    result = {"mode": mode}
+    for kind in ("read", "write"):
+        latencies = samples[kind]
+        result[kind] = {
+            "completed": len(latencies),
+            "errors": errors[kind],
+            "per_second": round(len(latencies) / seconds, 1),
+            "latency_ms_median": round(statistics.median(latencies) * 1000, 3) if latencies else 0.0,
+            "latency_ms_p95": _percentile(latencies, 0.95),
+        }
+    return result
+
+
+def run_sqlite_benchmark(
+    threads: int = 16,
+    seconds: float = 5.0,
+    write_ratio: float = 0.2,
+    movies: int = 1000,
+    modes: tuple[str, ...] = tuple(SQLITE_MODES),
+) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in modes:
+            path = os.path.join(directory, f"{mode}.sqlite3")
+            seed_database(path, movies)
+            results.append(run_mode(mode, path, threads, seconds, write_ratio, movies))
+    return results
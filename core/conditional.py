@@ -0,0 +1,52 @@
+"""Conditional GET helpers for pages whose content has a cheap version.
+
+Views compute an ETag from versions they already track (catalogue and
+popularity versions, the plans version, a movie's ``updated_at`` ...) before
+running their heavy queries, and answer ``If-None-Match`` /
+``If-Modified-Since`` with a 304 when nothing changed. The viewer is part of
+every ETag because the header renders login state, and pages carrying flash
+messages are never answered conditionally.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def page_etag(request, *parts) -> str | None:
+    """Quoted ETag for ``parts`` as seen by this viewer, or None to skip."""
+    if request.method not in SAFE_METHODS or len(get_messages(request)):
+        return None
+    viewer = request.user.pk if request.user.is_authenticated else "anonymous"
+    digest = hashlib.md5(repr((viewer, *parts)).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+
+def _last_modified(request, last_modified: datetime | None) -> int | None:
+    # A timestamp cannot express a login, so only anonymous pages get one.
+    if last_modified is None or request.user.is_authenticated:
+        return None
+    return int(last_modified.timestamp())
+
+
+def conditional_response(request, etag: str | None, last_modified: datetime | None = None):
+    """Return a 304/412 response if the client's copy is current, else None."""
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag, last_modified=_last_modified(request, last_modified))
+
+
+def set_validators(request, response, etag: str | None, last_modified: datetime | None = None):
+    if etag is None or response.status_code != 200:
+        return response
+    response.headers.setdefault("ETag", etag)
+    timestamp = _last_modified(request, last_modified)
+    if timestamp is not None:
+        response.headers.setdefault("Last-Modified", http_date(timestamp))
+    return response
@@ -1,14 +1,53 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm, UserCreationForm
+from django.core.files.uploadedfile import UploadedFile
 
+from payments.cache import get_plan_catalogue
 from payments.models import Plan
 
+from .avatars import validate_avatar
 from .models import UserProfile
 
 User = get_user_model()
 
 
+class CachedPlanChoiceIterator(forms.models.ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for plan in get_plan_catalogue().plans:
+            yield self.choice(plan)
+
+    def __len__(self):
+        return len(get_plan_catalogue().plans) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(get_plan_catalogue().plans)
+
+
+class PlanChoiceField(forms.ModelChoiceField):
+    """Active-plan choice field that renders and validates from the plan cache."""
+
+    iterator = CachedPlanChoiceIterator
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Plan.objects.filter(is_active=True))
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        plan = get_plan_catalogue().get_plan(value)
+        if plan is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return plan
+
+
 class SignUpForm(UserCreationForm):
     full_name = forms.CharField(
         max_length=150,
@@ -94,6 +133,12 @@ class UserDetailsForm(forms.ModelForm):
 
 
 class ProfileForm(forms.ModelForm):
+    current_plan = PlanChoiceField(
+        required=False,
+        empty_label="Select a plan",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
     class Meta:
         model = UserProfile
         fields = (
@@ -111,17 +156,16 @@ class ProfileForm(forms.ModelForm):
                 attrs={"class": "form-control", "rows": 3, "placeholder": "Tell us about yourself"}
             ),
             "avatar": forms.ClearableFileInput(attrs={"class": "form-control"}),
-            "current_plan": forms.Select(attrs={"class": "form-select"}),
             "email_notifications": forms.CheckboxInput(attrs={"class": "form-check-input"}),
             "sms_notifications": forms.CheckboxInput(attrs={"class": "form-check-input"}),
             "promo_notifications": forms.CheckboxInput(attrs={"class": "form-check-input"}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields["current_plan"].queryset = Plan.objects.filter(is_active=True)
-        self.fields["current_plan"].required = False
-        self.fields["current_plan"].empty_label = "Select a plan"
+    def clean_avatar(self):
+        avatar = self.cleaned_data.get("avatar")
+        if isinstance(avatar, UploadedFile):
+            validate_avatar(avatar)
+        return avatar
 
 
 class PasswordUpdateForm(PasswordChangeForm):
@@ -135,17 +179,12 @@ class PasswordUpdateForm(PasswordChangeForm):
 
 
 class PlanSelectionForm(forms.Form):
-    plan = forms.ModelChoiceField(
-        queryset=Plan.objects.none(),
+    plan = PlanChoiceField(
         empty_label="Select a plan",
         widget=forms.Select(attrs={"class": "form-select"}),
         required=False,
     )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields["plan"].queryset = Plan.objects.filter(is_active=True)
-
 
 class AccountDeleteForm(forms.Form):
     confirmation = forms.CharField(
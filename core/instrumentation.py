@@ -0,0 +1,305 @@
+"""Sampled per-request instrumentation exposed as Server-Timing and Prometheus text.
+
+:class:`InstrumentationMiddleware` picks ``INSTRUMENTATION_SAMPLE_RATE`` of
+requests (0.0 disables it, 1.0 records everything). For a sampled request it
+counts SQL queries and their duration on every configured database, the time
+spent rendering templates (through the :class:`InstrumentedDjangoTemplates`
+backend) and the response size, adds a ``Server-Timing`` header and folds the
+numbers into :data:`registry`, which ``/metrics/`` renders in the Prometheus
+text exposition format. Requests that are not
+sampled only pay for one ``random()`` call and a context-variable lookup per
+query.
+
+Metrics are kept per process; each worker exposes its own counters, which is
+what Prometheus expects when scraping several targets.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, reraise
+from django.template.backends.django import Template as DjangoTemplate
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNRESOLVED_VIEW = "<unresolved>"
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    sql_seconds: float = 0.0
+    template_seconds: float = 0.0
+    template_depth: int = 0
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("cinehub_request_metrics", default=None)
+
+
+@dataclass
+class ViewStats:
+    requests: int = 0
+    queries: int = 0
+    sql_seconds: float = 0.0
+    template_seconds: float = 0.0
+    response_bytes: int = 0
+    seconds: float = 0.0
+    buckets: list = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+
+
+class MetricsRegistry:
+    """Thread-safe per-view aggregates of sampled requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: dict[tuple[str, str, int], ViewStats] = {}
+
+    def observe(self, view: str, method: str, status: int, metrics: RequestMetrics, seconds: float, size: int):
+        bucket = bisect_left(DURATION_BUCKETS, seconds)
+        with self._lock:
+            stats = self._views.setdefault((view, method, status), ViewStats())
+            stats.requests += 1
+            stats.queries += metrics.queries
+            stats.sql_seconds += metrics.sql_seconds
+            stats.template_seconds += metrics.template_seconds
+            stats.response_bytes += size
+            stats.seconds += seconds
+            if bucket < len(DURATION_BUCKETS):
+                stats.buckets[bucket] += 1
+
+    def snapshot(self) -> dict[tuple[str, str, int], ViewStats]:
+        with self._lock:
+            return {
+                key: ViewStats(
+                    stats.requests,
+                    stats.queries,
+                    stats.sql_seconds,
+                    stats.template_seconds,
+                    stats.response_bytes,
+                    stats.seconds,
+                    list(stats.buckets),
+                )
+                for key, stats in self._views.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def render(self) -> str:
+        """Return every aggregate in the Prometheus text exposition format."""
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, value_of):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, stats in snapshot:
+                lines.append(f"{name}{{{_labels(*key)}}} {_number(value_of(stats))}")
+
+        family("cinehub_requests_sampled_total", "counter", "Sampled requests.", lambda s: s.requests)
+        family("cinehub_db_queries_total", "counter", "SQL queries run by sampled requests.", lambda s: s.queries)
+        family("cinehub_db_seconds_total", "counter", "Time spent in SQL by sampled requests.", lambda s: s.sql_seconds)
+        family(
+            "cinehub_template_seconds_total",
+            "counter",
+            "Time spent rendering templates in sampled requests.",
+            lambda s: s.template_seconds,
+        )
+        family(
+            "cinehub_response_bytes_total",
+            "counter",
+            "Response body bytes of sampled requests.",
+            lambda s: s.response_bytes,
+        )
+
+        name = "cinehub_request_duration_seconds"
+        lines.append(f"# HELP {name} Wall time of sampled requests.")
+        lines.append(f"# TYPE {name} histogram")
+        for key, stats in snapshot:
+            labels = _labels(*key)
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {stats.requests}')
+            lines.append(f"{name}_sum{{{labels}}} {_number(stats.seconds)}")
+            lines.append(f"{name}_count{{{labels}}} {stats.requests}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(view: str, method: str, status: int) -> str:
+    return f'view="{_escape(view)}",method="{_escape(method)}",status="{status}"'
+
+
+def _number(value) -> str:
+    return str(value) if isinstance(value, int) else repr(round(value, 6))
+
+
+def _count_query(execute, sql, params, many, context):
+    # Installed permanently on every connection; only sampled requests (which
+    # set the context variable, also across sync_to_async) are measured.
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_seconds += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def _install(connection) -> None:
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def _install_on_thread_connections() -> None:
+    # Connections opened before this module was imported missed the signal.
+    for connection in connections.all():
+        _install(connection)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Only the outermost render counts; render_to_string inside a tag nests.
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with rendering timed for sampled requests.
+
+    Selected as the ``BACKEND`` in ``TEMPLATES``.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def _view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    return match.view_name or f"{match.func.__module__}.{match.func.__qualname__}"
+
+
+def _response_size(response) -> int:
+    if response.streaming:
+        return int(response.get("Content-Length") or 0)
+    return len(response.content)
+
+
+def server_timing(metrics: RequestMetrics, seconds: float) -> str:
+    app_seconds = max(seconds - metrics.sql_seconds - metrics.template_seconds, 0.0)
+    return ", ".join(
+        (
+            f'db;dur={metrics.sql_seconds * 1000:.2f};desc="{metrics.queries} queries"',
+            f"tpl;dur={metrics.template_seconds * 1000:.2f}",
+            f"app;dur={app_seconds * 1000:.2f}",
+            f"total;dur={seconds * 1000:.2f}",
+        )
+    )
+
+
+class InstrumentationMiddleware:
+    """Record query count, SQL time, template time and size for sampled requests.
+
+    Keep it first in ``MIDDLEWARE`` so session and auth queries are included.
+    Works under WSGI and ASGI alike.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _sampled() -> bool:
+        rate = getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 0.0)
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        _install_on_thread_connections()
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        await sync_to_async(_install_on_thread_connections)()
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - started)
+
+    def _finish(self, request, response, metrics: RequestMetrics, seconds: float):
+        registry.observe(
+            _view_name(request),
+            request.method,
+            response.status_code,
+            metrics,
+            seconds,
+            _response_size(response),
+        )
+        if getattr(settings, "INSTRUMENTATION_SERVER_TIMING", True):
+            response["Server-Timing"] = server_timing(metrics, seconds)
+        return response
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import SQLITE_MODES, run_sqlite_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare read/write throughput of the stock and tuned SQLite connection settings "
+        "under concurrent page reads and comment posts, as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Concurrent workers (default: 16).")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration per mode (default: 5).")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of writes (default: 0.2).")
+        parser.add_argument("--movies", type=int, default=1000, help="Seeded movie rows (default: 1000).")
+        parser.add_argument("--mode", action="append", choices=sorted(SQLITE_MODES), help="Only run these modes.")
+
+    def handle(self, *args, **options):
+        results = run_sqlite_benchmark(
+            threads=options["threads"],
+            seconds=options["seconds"],
+            write_ratio=options["write_ratio"],
+            movies=options["movies"],
+            modes=tuple(options["mode"] or SQLITE_MODES),
+        )
+        self.stdout.write(json.dumps({"threads": options["threads"], "results": results}, indent=2))
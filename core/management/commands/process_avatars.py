@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.avatars import needs_processing, process_avatar
+from core.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails for avatars uploaded before the avatar pipeline, replacing the originals."
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.exclude(avatar="").exclude(avatar__isnull=True).only("avatar", "avatar_thumbnails")
+        pending = [profile.pk for profile in profiles.iterator() if needs_processing(profile)]
+        processed = sum(process_avatar(profile_id) for profile_id in pending)
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} of {len(pending)} avatars."))
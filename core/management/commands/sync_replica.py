@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.replicas import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into a local SQLite replica, standing in for replication."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--replica", default="replica", help="Alias of the replica to refresh (default: replica).")
+
+    def handle(self, *args, **options):
+        alias = options["replica"]
+        if alias not in settings.DATABASE_REPLICAS:
+            raise CommandError(f"{alias!r} is not a configured replica; set CINEHUB_REPLICA_DATABASE.")
+        if any(connections[name].vendor != "sqlite" for name in (DEFAULT_DB_ALIAS, alias)):
+            raise CommandError("sync_replica only copies SQLite files; use real replication elsewhere.")
+        databases = [settings.DATABASES[DEFAULT_DB_ALIAS], settings.DATABASES[alias]]
+        copy_sqlite_database(str(databases[0]["NAME"]), str(databases[1]["NAME"]))
+        self.stdout.write(self.style.SUCCESS(f"Copied {databases[0]['NAME']} to {databases[1]['NAME']}."))
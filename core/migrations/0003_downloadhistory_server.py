@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_downloadhistory_favoritemovie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadhistory',
+            name='server',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
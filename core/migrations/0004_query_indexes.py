@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_downloadhistory_server'),
+        ('movies', '0008_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='downloadhistory',
+            index=models.Index(fields=['user', '-downloaded_at'], name='core_download_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favoritemovie',
+            index=models.Index(fields=['user', '-created_at'], name='core_favorite_user_idx'),
+        ),
+    ]
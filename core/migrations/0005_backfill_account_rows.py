@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_account_rows(apps, schema_editor):
+    app_label, model_name = settings.AUTH_USER_MODEL.split('.')
+    User = apps.get_model(app_label, model_name)
+    UserProfile = apps.get_model('core', 'UserProfile')
+    Subscription = apps.get_model('payments', 'Subscription')
+
+    missing_profiles = User.objects.filter(profile__isnull=True).values_list('pk', flat=True)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=pk) for pk in missing_profiles.iterator()], batch_size=1000
+    )
+    missing_subscriptions = User.objects.filter(subscription__isnull=True).values_list('pk', flat=True)
+    Subscription.objects.bulk_create(
+        [Subscription(user_id=pk) for pk in missing_subscriptions.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_query_indexes'),
+        ('payments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_account_rows, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import copy
+
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
@@ -9,6 +11,11 @@ def user_avatar_upload_path(instance, filename):
     return f"avatars/{instance.user_id}/{filename}"
 
 
+def _frozen(value):
+    # JSON values are edited in place, so the snapshot needs its own copy.
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
 class UserProfile(models.Model):
     """Additional information stored for each user."""
 
@@ -18,6 +25,8 @@ class UserProfile(models.Model):
     phone_number = models.CharField(max_length=20, blank=True)
     bio = models.TextField(blank=True)
     avatar = models.ImageField(upload_to=user_avatar_upload_path, blank=True, null=True)
+    # Rendered by core.avatars: {"source": avatar name, "sizes": {size: {format: name}}}.
+    avatar_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     email_notifications = models.BooleanField(default=True)
     sms_notifications = models.BooleanField(default=False)
     promo_notifications = models.BooleanField(default=True)
@@ -43,6 +52,58 @@ class UserProfile(models.Model):
     def __str__(self) -> str:
         return f"Profile for {self.user}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {name: _frozen(value) for name, value in zip(field_names, values)}
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(fields)
+
+    def _snapshot(self, update_fields=None) -> None:
+        values = {
+            field.attname: _frozen(getattr(self, field.attname))
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (update_fields is None or field.name in update_fields or field.attname in update_fields)
+        }
+        if update_fields is None or not hasattr(self, "_loaded_values"):
+            self._loaded_values = values
+        else:
+            self._loaded_values.update(values)
+
+    def get_dirty_fields(self) -> list[str]:
+        """Names of the fields changed since the row was loaded or last saved."""
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return [field.attname for field in self._meta.concrete_fields if not field.primary_key]
+        return [
+            field.attname
+            for field in self._meta.concrete_fields
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    def save(self, *args, **kwargs):
+        # Existing profiles only write the columns that actually changed.
+        if not self._state.adding and kwargs.get("update_fields") is None and hasattr(self, "_loaded_values"):
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            kwargs["update_fields"] = [*dirty, "updated_at"]
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get("update_fields"))
+
+    @property
+    def avatar_image(self):
+        """Thumbnail URLs of the current avatar, or None until they are rendered."""
+        from .avatars import AvatarImage, needs_processing
+
+        if not self.avatar or needs_processing(self):
+            return None
+        return AvatarImage(self.avatar_thumbnails["sizes"])
+
     def activate_trial(self):
         """Simple helper to set a default trial subscription on signup."""
         if not self.current_plan:
@@ -71,10 +132,14 @@ class DownloadHistory(models.Model):
     )
     downloaded_at = models.DateTimeField(default=timezone.now)
     quality = models.CharField(max_length=10, choices=QUALITY_CHOICES, blank=True)
+    server = models.CharField(max_length=100, blank=True)
     file_size = models.CharField(max_length=50, blank=True)
 
     class Meta:
         ordering = ("-downloaded_at",)
+        indexes = [
+            models.Index(fields=["user", "-downloaded_at"], name="core_download_user_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} downloaded {self.movie}"
@@ -94,6 +159,9 @@ class FavoriteMovie(models.Model):
     class Meta:
         ordering = ("-created_at",)
         unique_together = ("user", "movie")
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="core_favorite_user_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} likes {self.movie}"
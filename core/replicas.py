@@ -0,0 +1,164 @@
+"""Read-replica routing for catalogue and pricing reads, with read-your-writes.
+
+:class:`ReplicaRouter` sends reads of ``REPLICA_READ_APPS`` models (the
+catalogue and the plans) to a random alias in ``DATABASE_REPLICAS`` and every
+write to ``default``. Replicas are only used inside a request handled by
+:class:`ReplicaPinningMiddleware`; management commands, background flushes
+and anything inside a transaction read from the primary.
+
+A client that just wrote must not read stale rows from a lagging replica, so
+any request with an unsafe method, or one that writes, is served from the
+primary. Its response then sets a short-lived cookie, and the same client's
+requests are pinned to the primary for ``REPLICA_STICKY_SECONDS`` after its
+last write. This covers anonymous visitors too, e.g. after posting a comment
+on a movie page.
+"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "cinehub_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@dataclass
+class RoutingState:
+    pinned: bool = False
+    wrote: bool = False
+
+
+_state: ContextVar[RoutingState | None] = ContextVar("cinehub_db_routing", default=None)
+
+
+def replica_aliases() -> list[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def sticky_seconds() -> int:
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+
+@contextmanager
+def reading_primary():
+    """Read from the primary inside this block.
+
+    Used around shared cache fills: a value loaded from a lagging replica
+    right after a version bump would otherwise stay cached, stale, until the
+    next bump.
+    """
+    state = _state.get()
+    if state is None or state.pinned:
+        yield
+        return
+    pinned = RoutingState(pinned=True)
+    token = _state.set(pinned)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+        state.wrote = state.wrote or pinned.wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = replica_aliases()
+        if state is None or state.pinned or state.wrote or not replicas:
+            return None
+        if model._meta.app_label not in getattr(settings, "REPLICA_READ_APPS", ("movies", "payments")):
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas copy the primary's schema; they are never migrated directly.
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def _pinned_by_cookie(request) -> bool:
+    try:
+        expires = float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return expires > time.time()
+
+
+class ReplicaPinningMiddleware:
+    """Scope replica reads to the request and keep writers on the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request) -> RoutingState:
+        return RoutingState(pinned=request.method not in SAFE_METHODS or _pinned_by_cookie(request))
+
+    def _finish(self, state: RoutingState, response):
+        if state.wrote:
+            seconds = sticky_seconds()
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True, samesite="Lax"
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self._start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state = self._start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+
+def copy_sqlite_database(source: str, target: str) -> None:
+    """Snapshot the SQLite file ``source`` into ``target`` (a local replica).
+
+    The online backup API writes through SQLite's own locking, so readers of
+    ``target`` (and its WAL file) see either the old or the new snapshot.
+    """
+    primary, replica = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
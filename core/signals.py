@@ -1,17 +1,34 @@
 from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from .accounts import create_account_rows
+from .avatars import needs_processing, processor
 from .models import UserProfile
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        create_account_rows(instance)
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, "profile"):
-        instance.profile.save()
+def save_user_profile(sender, instance, created, raw=False, **kwargs):
+    # Only a profile already loaded alongside the user can carry edits, and
+    # it is written only if its own fields changed (never on last_login).
+    if created or raw or not sender.profile.is_cached(instance):
+        return
+    profile = instance.profile
+    if profile is not None and profile.get_dirty_fields():
+        profile.save()
+
+
+@receiver(post_save, sender=UserProfile)
+def schedule_avatar_processing(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "avatar" not in update_fields):
+        return
+    if needs_processing(instance):
+        profile_id = instance.pk
+        transaction.on_commit(lambda: processor.record(profile_id))
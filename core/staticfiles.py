@@ -0,0 +1,188 @@
+"""Fingerprinted, minified and precompressed static files, and a view serving them.
+
+``collectstatic`` with :class:`CompressedManifestStaticFilesStorage` (the
+``staticfiles`` storage in ``STORAGES``) copies every asset under a
+content-hashed name, as Django's manifest storage does. It then minifies the
+hashed CSS and JavaScript and writes ``.gz`` and ``.br`` siblings for every
+compressible file. Brotli needs the optional ``brotli`` package; without it
+only gzip variants are written.
+
+:func:`serve` answers ``STATIC_URL`` requests from ``STATIC_ROOT`` when the
+app serves its own assets (``SERVE_STATIC``). It picks the smallest variant
+the client accepts, and because a hashed name changes whenever the content
+does, those responses are cacheable forever (``immutable``).
+"""
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".map")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Files found only by their original name (no fingerprint) must be revalidated.
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+# Preference order when the client accepts several encodings.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_STRING_OR_COMMENT = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*(?!!).*?\*/""", re.S)
+_CSS_SPACE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|\s*([{};,>])\s*|(:)\s+|\s+""")
+
+
+def minify_css(source: str) -> str:
+    """Drop comments (except ``/*! ... */``) and insignificant whitespace.
+
+    Strings are left alone, and the whitespace before ``:`` is kept because
+    ``a :hover`` and ``a:hover`` are different selectors.
+    """
+    source = _STRING_OR_COMMENT.sub(lambda match: match.group(1) or "", source)
+
+    def collapse(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(2):
+            return match.group(2)
+        if match.group(3):
+            return ":"
+        return " "
+
+    return _CSS_SPACE.sub(collapse, source).strip()
+
+
+def minify_js(source: str) -> str:
+    """Strip indentation, blank lines and whole-line ``//`` comments.
+
+    Line breaks are kept, so automatic semicolon insertion still applies.
+    Sources with template literals are returned unchanged, since a line
+    break or leading space inside one is part of the string.
+    """
+    if "`" in source:
+        return source
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def compressed_variants(content: bytes) -> dict[str, bytes]:
+    """``{suffix: body}`` for every encoding that makes ``content`` smaller."""
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also minifies and precompresses the hashed files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Only the final hashed names; earlier passes leave intermediate copies.
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            self._minify(hashed_name)
+            self._compress(hashed_name)
+
+    def _minify(self, name: str) -> None:
+        minifier = MINIFIERS.get(os.path.splitext(name)[1])
+        if minifier is None:
+            return
+        with self.open(name) as handle:
+            source = handle.read().decode("utf-8")
+        minified = minifier(source)
+        if len(minified) < len(source):
+            self._overwrite(name, minified.encode("utf-8"))
+
+    def _compress(self, name: str) -> None:
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as handle:
+            content = handle.read()
+        for suffix, body in compressed_variants(content).items():
+            self._overwrite(name + suffix, body)
+
+    def _overwrite(self, name: str, content: bytes) -> None:
+        with open(self.path(name), "wb") as handle:
+            handle.write(content)
+
+    @cached_property
+    def fingerprinted_names(self) -> frozenset[str]:
+        return frozenset(self.hashed_files.values())
+
+    def url(self, name, force=False):
+        if not self.hashed_files and not force and _manifest_optional():
+            # collectstatic has not run here (development, tests): link the sources.
+            return StaticFilesStorage.url(self, name)
+        return super().url(name, force)
+
+
+def _manifest_optional() -> bool:
+    # Production must fail loudly on a missing manifest, never serve unversioned assets.
+    return settings.DEBUG or getattr(settings, "STATIC_MANIFEST_OPTIONAL", False)
+
+
+def _is_fingerprinted(path: str) -> bool:
+    return path in getattr(staticfiles_storage, "fingerprinted_names", ())
+
+
+def _accepted(request) -> set[str]:
+    """Content codings the client accepts (those listed without ``q=0``)."""
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip().replace(" ", "")
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path: str):
+    """Serve ``path`` from ``STATIC_ROOT``, precompressed where the client allows."""
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation as exc:
+        raise Http404("Static file not found.") from exc
+    if not os.path.isfile(fullpath):
+        raise Http404("Static file not found.")
+
+    stat = os.stat(fullpath)
+    immutable = _is_fingerprinted(path)
+    if not immutable and not was_modified_since(request.headers.get("If-Modified-Since"), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+    accepted, encoding, served = _accepted(request), None, fullpath
+    for coding, suffix in ENCODINGS:
+        if (coding in accepted or "*" in accepted) and os.path.isfile(fullpath + suffix):
+            encoding, served = coding, fullpath + suffix
+            break
+
+    response = FileResponse(open(served, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return response
@@ -0,0 +1,29 @@
+"""Test runner for the project (``TEST_RUNNER``)."""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# The suite clears and fills the cache freely; it must never touch the
+# shared cache a development server reads.
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cinehub-tests",
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    """Django's runner with a private in-memory cache.
+
+    It also links unhashed static files, since the suite never runs
+    collectstatic.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._overrides = override_settings(CACHES=TEST_CACHES, STATIC_MANIFEST_OPTIONAL=True)
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        super().teardown_test_environment(**kwargs)
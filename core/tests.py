@@ -1,3 +1,526 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from movies.models import Movie
+
+from .models import DownloadHistory
+from .tracking import discard_pending, tracker
+
+User = get_user_model()
+
+
+@override_settings(
+    DOWNLOAD_TRACKING_BACKGROUND=False,
+    DOWNLOAD_TRACKING_BATCH_SIZE=50,
+    POPULARITY_BACKGROUND=False,
+)
+class DownloadTrackingTests(TestCase):
+    def setUp(self):
+        discard_pending()
+        self.addCleanup(discard_pending)
+        self.user = User.objects.create_user("viewer", "viewer@example.com", "pass12345")
+        self.movie = Movie.objects.create(
+            title="Tracked",
+            description="",
+            release_year=2021,
+            duration_minutes=90,
+            download_options=[
+                {"label": "HD (720p)", "file_size": "1 GB", "download_url": "https://cdn.example.com/720"},
+            ],
+            server_options=[{"name": "Mirror A", "url": "https://mirror.example.com/a"}],
+        )
+        self.go_url = reverse("movies:movie_download_go", kwargs={"slug": self.movie.slug})
+
+    def test_download_is_buffered_then_bulk_inserted(self):
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.go_url, {"quality": 0})
+        self.assertRedirects(response, "https://cdn.example.com/720", fetch_redirect_response=False)
+        self.assertFalse(any(query["sql"].startswith("INSERT") for query in captured.captured_queries))
+        self.assertEqual(tracker.pending(), 1)
+
+        self.client.get(self.go_url, {"server": 0})
+        self.assertEqual(tracker.flush(), 2)
+        rows = DownloadHistory.objects.filter(user=self.user).order_by("pk")
+        self.assertEqual(
+            list(rows.values_list("quality", "server", "file_size")),
+            [("HD", "", "1 GB"), ("", "Mirror A", "")],
+        )
+
+    def test_batch_size_triggers_flush(self):
+        self.client.force_login(self.user)
+
+        with self.settings(DOWNLOAD_TRACKING_BATCH_SIZE=2):
+            self.client.get(self.go_url, {"quality": 0})
+            self.client.get(self.go_url, {"quality": 0})
+
+        self.assertEqual(tracker.pending(), 0)
+        self.assertEqual(DownloadHistory.objects.count(), 2)
+
+    def test_incomplete_buffer_fails_when_instantiated(self):
+        from .tracking import WriteBehindBuffer
+
+        class NoWrite(WriteBehindBuffer):
+            def add(self, item):
+                return 1
+
+            def drain(self):
+                return []
+
+        with self.assertRaises(TypeError):
+            NoWrite()
+
+    def test_anonymous_and_unknown_options_are_not_tracked(self):
+        self.client.get(self.go_url, {"quality": 0})
+        self.client.force_login(self.user)
+        response = self.client.get(self.go_url, {"quality": 9})
+
+        self.assertRedirects(response, reverse("movies:movie_download", kwargs={"slug": self.movie.slug}))
+        self.assertEqual(tracker.pending(), 0)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        from .instrumentation import registry
+
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.registry = registry
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, POPULARITY_BACKGROUND=False)
+    def test_sampled_request_is_recorded(self):
+        Movie.objects.create(title="Measured", description="", release_year=2021, duration_minutes=90)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("movies:search"))
+
+        self.assertIn("Server-Timing", response)
+        self.assertIn(f'desc="{len(captured.captured_queries)} queries"', response["Server-Timing"])
+        stats = self.registry.snapshot()[("movies:search", "GET", 200)]
+        self.assertEqual(stats.requests, 1)
+        self.assertEqual(stats.queries, len(captured.captured_queries))
+        self.assertEqual(stats.response_bytes, len(response.content))
+        self.assertGreater(stats.template_seconds, 0)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_untouched(self):
+        response = self.client.get(reverse("movies:search"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.registry.snapshot(), {})
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, INSTRUMENTATION_METRICS_TOKEN="scrape-me")
+    def test_metrics_endpoint_requires_token(self):
+        self.client.get(reverse("movies:search"))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('cinehub_db_queries_total{view="movies:search",method="GET",status="200"}', body)
+        self.assertIn('cinehub_request_duration_seconds_bucket{view="movies:search",method="GET",status="200",le="+Inf"} 1', body)
+
+
+class SignUpTests(TestCase):
+    def test_signup_logs_the_new_user_in(self):
+        response = self.client.post(
+            reverse("core:signup"),
+            {
+                "full_name": "New Member",
+                "email": "New@Example.com",
+                "password1": "a-Strong-pass-42",
+                "password2": "a-Strong-pass-42",
+                "accept_terms": "on",
+            },
+        )
+
+        self.assertRedirects(response, reverse("core:profile"))
+        user = User.objects.get(email="new@example.com")
+        self.assertEqual(self.client.session["_auth_user_id"], str(user.pk))
+        self.assertEqual(self.client.session["_auth_user_backend"], "core.accounts.AccountBackend")
+
+
+class AccountLoaderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("member", "member@example.com", "pass12345")
+        self.client.login(username="member", password="pass12345")
+
+    def test_signup_path_creates_account_rows(self):
+        from payments.models import Subscription
+
+        from .models import UserProfile
+
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+        self.assertTrue(Subscription.objects.filter(user=self.user).exists())
+
+    def test_account_pages_are_read_only_on_get(self):
+        for name in ("profile", "settings", "subscription", "download_history", "favorites"):
+            with self.subTest(name), CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse(f"core:{name}"))
+            self.assertEqual(response.status_code, 200)
+            writes = [q["sql"] for q in captured.captured_queries if not q["sql"].startswith("SELECT")]
+            self.assertEqual(writes, [])
+            user_queries = [q["sql"] for q in captured.captured_queries if 'FROM "auth_user"' in q["sql"]]
+            self.assertEqual(len(user_queries), 1)
+            self.assertIn("core_userprofile", user_queries[0])
+            self.assertIn("payments_subscription", user_queries[0])
+
+    def test_missing_rows_are_created_on_post_only(self):
+        from payments.models import Subscription
+
+        Subscription.objects.filter(user=self.user).delete()
+        self.client.get(reverse("core:subscription"))
+        self.assertFalse(Subscription.objects.filter(user=self.user).exists())
+
+        self.client.post(reverse("core:subscription"), {"action": "cancel_subscription"})
+        self.assertEqual(Subscription.objects.get(user=self.user).status, Subscription.Status.CANCELLED)
+
+    def test_failed_login_is_rejected(self):
+        self.client.logout()
+        self.assertFalse(self.client.login(username="member", password="wrong"))
+
+
+class ProfileDirtyTrackingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("member", "member@example.com", "pass12345")
+
+    def _writes(self, captured):
+        return [q["sql"] for q in captured.captured_queries if not q["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))]
+
+    def test_login_does_not_rewrite_the_profile(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("core:login"), {"username": "member", "password": "pass12345"})
+        self.assertEqual(response.status_code, 302)
+        writes = self._writes(captured)
+        self.assertFalse([sql for sql in writes if "core_userprofile" in sql])
+        # One UPDATE for last_login; everything else is the session row.
+        self.assertEqual(len([sql for sql in writes if '"auth_user"' in sql]), 1)
+        self.assertEqual(len([sql for sql in writes if '"django_session"' not in sql]), 1, writes)
+
+    def test_user_save_skips_clean_profile(self):
+        user = User.objects.select_related("profile").get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as captured:
+            user.first_name = "Ada"
+            user.save()
+        self.assertFalse([sql for sql in self._writes(captured) if "core_userprofile" in sql])
+
+    def test_only_changed_columns_are_written(self):
+        profile = User.objects.select_related("profile").get(pk=self.user.pk).profile
+        profile.bio = "Film buff"
+        with CaptureQueriesContext(connection) as captured:
+            profile.save()
+        (update,) = self._writes(captured)
+        self.assertIn('"bio"', update)
+        self.assertNotIn('"phone_number"', update)
+        profile.refresh_from_db()
+        self.assertEqual(profile.bio, "Film buff")
+
+    def test_refresh_from_db_takes_a_new_snapshot(self):
+        from .models import UserProfile
+
+        profile = UserProfile.objects.get(user=self.user)
+        UserProfile.objects.filter(pk=profile.pk).update(bio="Written elsewhere")
+        profile.refresh_from_db()
+        self.assertEqual(profile.get_dirty_fields(), [])
+        profile.bio = ""
+        self.assertEqual(profile.get_dirty_fields(), ["bio"])
+
+    def test_in_place_json_edits_are_dirty(self):
+        from .models import UserProfile
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.avatar_thumbnails["source"] = "avatars/a.jpg"
+        self.assertEqual(profile.get_dirty_fields(), ["avatar_thumbnails"])
+        profile.save()
+        profile.avatar_thumbnails["sizes"] = {}
+        self.assertEqual(profile.get_dirty_fields(), ["avatar_thumbnails"])
+
+    def test_profile_form_writes_the_profile_once(self):
+        from payments.models import Plan
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan = Plan.objects.create(title="Premium", price="14.99")
+        self.client.force_login(self.user)
+        data = {
+            "first_name": "Ada",
+            "last_name": "",
+            "email": "member@example.com",
+            "bio": "Film buff",
+            "current_plan": plan.pk,
+        }
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("core:profile"), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len([sql for sql in self._writes(captured) if "core_userprofile" in sql]), 1)
+        self.user.profile.refresh_from_db()
+        self.assertEqual((self.user.profile.bio, self.user.profile.plan_status), ("Film buff", "active"))
+
+
+def _jpeg_upload(name="phone.jpg", size=(1200, 800)):
+    from io import BytesIO
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    image = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    exif[0x010F] = "PhoneMaker"
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(AVATAR_PROCESSING_BACKGROUND=False, AVATAR_SIZES=(48, 160))
+class AvatarPipelineTests(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        discard_pending()
+        self.addCleanup(discard_pending)
+        self.user = User.objects.create_user("painter", "painter@example.com", "pass12345")
+        self.client.force_login(self.user)
+
+    def upload(self, avatar):
+        data = {"first_name": "", "last_name": "", "email": "painter@example.com", "avatar": avatar}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("core:profile"), data)
+
+    def test_upload_is_replaced_by_stripped_thumbnails(self):
+        from django.core.files.storage import default_storage
+        from PIL import Image
+
+        from .models import UserProfile
+
+        self.assertEqual(self.upload(_jpeg_upload()).status_code, 302)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertFalse(default_storage.exists(f"avatars/{self.user.pk}/phone.jpg"))
+        self.assertEqual(profile.avatar.name, profile.avatar_thumbnails["sizes"]["160"]["jpeg"])
+        for size, names in profile.avatar_thumbnails["sizes"].items():
+            for name in names.values():
+                with default_storage.open(name) as handle, Image.open(handle) as image:
+                    self.assertEqual(image.size, (int(size), int(size)))
+                    self.assertFalse(image.getexif())
+
+        page = self.client.get(reverse("core:profile")).content.decode()
+        self.assertIn('type="image/webp"', page)
+        self.assertIn(profile.avatar_image.webp_srcset, page)
+
+    def test_clearing_the_avatar_removes_thumbnails(self):
+        from django.core.files.storage import default_storage
+
+        from .models import UserProfile
+
+        self.upload(_jpeg_upload())
+        files = [name for names in UserProfile.objects.get(user=self.user).avatar_thumbnails["sizes"].values() for name in names.values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("core:profile"),
+                {"first_name": "", "last_name": "", "email": "painter@example.com", "avatar-clear": "on"},
+            )
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertFalse(profile.avatar)
+        self.assertEqual(profile.avatar_thumbnails, {})
+        self.assertFalse(any(default_storage.exists(name) for name in files))
+
+    @override_settings(AVATAR_MAX_PIXELS=10_000)
+    def test_oversized_images_are_rejected_before_saving(self):
+        response = self.upload(_jpeg_upload())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("megapixels", response.context["profile_form"].errors["avatar"][0])
+        self.assertFalse(self.user.profile.avatar)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTests(SimpleTestCase):
+    # No test transaction: reads inside an atomic block stay on the primary.
+    def setUp(self):
+        from .replicas import ReplicaRouter
+
+        self.router = ReplicaRouter()
+        self.cookies = {}
+        self.routed = []
+
+    def request(self, view, method="get", **params):
+        from django.test import RequestFactory
+
+        from .replicas import ReplicaPinningMiddleware
+
+        request = getattr(RequestFactory(), method)("/", params)
+        request.COOKIES.update(self.cookies)
+        response = ReplicaPinningMiddleware(view)(request)
+        self.cookies.update({key: morsel.value for key, morsel in response.cookies.items()})
+        return response
+
+    def routing_view(self, request):
+        from payments.models import Plan
+
+        if request.GET.get("write"):
+            self.router.db_for_write(Movie)
+        self.routed.append((self.router.db_for_read(Movie), self.router.db_for_read(Plan), self.router.db_for_read(User)))
+        return HttpResponse()
+
+    def test_catalogue_and_pricing_reads_go_to_the_replica(self):
+        self.request(self.routing_view)
+        self.assertEqual(self.routed, [("replica", "replica", None)])
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertIsNone(self.router.db_for_read(Movie))
+        self.assertEqual(self.router.db_for_write(Movie), "default")
+
+    def test_writers_stay_on_the_primary_for_the_sticky_window(self):
+        from .replicas import PIN_COOKIE
+
+        self.request(self.routing_view, "post")
+        self.assertNotIn(PIN_COOKIE, self.cookies)
+        self.request(self.routing_view, write="1")
+        self.assertIn(PIN_COOKIE, self.cookies)
+        self.request(self.routing_view)
+        self.assertEqual(self.routed, [(None, None, None)] * 3)
+
+        self.cookies[PIN_COOKIE] = "0"
+        self.request(self.routing_view)
+        self.assertEqual(self.routed[-1], ("replica", "replica", None))
+
+    def test_cache_fills_read_the_primary(self):
+        from .replicas import reading_primary
+
+        def view(request):
+            with reading_primary():
+                self.routed.append(self.router.db_for_read(Movie))
+            self.routed.append(self.router.db_for_read(Movie))
+            return HttpResponse()
+
+        self.request(view)
+        self.assertEqual(self.routed, [None, "replica"])
+
+    def test_sync_replica_copies_the_primary_file(self):
+        import os
+        import sqlite3
+        import tempfile
+
+        from .replicas import copy_sqlite_database
+
+        directory = tempfile.mkdtemp()
+        primary, replica = os.path.join(directory, "primary.sqlite3"), os.path.join(directory, "replica.sqlite3")
+        with sqlite3.connect(primary) as db:
+            db.execute("CREATE TABLE movie (title TEXT)")
+            db.execute("INSERT INTO movie VALUES ('Copied')")
+        copy_sqlite_database(primary, replica)
+        with sqlite3.connect(replica) as db:
+            self.assertEqual(db.execute("SELECT title FROM movie").fetchall(), [("Copied",)])
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_are_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+    def test_benchmark_reports_both_modes(self):
+        from .benchmarks import run_sqlite_benchmark
+
+        results = run_sqlite_benchmark(threads=2, seconds=0.2, movies=20)
+
+        self.assertEqual([result["mode"] for result in results], ["stock", "tuned"])
+        tuned = results[1]
+        self.assertGreater(tuned["read"]["completed"] + tuned["write"]["completed"], 0)
+        self.assertEqual(tuned["write"]["errors"], 0)
+
+
+class StaticPipelineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        import shutil
+        import tempfile
+
+        from django.core.management import call_command
+
+        super().setUpClass()
+        static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(STATIC_ROOT=static_root))
+        call_command("collectstatic", interactive=False, verbosity=0)
+        cls.static_root = static_root
+
+    def setUp(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        self.storage = staticfiles_storage
+        self.hashed = self.storage.stored_name("movies/js/script.js")
+
+    def get(self, path, **headers):
+        from django.test import RequestFactory
+
+        from .staticfiles import serve
+
+        return serve(RequestFactory().get(f"/static/{path}", headers=headers), path)
+
+    def test_collectstatic_writes_minified_and_gzipped_hashed_files(self):
+        import gzip
+        import os
+
+        self.assertRegex(self.hashed, r"^movies/js/script\.[0-9a-f]{12}\.js$")
+        self.assertIn(self.hashed, self.storage.url("movies/js/script.js"))
+        original = os.path.getsize(os.path.join(self.static_root, "movies/js/script.js"))
+        with open(self.storage.path(self.hashed), "rb") as handle:
+            minified = handle.read()
+        self.assertLess(len(minified), original)
+        with open(self.storage.path(self.hashed) + ".gz", "rb") as handle:
+            self.assertEqual(gzip.decompress(handle.read()), minified)
+
+    def test_serve_picks_the_precompressed_variant(self):
+        from .staticfiles import IMMUTABLE_CACHE_CONTROL
+
+        response = self.get(self.hashed, accept_encoding="gzip, deflate, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["Content-Type"], "text/javascript")
+
+        identity = self.get(self.hashed)
+        self.assertFalse(identity.has_header("Content-Encoding"))
+        self.assertEqual(identity["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+
+    def test_unhashed_names_revalidate_and_unknown_paths_404(self):
+        from django.http import Http404
+
+        response = self.get("movies/js/script.js")
+        self.assertIn("must-revalidate", response["Cache-Control"])
+        self.assertEqual(self.get("movies/js/script.js", if_modified_since=response["Last-Modified"]).status_code, 304)
+        for path in ("missing.js", "../CineHub/settings.py"):
+            with self.assertRaises(Http404):
+                self.get(path)
+
+    def test_missing_manifest_fails_loudly_in_production(self):
+        import shutil
+        import tempfile
+
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        empty_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, empty_root, ignore_errors=True)
+        with override_settings(STATIC_ROOT=empty_root, DEBUG=False, STATIC_MANIFEST_OPTIONAL=False):
+            with self.assertRaisesMessage(ValueError, "Missing staticfiles manifest entry"):
+                staticfiles_storage.url("movies/js/script.js")
+        with override_settings(STATIC_ROOT=empty_root, DEBUG=True, STATIC_MANIFEST_OPTIONAL=False):
+            self.assertEqual(staticfiles_storage.url("movies/js/script.js"), "/static/movies/js/script.js")
+
+    def test_minify_css_keeps_strings_and_descendant_pseudo_selectors(self):
+        from .staticfiles import minify_css
+
+        source = '/* header */\na :hover ,\nb > i {\n  content: "a  /* b */";\n  color : red;\n}\n/*! license */'
+        self.assertEqual(minify_css(source), 'a :hover,b>i{content:"a  /* b */";color :red;}/*! license */')
@@ -0,0 +1,196 @@
+"""Buffered, write-behind recording of download events.
+
+``movie_download_go`` records a download with :func:`record_download`, which
+only appends to an in-memory buffer. A daemon thread flushes the buffer into
+``DownloadHistory`` with ``bulk_create`` once it holds
+``DOWNLOAD_TRACKING_BATCH_SIZE`` events or every
+``DOWNLOAD_TRACKING_FLUSH_INTERVAL`` seconds, so the download hot path never
+waits on an INSERT. Whatever is still buffered at interpreter exit is flushed
+by an ``atexit`` hook; a hard crash can lose at most one batch.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DownloadEvent:
+    user_id: int
+    movie_id: int
+    quality: str = ""
+    server: str = ""
+    file_size: str = ""
+    downloaded_at: object = field(default_factory=timezone.now)
+
+
+class WriteBehindBuffer(ABC):
+    """Collects writes in memory and hands them to :meth:`write` in batches.
+
+    Subclasses implement the abstract :meth:`add`, :meth:`drain` and
+    :meth:`write`. Both ``add`` and ``drain`` run under ``self._lock``.
+    """
+
+    batch_size_setting = ""
+    flush_interval_setting = ""
+    background_setting = ""
+    default_batch_size = 200
+    default_flush_interval = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    @property
+    def batch_size(self) -> int:
+        return getattr(settings, self.batch_size_setting, self.default_batch_size)
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, self.flush_interval_setting, self.default_flush_interval)
+
+    @property
+    def background(self) -> bool:
+        return getattr(settings, self.background_setting, True)
+
+    @abstractmethod
+    def add(self, item) -> int:
+        """Store ``item``; return how many items are now pending."""
+
+    @abstractmethod
+    def drain(self):
+        """Swap out and return everything pending."""
+
+    @abstractmethod
+    def write(self, items) -> int:
+        """Persist drained ``items``; return how many rows were written."""
+
+    def record(self, item) -> None:
+        with self._lock:
+            pending = self.add(item)
+        if not self.background:
+            if pending >= self.batch_size:
+                self.flush()
+            return
+        self._ensure_worker()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            items = self.drain()
+        if not items:
+            return 0
+        try:
+            return self.write(items)
+        except DatabaseError:
+            logger.exception("Dropping %d buffered writes after a failed flush", len(items))
+            return 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name=type(self).__name__, daemon=True
+            )
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - keep the worker alive
+                logger.exception("%s flush failed", type(self).__name__)
+            finally:
+                close_old_connections()
+
+
+class DownloadTracker(WriteBehindBuffer):
+    batch_size_setting = "DOWNLOAD_TRACKING_BATCH_SIZE"
+    flush_interval_setting = "DOWNLOAD_TRACKING_FLUSH_INTERVAL"
+    background_setting = "DOWNLOAD_TRACKING_BACKGROUND"
+
+    def __init__(self):
+        super().__init__()
+        self._buffer: list[DownloadEvent] = []
+
+    def add(self, event: DownloadEvent) -> int:
+        self._buffer.append(event)
+        return len(self._buffer)
+
+    def drain(self) -> list[DownloadEvent]:
+        events, self._buffer = self._buffer, []
+        return events
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def write(self, events: list[DownloadEvent]) -> int:
+        from .models import DownloadHistory
+
+        rows = [
+            DownloadHistory(
+                user_id=event.user_id,
+                movie_id=event.movie_id,
+                quality=event.quality,
+                server=event.server,
+                file_size=event.file_size,
+                downloaded_at=event.downloaded_at,
+            )
+            for event in events
+        ]
+        DownloadHistory.objects.bulk_create(rows, batch_size=self.batch_size)
+        return len(rows)
+
+
+tracker = DownloadTracker()
+
+# Every write-behind buffer registered here is flushed at interpreter exit.
+BUFFERS: list[WriteBehindBuffer] = [tracker]
+
+
+def record_download(user, movie, quality: str = "", server: str = "", file_size: str = "") -> None:
+    if not user.is_authenticated:
+        return
+    tracker.record(
+        DownloadEvent(
+            user_id=user.pk,
+            movie_id=movie.pk,
+            quality=quality,
+            server=server[:100],
+            file_size=file_size[:50],
+        )
+    )
+
+
+def discard_pending() -> None:
+    """Drop every buffered write without flushing it (used by the test suite)."""
+    for buffer in BUFFERS:
+        with buffer._lock:
+            buffer.drain()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    for buffer in BUFFERS:
+        try:
+            buffer.flush()
+        except Exception:  # pragma: no cover - interpreter is shutting down
+            logger.exception("Could not flush %s at exit", type(buffer).__name__)
@@ -1,14 +1,18 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView, LogoutView
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import redirect, render
+from django.utils.crypto import constant_time_compare
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views import View
 from django.views.generic import FormView
 
-from payments.models import Plan, Subscription
+from payments.cache import active_plans
+from payments.models import Subscription
 
 from .forms import (
     AccountDeleteForm,
@@ -19,7 +23,9 @@ from .forms import (
     StyledAuthenticationForm,
     UserDetailsForm,
 )
-from .models import DownloadHistory, FavoriteMovie, UserProfile
+from .accounts import ensure_account, get_account
+from .instrumentation import registry
+from .models import DownloadHistory, FavoriteMovie
 
 
 class SignUpView(FormView):
@@ -34,10 +40,9 @@ class SignUpView(FormView):
 
     def form_valid(self, form):
         user = form.save()
-        login(self.request, user)
+        # Two backends are configured, so login() must be told which one.
+        login(self.request, user, backend="core.accounts.AccountBackend")
         messages.success(self.request, "Welcome to CineHub! Your account has been created.")
-        # Ensure the user has a subscription placeholder.
-        Subscription.objects.get_or_create(user=user)
         return super().form_valid(form)
 
 
@@ -63,36 +68,36 @@ class ProfileView(LoginRequiredMixin, View):
     template_name = "accounts/profile.html"
 
     def get(self, request):
-        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        account = get_account(request.user)
         user_form = UserDetailsForm(instance=request.user)
-        profile_form = ProfileForm(instance=profile)
-        subscription, _ = Subscription.objects.get_or_create(user=request.user)
-        plans = Plan.objects.filter(is_active=True)
+        profile_form = ProfileForm(instance=account.profile)
         context = {
             "user_form": user_form,
             "profile_form": profile_form,
-            "subscription": subscription,
-            "plans": plans,
-            "profile": profile,
+            "subscription": account.subscription,
+            "plans": active_plans(),
+            "profile": account.profile,
             "active_page": "profile",
         }
         return render(request, self.template_name, context)
 
     def post(self, request):
-        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        account = ensure_account(request.user)
+        subscription = account.subscription
         user_form = UserDetailsForm(request.POST, instance=request.user)
-        profile_form = ProfileForm(request.POST, request.FILES, instance=profile)
+        profile_form = ProfileForm(request.POST, request.FILES, instance=account.profile)
 
         if user_form.is_valid() and profile_form.is_valid():
-            user_form.save()
             profile = profile_form.save(commit=False)
             if profile.current_plan:
                 profile.plan_status = "active"
             else:
                 profile.plan_status = "inactive"
+            # Saved before the user, so the user's post_save finds it clean
+            # instead of writing the form's edits a second time.
             profile.save()
+            user_form.save()
 
-            subscription, _ = Subscription.objects.get_or_create(user=request.user)
             subscription.plan = profile.current_plan
             subscription.status = (
                 Subscription.Status.ACTIVE if profile.current_plan else Subscription.Status.INACTIVE
@@ -103,15 +108,12 @@ class ProfileView(LoginRequiredMixin, View):
             messages.success(request, "Your profile has been updated.")
             return redirect("core:profile")
 
-        subscription, _ = Subscription.objects.get_or_create(user=request.user)
-        plans = Plan.objects.filter(is_active=True)
-
         context = {
             "user_form": user_form,
             "profile_form": profile_form,
             "subscription": subscription,
-            "plans": plans,
-            "profile": profile,
+            "plans": active_plans(),
+            "profile": account.profile,
             "active_page": "profile",
         }
         return render(request, self.template_name, context)
@@ -121,17 +123,15 @@ class AccountSettingsView(LoginRequiredMixin, View):
     template_name = "accounts/settings.html"
 
     def get(self, request):
-        UserProfile.objects.get_or_create(user=request.user)
         context = {
             "password_form": PasswordUpdateForm(user=request.user),
             "delete_form": AccountDeleteForm(),
-            "profile": request.user.profile,
+            "profile": get_account(request.user).profile,
             "active_page": "settings",
         }
         return render(request, self.template_name, context)
 
     def post(self, request):
-        UserProfile.objects.get_or_create(user=request.user)
         if "change_password" in request.POST:
             password_form = PasswordUpdateForm(user=request.user, data=request.POST)
             delete_form = AccountDeleteForm()
@@ -143,7 +143,7 @@ class AccountSettingsView(LoginRequiredMixin, View):
             context = {
                 "password_form": password_form,
                 "delete_form": delete_form,
-                "profile": request.user.profile,
+                "profile": get_account(request.user).profile,
                 "active_page": "settings",
             }
             return render(request, self.template_name, context)
@@ -161,7 +161,7 @@ class AccountSettingsView(LoginRequiredMixin, View):
             context = {
                 "password_form": password_form,
                 "delete_form": delete_form,
-                "profile": request.user.profile,
+                "profile": get_account(request.user).profile,
                 "active_page": "settings",
             }
             return render(request, self.template_name, context)
@@ -173,22 +173,21 @@ class AccountSubscriptionView(LoginRequiredMixin, View):
     template_name = "accounts/subscription.html"
 
     def get(self, request):
-        subscription, _ = Subscription.objects.get_or_create(user=request.user)
-        profile, _ = UserProfile.objects.get_or_create(user=request.user)
-        plan_form = PlanSelectionForm(initial={"plan": subscription.plan})
+        account = get_account(request.user)
+        plan_form = PlanSelectionForm(initial={"plan": account.subscription.plan})
         context = {
-            "subscription": subscription,
-            "profile": profile,
+            "subscription": account.subscription,
+            "profile": account.profile,
             "plan_form": plan_form,
-            "plans": Plan.objects.filter(is_active=True),
+            "plans": active_plans(),
             "active_page": "subscription",
         }
         return render(request, self.template_name, context)
 
     def post(self, request):
         action = request.POST.get("action")
-        subscription, _ = Subscription.objects.get_or_create(user=request.user)
-        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        account = ensure_account(request.user)
+        subscription, profile = account.subscription, account.profile
         plan_form = PlanSelectionForm(initial={"plan": subscription.plan})
 
         if action == "change_plan":
@@ -227,7 +226,7 @@ class AccountSubscriptionView(LoginRequiredMixin, View):
             "subscription": subscription,
             "profile": profile,
             "plan_form": plan_form,
-            "plans": Plan.objects.filter(is_active=True),
+            "plans": active_plans(),
             "active_page": "subscription",
         }
         return render(request, self.template_name, context)
@@ -237,7 +236,6 @@ class DownloadHistoryView(LoginRequiredMixin, View):
     template_name = "accounts/download_history.html"
 
     def get(self, request):
-        UserProfile.objects.get_or_create(user=request.user)
         history = (
             DownloadHistory.objects.filter(user=request.user)
             .select_related("movie")
@@ -245,7 +243,7 @@ class DownloadHistoryView(LoginRequiredMixin, View):
         )
         context = {
             "downloads": history,
-            "profile": request.user.profile,
+            "profile": get_account(request.user).profile,
             "active_page": "download_history",
         }
         return render(request, self.template_name, context)
@@ -255,7 +253,6 @@ class FavoritesView(LoginRequiredMixin, View):
     template_name = "accounts/favorites.html"
 
     def get(self, request):
-        UserProfile.objects.get_or_create(user=request.user)
         favorites = (
             FavoriteMovie.objects.filter(user=request.user)
             .select_related("movie")
@@ -263,15 +260,29 @@ class FavoritesView(LoginRequiredMixin, View):
         )
         context = {
             "favorites": favorites,
-            "profile": request.user.profile,
+            "profile": get_account(request.user).profile,
             "active_page": "favorites",
         }
         return render(request, self.template_name, context)
 
     def post(self, request):
-        UserProfile.objects.get_or_create(user=request.user)
         movie_id = request.POST.get("movie_id")
         if movie_id:
             FavoriteMovie.objects.filter(user=request.user, movie_id=movie_id).delete()
             messages.info(request, "Movie removed from favourites.")
         return redirect("core:favorites")
+
+
+class MetricsView(View):
+    """Prometheus scrape target for the instrumentation middleware.
+
+    Scrapers authenticate with ``Authorization: Bearer <INSTRUMENTATION_METRICS_TOKEN>``;
+    staff users may read it from a browser session.
+    """
+
+    def get(self, request):
+        token = getattr(settings, "INSTRUMENTATION_METRICS_TOKEN", "")
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not (token and constant_time_compare(supplied, token)) and not request.user.is_staff:
+            return HttpResponseForbidden()
+        return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -30,7 +30,7 @@ class MovieAdmin(admin.ModelAdmin):
 
     @admin.display(description="Languages")
     def display_languages(self, obj):
-        names = [language.name for language in obj.languages.all()]
+        names = obj.language_names()
         return ", ".join(names) if names else "—"
 
 
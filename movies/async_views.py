@@ -0,0 +1,128 @@
+"""Async-native catalogue views, served instead of ``movies.views`` under ASGI.
+
+They build exactly the same context as their synchronous twins (through the
+shared ``_*_context`` helpers) but read the database with the async ORM and
+``await`` independent queries together, so a request waiting on the database
+does not pin a worker thread. Everything a template touches is loaded before
+rendering: the user is resolved with ``request.auser()`` and querysets are
+materialised, because lazy ORM access is not allowed from async code.
+
+Cache helpers are called synchronously; a cache read is a short local file
+or Redis round trip.
+"""
+from __future__ import annotations
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from core.conditional import conditional_response, page_etag, set_validators
+
+from . import views
+from .cache import acached_catalogue, get_catalogue_version
+from .facets import facet_counts
+from .filters import parse_search_state
+from .forms import CommentForm
+from .models import Movie
+from .pagination import InvalidCursor
+from .popularity import get_popularity_version, record_hit
+
+
+async def _resolve_user(request) -> None:
+    # Templates and the ETag read request.user, which would otherwise load
+    # lazily (and synchronously) during rendering.
+    request.user = await request.auser()
+
+
+async def _home_languages() -> list:
+    return [language async for language in views._home_languages()]
+
+
+async def _home_trending_movies(limit: int = 8) -> list:
+    movies = [movie async for movie in views._popular_movies(limit)]
+    if len(movies) < limit:
+        movies += [movie async for movie in views._trending_fill(movies, limit)]
+    return movies
+
+
+async def _home_latest_movies() -> list:
+    return [movie async for movie in views._home_latest_movies()]
+
+
+async def home(request):
+    await _resolve_user(request)
+    catalogue_version = get_catalogue_version()
+    popularity_version = get_popularity_version()
+    etag = page_etag(request, "home", catalogue_version, popularity_version)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    languages, trending_movies, latest_movies = await asyncio.gather(
+        acached_catalogue("home:languages", _home_languages),
+        acached_catalogue(f"home:trending:{popularity_version}", _home_trending_movies),
+        acached_catalogue("home:latest", _home_latest_movies),
+    )
+    context = views._home_context(catalogue_version, popularity_version, languages, trending_movies, latest_movies)
+    return set_validators(request, render(request, "index.html", context), etag)
+
+
+async def movie_detail(request, slug: str):
+    if request.method == "POST":
+        # Posting a comment runs model signals; leave it to the sync view.
+        return await sync_to_async(views.movie_detail)(request, slug)
+
+    await _resolve_user(request)
+    movie = await aget_object_or_404(Movie.live, slug=slug)
+    await sync_to_async(record_hit)(movie.pk, "views")
+    etag = views._detail_etag(request, movie)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    related_movies, comments_page = await asyncio.gather(
+        _related_movies(movie),
+        views._comments_paginator(movie.pk).aget_page(),
+    )
+    context = views._detail_context(movie, related_movies, comments_page, CommentForm())
+    return set_validators(request, render(request, "movie-details.html", context), etag)
+
+
+async def _related_movies(movie: Movie) -> list:
+    return [related async for related in views._related_movies(movie)]
+
+
+async def movie_download(request, slug: str):
+    await _resolve_user(request)
+    movie = await aget_object_or_404(Movie.live, slug=slug)
+    etag = views._download_etag(request, movie)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    response = render(request, "download.html", views._download_context(movie))
+    return set_validators(request, response, etag)
+
+
+async def movie_search(request):
+    await _resolve_user(request)
+    state = parse_search_state(request.GET)
+    paginator = views._search_paginator(state, views.SEARCH_PAGE_SIZE)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            paginator.decode_cursor(cursor)
+        except InvalidCursor:
+            cursor = None
+
+    page, facets = await asyncio.gather(paginator.aget_page(cursor), sync_to_async(facet_counts)(state))
+    context = views._search_context(request, state, page, facets)
+    return render(request, "search.html", context)
+
+
+# Endpoints without an async twin are shared with the sync module.
+movie_search_api = views.movie_search_api
+movie_suggest = views.movie_suggest
+movie_comments = views.movie_comments
+movie_download_go = views.movie_download_go
+movie_export = views.movie_export
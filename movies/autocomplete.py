@@ -0,0 +1,314 @@
+"""In-process prefix index behind the search box typeahead.
+
+:data:`index` keeps, per process, a sorted array of normalized terms: every
+word-suffix of a live movie's title ("the dark knight", "dark knight",
+"knight"), the words of its tagline and its category and language names.
+A lookup bisects that array for the typed prefix, so a keystroke never
+touches the database. Prefixes matching more than ``RANGE_LIMIT`` terms
+("d", "english", ...) would take too long to rank on the fly, so their
+suggestions are precomputed; every other lookup ranks a bounded slice.
+
+Suggestions are ranked title matches first, then by ``MoviePopularity``
+score. Saving a movie (or changing its categories and languages) re-indexes
+just that movie once the transaction commits (see ``movies.signals``). Any
+other change, including changes made by other processes and popularity
+flushes, shows up as a new catalogue or popularity version. The index is
+then rebuilt by a background thread while lookups keep using the previous
+snapshot (``AUTOCOMPLETE_BACKGROUND``; only the very first build blocks).
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field, replace
+from typing import Iterable
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.urls import reverse
+
+from .cache import get_catalogue_version
+from .models import Movie, MoviePopularity
+from .popularity import get_popularity_version
+from .search import _TOKEN_RE
+
+logger = logging.getLogger(__name__)
+
+RANGE_LIMIT = 256
+TITLE, OTHER = 0, 1
+UNRANKED = float("-inf")
+# Sorts after every character a normalized term can contain.
+PREFIX_END = "\U0010ffff"
+
+MOVIE_FIELDS = (
+    "pk",
+    "title",
+    "slug",
+    "release_year",
+    "poster_url",
+    "tagline",
+    "cached_category_names",
+    "cached_language_names",
+)
+
+
+def max_suggestions() -> int:
+    return getattr(settings, "AUTOCOMPLETE_MAX_SUGGESTIONS", 10)
+
+
+def normalize(text: str) -> str:
+    """Lower-case, accent-free words separated by single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_TOKEN_RE.findall(stripped.casefold()))
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    title: str
+    slug: str
+    release_year: int | None
+    poster_url: str
+
+    def as_json(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "slug": self.slug,
+            "url": reverse("movies:movie_detail", kwargs={"slug": self.slug}),
+            "release_year": self.release_year,
+            "poster_url": self.poster_url,
+        }
+
+
+def _suggestion(row: dict) -> Suggestion:
+    return Suggestion(row["pk"], row["title"], row["slug"], row["release_year"], row["poster_url"])
+
+
+def _movie_terms(row: dict) -> set[tuple[str, int]]:
+    terms: dict[str, int] = {}
+    words = normalize(row["title"]).split()
+    for start in range(len(words)):
+        terms[" ".join(words[start:])] = TITLE
+    for text in (row["tagline"], *row["cached_category_names"], *row["cached_language_names"]):
+        for word in normalize(text).split():
+            terms.setdefault(word, OTHER)
+    return set(terms.items())
+
+
+def _by_key(item):
+    return item[1]
+
+
+@dataclass
+class _Snapshot:
+    catalogue_version: int | None = None
+    popularity_version: int | None = None
+    movies: dict[int, Suggestion] = field(default_factory=dict)
+    scores: dict[int, float] = field(default_factory=dict)
+    # Sorted (term, kind, movie id) triples, searched with bisect.
+    terms: list[tuple[str, int, int]] = field(default_factory=list)
+    terms_by_movie: dict[int, set[tuple[str, int]]] = field(default_factory=dict)
+    # Best movies, with their rank keys, for every prefix matching more
+    # than RANGE_LIMIT terms.
+    top: dict[str, dict[int, tuple]] = field(default_factory=dict)
+    # The same for terms that are shared by more than RANGE_LIMIT movies as
+    # a whole word ("english", "drama"), which a heavy prefix merges in.
+    whole: dict[str, dict[int, tuple]] = field(default_factory=dict)
+
+    def span(self, prefix: str, start: int = 0) -> tuple[int, int]:
+        start = bisect_left(self.terms, (prefix,), start)
+        return start, bisect_left(self.terms, (prefix + PREFIX_END,), start)
+
+    def candidates(self, start: int, end: int, limit: int) -> dict[int, tuple]:
+        """The ``limit`` best movies among ``terms[start:end]``, best first."""
+        best: dict[int, tuple] = {}
+        for _, kind, movie_id in self.terms[start:end]:
+            key = (kind, -self.scores.get(movie_id, UNRANKED), self.movies[movie_id].title, movie_id)
+            if movie_id not in best or key < best[movie_id]:
+                best[movie_id] = key
+        return dict(heapq.nsmallest(limit, best.items(), key=_by_key))
+
+    def ranked(self, prefix: str, limit: int) -> list[int]:
+        best = self.top.get(prefix)
+        if best is None:
+            best = self.candidates(*self.span(prefix), limit)
+        return list(best)[:limit]
+
+    def precompute(self, prefix: str, start: int, end: int, limit: int, deep: bool = True) -> dict[int, tuple]:
+        """Rank ``terms[start:end]`` (all starting with ``prefix``), storing heavy prefixes in ``top``.
+
+        A heavy prefix is ranked by merging the rankings of its one-character
+        extensions, so every term is scanned once however deep the prefix.
+        With ``deep=False`` heavy extensions reuse their rankings in ``top``.
+        """
+        if end - start <= RANGE_LIMIT:
+            return self.candidates(start, end, limit)
+        best: dict[int, tuple] = {}
+        position = start
+        while position < end:
+            term = self.terms[position][0]
+            if len(term) == len(prefix):
+                # Terms equal to the prefix itself sort first.
+                child_end = bisect_left(self.terms, (prefix, OTHER + 1), position, end)
+                if not deep and prefix in self.whole:
+                    child = self.whole[prefix]
+                else:
+                    child = self.candidates(position, child_end, limit)
+                    if child_end - position > RANGE_LIMIT:
+                        self.whole[prefix] = child
+            else:
+                child_prefix = term[: len(prefix) + 1]
+                child_end = bisect_left(self.terms, (child_prefix + PREFIX_END,), position, end)
+                if not deep and child_prefix in self.top:
+                    child = self.top[child_prefix]
+                else:
+                    child = self.precompute(child_prefix, position, child_end, limit, deep)
+            for movie_id, key in child.items():
+                if movie_id not in best or key < best[movie_id]:
+                    best[movie_id] = key
+            position = child_end
+        ranked = dict(heapq.nsmallest(limit, best.items(), key=_by_key))
+        if prefix:
+            self.top[prefix] = ranked
+        return ranked
+
+
+class PrefixIndex:
+    """Typeahead over the live catalogue; lookups are lock-free over immutable snapshots."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot()
+        self._worker: threading.Thread | None = None
+
+    @property
+    def background(self) -> bool:
+        return getattr(settings, "AUTOCOMPLETE_BACKGROUND", True)
+
+    def suggest(self, query: str, limit: int | None = None) -> list[Suggestion]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit or max_suggestions(), max_suggestions())
+        snapshot = self._current()
+        return [snapshot.movies[movie_id] for movie_id in snapshot.ranked(prefix, limit)]
+
+    def refresh_movies(self, movie_ids: Iterable[int]) -> None:
+        """Re-index ``movie_ids`` right after this process committed a change to them.
+
+        Runs after the change bumped the catalogue version; if the index had
+        missed any other bump in between, it is left stale and rebuilt.
+        """
+        movie_ids = set(movie_ids)
+        with self._lock:
+            current = self._snapshot
+            version = get_catalogue_version()
+            if current.catalogue_version is None or current.catalogue_version != version - 1:
+                return
+            rows = list(Movie.live.filter(pk__in=movie_ids).values(*MOVIE_FIELDS))
+            snapshot = replace(
+                current,
+                catalogue_version=version,
+                movies=dict(current.movies),
+                terms=list(current.terms),
+                terms_by_movie=dict(current.terms_by_movie),
+                top=dict(current.top),
+                whole=dict(current.whole),
+            )
+            touched = set()
+            for movie_id in movie_ids:
+                snapshot.movies.pop(movie_id, None)
+                for term, kind in snapshot.terms_by_movie.pop(movie_id, ()):
+                    del snapshot.terms[bisect_left(snapshot.terms, (term, kind, movie_id))]
+                    touched.add(term)
+            for row in rows:
+                snapshot.movies[row["pk"]] = _suggestion(row)
+                snapshot.terms_by_movie[row["pk"]] = _movie_terms(row)
+                for term, kind in snapshot.terms_by_movie[row["pk"]]:
+                    insort(snapshot.terms, (term, kind, row["pk"]))
+                    touched.add(term)
+            # Re-rank the heavy prefixes of the touched terms, longest first,
+            # so each one merges its already updated extensions.
+            prefixes = {term[:length] for term in touched for length in range(1, len(term) + 1)}
+            for term in touched:
+                snapshot.whole.pop(term, None)
+            for prefix in sorted(prefixes, key=len, reverse=True):
+                start, end = snapshot.span(prefix)
+                if end - start > RANGE_LIMIT:
+                    snapshot.precompute(prefix, start, end, max_suggestions(), deep=False)
+                else:
+                    snapshot.top.pop(prefix, None)
+            self._snapshot = snapshot
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot.catalogue_version is None or not self.background:
+            return self.rebuild()
+        if self._stale(snapshot):
+            self._start_worker()
+        return snapshot
+
+    @staticmethod
+    def _stale(snapshot: _Snapshot) -> bool:
+        return (snapshot.catalogue_version, snapshot.popularity_version) != (
+            get_catalogue_version(),
+            get_popularity_version(),
+        )
+
+    def rebuild(self) -> _Snapshot:
+        """Bring the index up to date with the catalogue and popularity versions."""
+        with self._lock:
+            snapshot = self._snapshot
+            catalogue_version, popularity_version = get_catalogue_version(), get_popularity_version()
+            if snapshot.catalogue_version != catalogue_version:
+                snapshot = _load(catalogue_version)
+            if snapshot.popularity_version != popularity_version:
+                snapshot = _rerank(snapshot, popularity_version)
+            self._snapshot = snapshot
+        return snapshot
+
+    def _start_worker(self) -> None:
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="PrefixIndexRebuild", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        close_old_connections()
+        try:
+            self.rebuild()
+        except DatabaseError:
+            logger.exception("Could not rebuild the autocomplete index")
+        finally:
+            connections.close_all()
+
+
+def _load(catalogue_version: int) -> _Snapshot:
+    snapshot = _Snapshot(catalogue_version=catalogue_version)
+    for row in Movie.live.order_by().values(*MOVIE_FIELDS).iterator(chunk_size=2000):
+        snapshot.movies[row["pk"]] = _suggestion(row)
+        snapshot.terms_by_movie[row["pk"]] = _movie_terms(row)
+        snapshot.terms.extend((term, kind, row["pk"]) for term, kind in snapshot.terms_by_movie[row["pk"]])
+    snapshot.terms.sort()
+    return snapshot
+
+
+def _rerank(snapshot: _Snapshot, popularity_version: int) -> _Snapshot:
+    snapshot = replace(
+        snapshot,
+        popularity_version=popularity_version,
+        scores=dict(MoviePopularity.objects.values_list("movie_id", "log_score")),
+        top={},
+        whole={},
+    )
+    snapshot.precompute("", 0, len(snapshot.terms), max_suggestions())
+    return snapshot
+
+
+index = PrefixIndex()
@@ -0,0 +1,431 @@
+"""Synthetic-catalogue benchmarks for every public and account view.
+
+``seed_catalogue`` fills the current database with a synthetic catalogue
+using bulk inserts only; ``run_benchmarks`` replays each scenario through the
+Django test client and reports query count, wall time and peak Python memory.
+Both are driven by ``manage.py benchmark_views``, which runs them against a
+throwaway test database and writes the results as JSON so runs can be diffed.
+
+``run_load_benchmark`` (``manage.py benchmark_load``) instead fires many
+concurrent requests at a few scenarios, once through the WSGI handler from a
+thread pool and once through the ASGI handler with the async views from
+asyncio tasks, and reports throughput and latency percentiles for both.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+
+from core.models import DownloadHistory, FavoriteMovie, UserProfile
+from core.tracking import discard_pending
+from payments.models import FrequentlyQuestionAndAnswer, Plan, PlanFeature, PlanFeatureAssignment, Subscription
+
+from . import search
+from .models import Category, Comment, Language, Movie
+from .related import refresh_related_movies
+
+DEFAULT_SCALE = {
+    "movies": 50_000,
+    "categories": 200,
+    "languages": 50,
+    "comments": 1_000_000,
+    "users": 100_000,
+}
+
+BENCHMARK_USERNAME = "benchmark@example.com"
+BENCHMARK_PASSWORD = "benchmark-password"
+
+WORDS = (
+    "night city lost river dark star empire shadow dream storm blood heart king queen "
+    "war love ghost ocean fire silent last return secret game road summer winter"
+).split()
+
+
+def _title(rng: random.Random, index: int) -> str:
+    return f"{' '.join(rng.sample(WORDS, 3)).title()} {index}"
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_catalogue(
+    movies: int,
+    categories: int,
+    languages: int,
+    comments: int,
+    users: int,
+    batch_size: int = 5000,
+    seed: int = 42,
+    log=lambda message: None,
+) -> dict:
+    """Bulk-insert a synthetic catalogue; returns handles used by the scenarios."""
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    Category.objects.bulk_create(
+        [Category(name=f"Category {index}", slug=f"category-{index}") for index in range(categories)]
+    )
+    Language.objects.bulk_create(
+        [Language(name=f"Language {index}", slug=f"language-{index}") for index in range(languages)]
+    )
+    category_rows = list(Category.objects.values_list("pk", "name"))
+    language_rows = list(Language.objects.values_list("pk", "name"))
+    log(f"Seeded {categories} categories and {languages} languages")
+
+    qualities = [code for code, _ in Movie.QUALITY_CHOICES]
+    category_through = Movie.categories.through
+    language_through = Movie.languages.through
+    for start in range(0, movies, batch_size):
+        stop = min(start + batch_size, movies)
+        batch, assignments = [], []
+        for index in range(start, stop):
+            movie_categories = rng.sample(category_rows, k=min(len(category_rows), rng.randint(1, 3)))
+            movie_languages = rng.sample(language_rows, k=min(len(language_rows), rng.randint(1, 2)))
+            release = date(1980, 1, 1) + timedelta(days=rng.randint(0, 45 * 365))
+            batch.append(
+                Movie(
+                    title=_title(rng, index),
+                    slug=f"movie-{index}",
+                    tagline=" ".join(rng.sample(WORDS, 5)),
+                    description=" ".join(rng.choices(WORDS, k=60)),
+                    release_year=release.year,
+                    release_date=release,
+                    duration_minutes=rng.randint(80, 180),
+                    rating=f"{rng.uniform(1, 10):.1f}",
+                    quality=rng.choice(qualities),
+                    is_trending=rng.random() < 0.01,
+                    cached_category_names=sorted(name for _, name in movie_categories),
+                    cached_language_names=sorted(name for _, name in movie_languages),
+                )
+            )
+            assignments.append((movie_categories, movie_languages))
+        created = Movie.objects.bulk_create(batch)
+        category_through.objects.bulk_create(
+            [
+                category_through(movie_id=movie.pk, category_id=category_id)
+                for movie, (movie_categories, _) in zip(created, assignments)
+                for category_id, _ in movie_categories
+            ]
+        )
+        language_through.objects.bulk_create(
+            [
+                language_through(movie_id=movie.pk, language_id=language_id)
+                for movie, (_, movie_languages) in zip(created, assignments)
+                for language_id, _ in movie_languages
+            ]
+        )
+        log(f"Seeded {stop}/{movies} movies")
+
+    search.rebuild_index()
+    movie_ids = list(Movie.objects.order_by("pk").values_list("pk", flat=True))
+
+    # Skew comments towards a handful of "popular" titles like real traffic.
+    popular_ids = movie_ids[:: max(1, len(movie_ids) // 50)]
+    comment_rows = (
+        Comment(
+            movie_id=rng.choice(popular_ids) if rng.random() < 0.5 else rng.choice(movie_ids),
+            name=f"Viewer {index}",
+            body=" ".join(rng.choices(WORDS, k=20)),
+            is_approved=rng.random() < 0.95,
+        )
+        for index in range(comments)
+    )
+    for count, batch in enumerate(_batched(comment_rows, batch_size), start=1):
+        Comment.objects.bulk_create(batch)
+        log(f"Seeded {min(count * batch_size, comments)}/{comments} comments")
+
+    User = get_user_model()
+    password = make_password(BENCHMARK_PASSWORD)
+    user_rows = (
+        User(username=f"user{index}@example.com", email=f"user{index}@example.com", password=password)
+        for index in range(users)
+    )
+    for batch in _batched(user_rows, batch_size):
+        User.objects.bulk_create(batch)
+    user = User.objects.create_user(BENCHMARK_USERNAME, BENCHMARK_USERNAME, BENCHMARK_PASSWORD)
+    existing = set(UserProfile.objects.values_list("user_id", flat=True))
+    for batch in _batched(User.objects.values_list("pk", flat=True).iterator(chunk_size=batch_size), batch_size):
+        UserProfile.objects.bulk_create([UserProfile(user_id=pk) for pk in batch if pk not in existing])
+        Subscription.objects.bulk_create([Subscription(user_id=pk) for pk in batch], ignore_conflicts=True)
+    log(f"Seeded {users} users")
+
+    features = PlanFeature.objects.bulk_create([PlanFeature(name=f"Feature {index}") for index in range(8)])
+    for order, (title, price) in enumerate((("Basic", "4.99"), ("Standard", "9.99"), ("Premium", "14.99"))):
+        plan = Plan.objects.create(title=title, price=price, display_order=order)
+        PlanFeatureAssignment.objects.bulk_create(
+            [
+                PlanFeatureAssignment(plan=plan, feature=feature, is_included=index <= order * 3, display_order=index)
+                for index, feature in enumerate(features)
+            ]
+        )
+    FrequentlyQuestionAndAnswer.objects.bulk_create(
+        [FrequentlyQuestionAndAnswer(question=f"Question {index}?", answer="Answer.") for index in range(10)]
+    )
+
+    history_movies = rng.sample(movie_ids, k=min(len(movie_ids), 200))
+    DownloadHistory.objects.bulk_create(
+        [
+            DownloadHistory(user=user, movie_id=movie_id, downloaded_at=now - timedelta(hours=index))
+            for index, movie_id in enumerate(history_movies)
+        ]
+    )
+    FavoriteMovie.objects.bulk_create([FavoriteMovie(user=user, movie_id=movie_id) for movie_id in history_movies[:100]])
+
+    sample_movies = popular_ids[:5]
+    refresh_related_movies(sample_movies, cascade=False)
+    return {
+        "detail_slugs": list(Movie.objects.filter(pk__in=sample_movies).values_list("slug", flat=True)),
+        "category_slug": Category.objects.values_list("slug", flat=True).first(),
+        "language_slug": Language.objects.values_list("slug", flat=True).first(),
+    }
+
+
+@dataclass
+class Scenario:
+    name: str
+    url: str
+    params: dict | None = None
+    login: bool = False
+
+
+def build_scenarios(handles: dict) -> list[Scenario]:
+    slug = handles["detail_slugs"][0]
+    search_url = reverse("movies:search")
+    return [
+        Scenario("home", reverse("movies:home")),
+        Scenario("movie_detail", reverse("movies:movie_detail", kwargs={"slug": slug})),
+        Scenario("movie_comments", reverse("movies:movie_comments", kwargs={"slug": slug})),
+        Scenario("movie_download", reverse("movies:movie_download", kwargs={"slug": slug})),
+        Scenario("movie_search:empty", search_url),
+        Scenario("movie_search:query", search_url, {"q": "night star"}),
+        Scenario("movie_search:category", search_url, {"categories": handles["category_slug"]}),
+        Scenario("movie_search:language", search_url, {"languages": handles["language_slug"]}),
+        Scenario("movie_search:year-range", search_url, {"year": "1990-1999", "sort": "rating-high"}),
+        Scenario(
+            "movie_search:combined",
+            search_url,
+            {
+                "q": "dark",
+                "categories": handles["category_slug"],
+                "qualities": ["HD", "FHD"],
+                "sort": "name-asc",
+            },
+        ),
+        Scenario("movie_suggest", reverse("movies:suggest"), {"q": "nig"}),
+        Scenario("movie_suggest:long", reverse("movies:suggest"), {"q": "night st"}),
+        Scenario("SubscriptionView", reverse("payments:plan")),
+        Scenario("ProfileView", reverse("core:profile"), login=True),
+        Scenario("DownloadHistoryView", reverse("core:download_history"), login=True),
+        Scenario("FavoritesView", reverse("core:favorites"), login=True),
+        Scenario("AccountSubscriptionView", reverse("core:subscription"), login=True),
+    ]
+
+
+def _measure(client: Client, scenario: Scenario) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(scenario.url, scenario.params or {})
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "status": response.status_code,
+        "queries": len(captured.captured_queries),
+        "sql_ms": sum(float(query["time"]) for query in captured.captured_queries) * 1000,
+        "wall_ms": elapsed * 1000,
+        "peak_kib": peak / 1024,
+        "bytes": len(response.content),
+    }
+
+
+def _summary(samples: list[dict]) -> dict:
+    wall = sorted(sample["wall_ms"] for sample in samples)
+    p95_index = min(len(wall) - 1, int(round(0.95 * (len(wall) - 1))))
+    return {
+        "queries": max(sample["queries"] for sample in samples),
+        "sql_ms_median": round(statistics.median(sample["sql_ms"] for sample in samples), 3),
+        "wall_ms_median": round(statistics.median(wall), 3),
+        "wall_ms_p95": round(wall[p95_index], 3),
+        "wall_ms_min": round(wall[0], 3),
+        "peak_kib_max": round(max(sample["peak_kib"] for sample in samples), 1),
+        "bytes": samples[-1]["bytes"],
+    }
+
+
+# Scenarios clear the cache between runs, so they get one of their own rather
+# than emptying the cache shared with the running site.
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cinehub-benchmarks",
+    }
+}
+
+
+@override_settings(CACHES=BENCHMARK_CACHES)
+def run_benchmarks(handles: dict, iterations: int = 20, only: list[str] | None = None) -> list[dict]:
+    anonymous = Client()
+    member = Client()
+    member.login(username=BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD)
+
+    results = []
+    for scenario in build_scenarios(handles):
+        if only and not any(scenario.name.startswith(prefix) for prefix in only):
+            continue
+        client = member if scenario.login else anonymous
+        cache.clear()
+        cold = _measure(client, scenario)
+        warm = [_measure(client, scenario) for _ in range(iterations)]
+        discard_pending()
+        results.append(
+            {
+                "name": scenario.name,
+                "url": scenario.url,
+                "params": scenario.params or {},
+                "status": cold["status"],
+                "cold": {key: round(value, 3) for key, value in cold.items() if key != "status"},
+                "warm": _summary(warm),
+            }
+        )
+    return results
+
+
+# Pages with an async twin; the load benchmark only drives these.
+LOAD_SCENARIOS = ("home", "movie_detail", "movie_download", "movie_search:query", "SubscriptionView")
+# URL modules that pick their views from ``settings.ASYNC_VIEWS`` at import.
+ASYNC_VIEW_URLCONFS = ("movies.urls", "payments.urls", "CineHub.urls")
+
+
+def _reload_urlconfs() -> None:
+    for name in ASYNC_VIEW_URLCONFS:
+        importlib.reload(importlib.import_module(name))
+    clear_url_caches()
+
+
+@contextmanager
+def serving_async_views(enabled: bool = True):
+    """Route the catalogue URLs to the async (or sync) views in this process."""
+    try:
+        with override_settings(ASYNC_VIEWS=enabled):
+            _reload_urlconfs()
+            yield
+    finally:
+        _reload_urlconfs()
+
+
+def _load_summary(latencies: list[float], statuses: list[int], seconds: float) -> dict:
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))] * 1000, 3)
+
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "latency_ms_p50": percentile(0.50),
+        "latency_ms_p95": percentile(0.95),
+        "latency_ms_p99": percentile(0.99),
+    }
+
+
+def _wsgi_load(scenario: Scenario, concurrency: int, total: int) -> dict:
+    local = threading.local()
+    latencies, statuses = [], []
+
+    def fetch(_):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = Client()
+        started = time.perf_counter()
+        response = client.get(scenario.url, scenario.params or {})
+        latencies.append(time.perf_counter() - started)
+        statuses.append(response.status_code)
+
+    def close_connections(_):
+        connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, range(total)))
+        seconds = time.perf_counter() - started
+        list(pool.map(close_connections, range(concurrency)))
+    return _load_summary(latencies, statuses, seconds)
+
+
+async def _asgi_load(scenario: Scenario, concurrency: int, total: int) -> dict:
+    client = AsyncClient()
+    latencies, statuses = [], []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(scenario.url, scenario.params or {})
+            latencies.append(time.perf_counter() - started)
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _load_summary(latencies, statuses, time.perf_counter() - started)
+
+
+@override_settings(CACHES=BENCHMARK_CACHES)
+def run_load_benchmark(
+    handles: dict,
+    concurrency: int = 64,
+    requests: int = 500,
+    only: list[str] | None = None,
+) -> list[dict]:
+    """Compare WSGI and ASGI throughput per scenario at ``concurrency`` in flight."""
+    scenarios = [scenario for scenario in build_scenarios(handles) if scenario.name in LOAD_SCENARIOS]
+    results = []
+    for scenario in scenarios:
+        if only and not any(scenario.name.startswith(prefix) for prefix in only):
+            continue
+        cache.clear()
+        with serving_async_views(False):
+            Client().get(scenario.url, scenario.params or {})
+            wsgi = _wsgi_load(scenario, concurrency, requests)
+        with serving_async_views(True):
+            asgi = asyncio.run(_asgi_load(scenario, concurrency, requests))
+        discard_pending()
+        results.append(
+            {
+                "name": scenario.name,
+                "url": scenario.url,
+                "params": scenario.params or {},
+                "concurrency": concurrency,
+                "wsgi": wsgi,
+                "asgi": asgi,
+            }
+        )
+    return results
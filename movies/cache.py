@@ -0,0 +1,64 @@
+"""Catalogue-wide cache versioning.
+
+Every cached catalogue artefact (facet counts, home page blocks, ...) embeds
+the current catalogue version in its key. Editing a ``Movie``, ``Category``
+or ``Language`` bumps the version (see ``movies.signals``), which orphans the
+old entries instead of hunting them down one by one. The version lives in
+the shared cache (see ``CACHES``), so a bump in one worker process
+invalidates the entries of every other one.
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.replicas import reading_primary
+
+CATALOGUE_VERSION_KEY = "movies:catalogue-version"
+HOME_CACHE_TIMEOUT = getattr(settings, "HOME_CACHE_TIMEOUT", 60 * 60)
+
+
+def get_catalogue_version() -> int:
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Seed with a timestamp so a flushed cache never reuses an old version.
+        version = int(time.time() * 1000)
+        if not cache.add(CATALOGUE_VERSION_KEY, version, timeout=None):
+            version = cache.get(CATALOGUE_VERSION_KEY, version)
+    return version
+
+
+def bump_catalogue_version() -> None:
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        get_catalogue_version()
+
+
+def catalogue_key(*parts) -> str:
+    """Build a cache key scoped to the current catalogue version."""
+    return ":".join(["movies", str(get_catalogue_version()), *map(str, parts)])
+
+
+def cached_catalogue(name: str, loader, timeout: int = HOME_CACHE_TIMEOUT):
+    """Return ``list(loader())`` from the cache, computing it on a miss."""
+    key = catalogue_key(name)
+    value = cache.get(key)
+    if value is None:
+        with reading_primary():
+            value = list(loader())
+        cache.set(key, value, timeout)
+    return value
+
+
+async def acached_catalogue(name: str, loader, timeout: int = HOME_CACHE_TIMEOUT):
+    """Async ``cached_catalogue``; ``loader`` is a coroutine function returning a list."""
+    key = catalogue_key(name)
+    value = cache.get(key)
+    if value is None:
+        with reading_primary():
+            value = await loader()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,116 @@
+"""Incremental NDJSON export of the live catalogue.
+
+Movies are read with ``.iterator(chunk_size=...)`` and their categories and
+languages prefetched one chunk at a time, so memory stays flat whatever the
+catalogue size. Each movie becomes one JSON line, written as soon as its
+chunk is loaded.
+
+Exports are windowed by ``updated_at``: ``export_window(since)`` fixes the
+upper bound when the export starts, and that bound is handed back to the
+caller (the ``X-Export-Until`` header or the command's summary) to pass as
+``since`` next time. Incremental exports also emit a ``{"removed": true}``
+line for movies that were deactivated or soft-deleted in the window.
+
+Renaming, re-slugging or deactivating a category or language bumps the
+``updated_at`` of its movies (see ``refresh_name_caches``), so they are
+re-sent with the new taxonomy. Hard-deleted movies leave no row behind and
+are never reported: the catalogue retires movies with ``is_deleted``, and a
+consumer that must also catch hard deletes has to reconcile against a full
+export.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Category, Language, Movie
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FIELDS = (
+    "id",
+    "slug",
+    "title",
+    "tagline",
+    "description",
+    "poster_url",
+    "banner_url",
+    "release_year",
+    "release_date",
+    "duration_minutes",
+    "rating",
+    "imdb_rating",
+    "quality",
+    "is_trending",
+    "is_featured",
+    "trailer_url",
+    "download_url",
+    "download_options",
+    "server_options",
+    "screenshots",
+    "updated_at",
+)
+
+
+@dataclass(frozen=True)
+class ExportWindow:
+    since: datetime | None
+    until: datetime | None
+
+
+def parse_since(value: str | None) -> datetime | None:
+    """Parse an ISO 8601 ``since`` value; naive values are taken as UTC."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def export_window(since: datetime | None = None) -> ExportWindow:
+    """Pin the upper bound so rows edited mid-export land in the next window."""
+    until = Movie.objects.aggregate(until=Max("updated_at"))["until"]
+    if since is not None and (until is None or until < since):
+        until = since
+    return ExportWindow(since, until)
+
+
+def export_queryset(window: ExportWindow):
+    movies = Movie.objects.all()
+    if window.since is not None:
+        movies = movies.filter(updated_at__gt=window.since)
+    else:
+        movies = movies.live()
+    if window.until is not None:
+        movies = movies.filter(updated_at__lte=window.until)
+    return movies.prefetch_related(
+        Prefetch("categories", queryset=Category.objects.filter(is_active=True).only("slug", "name")),
+        Prefetch("languages", queryset=Language.objects.filter(is_active=True).only("slug", "name")),
+    ).order_by("updated_at", "pk")
+
+
+def movie_record(movie: Movie) -> dict:
+    if not movie.is_active or movie.is_deleted:
+        return {"id": movie.pk, "slug": movie.slug, "updated_at": movie.updated_at, "removed": True}
+    record = {name: getattr(movie, name) for name in EXPORT_FIELDS}
+    record["categories"] = [{"slug": item.slug, "name": item.name} for item in movie.categories.all()]
+    record["languages"] = [{"slug": item.slug, "name": item.name} for item in movie.languages.all()]
+    return record
+
+
+def iter_ndjson(window: ExportWindow, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for movie in export_queryset(window).iterator(chunk_size=chunk_size):
+        yield encoder.encode(movie_record(movie)) + "\n"
+
+
+def format_until(window: ExportWindow) -> str:
+    return window.until.isoformat() if window.until else ""
@@ -0,0 +1,78 @@
+"""Faceted counts for the search sidebar.
+
+Counts are "disjunctive": every facet is counted against all *other* active
+filters, so ticking one category still shows how many titles each sibling
+category would add. A cache miss costs one aggregate query per facet (four
+in total); hits are served from the cache until the catalogue version moves.
+"""
+from __future__ import annotations
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.replicas import reading_primary
+
+from .cache import catalogue_key
+from .filters import canonical_state, filter_movies
+from .models import Category, Language, Movie
+
+FACET_CACHE_TIMEOUT = getattr(settings, "FACET_CACHE_TIMEOUT", 60 * 60)
+
+
+def _scope(state: dict, exclude: str):
+    """Movies matching every active filter except ``exclude`` (``None`` = whole catalogue)."""
+    if not any(value for key, value in canonical_state(state, exclude=(exclude,))):
+        return None
+    return filter_movies(Movie.live.order_by(), state, exclude=(exclude,)).values("pk")
+
+
+def _related_counts(model, state: dict, facet: str) -> list[dict]:
+    scope = _scope(state, facet)
+    if scope is not None:
+        counted = Q(movies__in=scope)
+    else:
+        counted = Q(movies__is_active=True, movies__is_deleted=False)
+    return list(
+        model.objects.filter(is_active=True)
+        .annotate(count=Count("movies", filter=counted))
+        .order_by("name")
+        .values("slug", "name", "count")
+    )
+
+
+def _field_counts(state: dict, facet: str, field: str) -> dict:
+    scope = _scope(state, facet)
+    movies = Movie.live.filter(pk__in=scope) if scope is not None else Movie.live.all()
+    return dict(movies.order_by().values_list(field).annotate(count=Count("pk")))
+
+
+def compute_facets(state: dict) -> dict:
+    quality_counts = _field_counts(state, "qualities", "quality")
+    year_counts = _field_counts(state, "year", "release_year")
+    return {
+        "categories": _related_counts(Category, state, "categories"),
+        "languages": _related_counts(Language, state, "languages"),
+        "qualities": [
+            {"value": value, "label": label, "count": quality_counts.get(value, 0)}
+            for value, label in Movie.QUALITY_CHOICES
+        ],
+        "years": [
+            {"value": year, "count": year_counts[year]}
+            for year in sorted(year_counts, reverse=True)
+        ],
+    }
+
+
+def facet_counts(state: dict) -> dict:
+    """Return cached facet counts for ``state`` (sort order is ignored)."""
+    digest = hashlib.md5(repr(canonical_state(state)).encode("utf-8")).hexdigest()
+    key = catalogue_key("facets", digest)
+    facets = cache.get(key)
+    if facets is None:
+        with reading_primary():
+            facets = compute_facets(state)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,100 @@
+"""Search/filter state shared by the search page, its JSON API and the facets."""
+from __future__ import annotations
+
+import re
+
+from django.db.models import QuerySet
+
+from .search import search_movies
+
+SEARCH_SORT_MAPPING = {
+    "relevance": ("-search_rank", "-release_date"),
+    "latest": ("-release_date", "-created_at"),
+    "trending": ("-trending_score", "-is_trending", "-release_date"),
+    "rating-high": ("-rating", "-release_date"),
+    "rating-low": ("rating", "-release_date"),
+    "name-asc": ("title",),
+    "name-desc": ("-title",),
+}
+
+FILTER_KEYS = ("query", "categories", "languages", "year", "qualities")
+
+# A single year or a "start-end" range, as offered by the year filter.
+YEAR_PATTERN = re.compile(r"\d{1,4}(-\d{1,4})?", re.ASCII)
+
+
+def parse_search_state(params) -> dict:
+    """Normalise the search/filter query string into a plain dict."""
+    query = params.get("q", "").strip()
+    active_sort = params.get("sort", "relevance" if query else "latest")
+    if active_sort not in SEARCH_SORT_MAPPING or (active_sort == "relevance" and not query):
+        active_sort = "latest"
+    return {
+        "query": query,
+        "categories": _clean(params.getlist("categories"), str.lower),
+        "languages": _clean(params.getlist("languages"), str.lower),
+        "year": _clean_year(params.get("year", "")),
+        "qualities": _clean(params.getlist("qualities"), str.upper),
+        "sort": active_sort,
+    }
+
+
+def _clean(values: list[str], case) -> list[str]:
+    # Slugs are lower-case and quality codes upper-case; normalising them here
+    # keeps the results in line with the case-insensitive cache keys below.
+    return sorted({case(value.strip()) for value in values if value.strip()})
+
+
+def _clean_year(value: str) -> str:
+    # A malformed year is dropped like an unknown sort, not turned into a 500.
+    value = value.strip()
+    return value if YEAR_PATTERN.fullmatch(value) else ""
+
+
+def canonical_state(state: dict, exclude: tuple[str, ...] = ()) -> tuple:
+    """Hashable, order-insensitive form of the filters in ``state``.
+
+    ``exclude`` drops filter keys, which the facet engine uses to count a
+    facet against every *other* active filter.
+    """
+    canonical = []
+    for key in FILTER_KEYS:
+        if key in exclude:
+            continue
+        value = state.get(key)
+        if isinstance(value, (list, tuple)):
+            value = tuple(sorted({item.strip().lower() for item in value if item.strip()}))
+        else:
+            value = (value or "").strip().lower()
+        canonical.append((key, value))
+    return tuple(canonical)
+
+
+def filter_movies(queryset: QuerySet, state: dict, exclude: tuple[str, ...] = ()) -> QuerySet:
+    """Apply every filter in ``state`` (except those in ``exclude``) to ``queryset``."""
+    if state["query"] and "query" not in exclude:
+        queryset = search_movies(queryset, state["query"])
+
+    # Inactive categories and languages are hidden from the public, so they
+    # cannot be used to browse either.
+    if state["categories"] and "categories" not in exclude:
+        queryset = queryset.filter(
+            categories__slug__in=state["categories"], categories__is_active=True
+        ).distinct()
+
+    if state["languages"] and "languages" not in exclude:
+        queryset = queryset.filter(
+            languages__slug__in=state["languages"], languages__is_active=True
+        ).distinct()
+
+    active_year = state["year"]
+    if active_year and "year" not in exclude:
+        if "-" in active_year:
+            start_year, end_year = (int(value) for value in active_year.split("-", 1))
+            queryset = queryset.filter(release_year__gte=start_year, release_year__lte=end_year)
+        else:
+            queryset = queryset.filter(release_year=int(active_year))
+
+    if state["qualities"] and "qualities" not in exclude:
+        queryset = queryset.filter(quality__in=state["qualities"])
+    return queryset
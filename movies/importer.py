@@ -0,0 +1,351 @@
+"""Streaming bulk import of movie catalogues from JSONL or CSV files.
+
+Records are read one at a time and written in batches: each batch resolves
+categories and languages through in-memory slug maps, allocates unique slugs
+with two queries, then ``bulk_create``/``bulk_update``s the movies and
+bulk-inserts their M2M through rows inside one transaction. Bulk writes skip
+the model signals, so the batch also fills the denormalized name columns and
+the search index itself; the imported movies' related rankings and the
+catalogue cache version are refreshed once at the end.
+
+After every committed batch the number of consumed records is written to a
+checkpoint file, so an interrupted import can be continued with ``resume``.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import search
+from .cache import bump_catalogue_version
+from .models import Category, Language, Movie
+from .related import rebuild_related_movies, refresh_related_movies
+
+IMPORT_FIELDS = (
+    "title",
+    "tagline",
+    "description",
+    "poster_url",
+    "banner_url",
+    "release_year",
+    "release_date",
+    "duration_minutes",
+    "rating",
+    "imdb_rating",
+    "download_url",
+    "download_options",
+    "server_options",
+    "trailer_url",
+    "is_trending",
+    "is_featured",
+    "screenshots",
+    "quality",
+    "is_active",
+)
+REQUIRED_FIELDS = ("title", "release_year", "duration_minutes")
+JSON_FIELDS = ("download_options", "server_options", "screenshots")
+# CSV files list several categories or languages in one cell.
+CSV_LIST_SEPARATOR = "|"
+# Only the first rejected rows are kept for the report; the rest are counted.
+MAX_REPORTED_ERRORS = 100
+
+
+class CatalogueImportError(Exception):
+    """Raised when the input file or checkpoint cannot be used."""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    records: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+    # Ids of every created or updated movie, for the related-movie refresh.
+    movie_ids: set = field(default_factory=set)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    raise CatalogueImportError(f"Cannot tell the format of {path}; pass --format jsonl or csv.")
+
+
+def read_records(path: str, file_format: str) -> Iterator[tuple[int, dict]]:
+    """Yield ``(line number, record)`` pairs without loading the whole file."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if file_format == "csv":
+            reader = csv.DictReader(handle)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, {"__error__": f"invalid JSON: {exc.msg}"}
+
+
+def _names(value) -> list[str]:
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(CSV_LIST_SEPARATOR) if part.strip()]
+    return [str(part).strip() for part in value if str(part).strip()]
+
+
+class TaxonomyMap:
+    """Slug -> ``(pk, name)`` lookup for categories or languages."""
+
+    def __init__(self, model, create_missing: bool = False):
+        self.model = model
+        self.create_missing = create_missing
+        self.by_slug = {slug: (pk, name) for pk, slug, name in model.objects.values_list("pk", "slug", "name")}
+        self.missing: set[str] = set()
+
+    def resolve(self, values) -> list[tuple[int, str]]:
+        resolved = []
+        for value in _names(values):
+            slug = slugify(value)
+            if slug not in self.by_slug and self.create_missing:
+                instance, _ = self.model.objects.get_or_create(slug=slug, defaults={"name": value})
+                self.by_slug[slug] = (instance.pk, instance.name)
+            if slug in self.by_slug:
+                resolved.append(self.by_slug[slug])
+            else:
+                self.missing.add(slug)
+        return sorted(set(resolved), key=lambda item: item[1])
+
+
+def _clean(record: dict) -> dict:
+    if "__error__" in record:
+        raise ValidationError(record["__error__"])
+    values = {}
+    for name in IMPORT_FIELDS:
+        if name not in record:
+            continue
+        model_field = Movie._meta.get_field(name)
+        value = record[name]
+        if value == "" and model_field.null:
+            value = None
+        elif name in JSON_FIELDS and isinstance(value, str):
+            try:
+                value = json.loads(value) if value else []
+            except json.JSONDecodeError as exc:
+                raise ValidationError(f"{name}: invalid JSON") from exc
+        else:
+            try:
+                value = model_field.to_python(value)
+            except ValidationError as exc:
+                raise ValidationError(f"{name}: {'; '.join(exc.messages)}") from exc
+        values[name] = value
+    missing = [name for name in REQUIRED_FIELDS if values.get(name) in (None, "")]
+    if missing:
+        raise ValidationError(f"missing {', '.join(missing)}")
+    values.setdefault("description", "")
+    return values
+
+
+def allocate_slugs(bases: list[str]) -> list[str]:
+    """Return a unique slug for every base, avoiding the table and each other."""
+    max_length = Movie._meta.get_field("slug").max_length
+    bases = [(base or "movie")[: max_length - 8] for base in bases]
+    wanted = set(bases)
+    taken = set(Movie.objects.filter(slug__in=wanted).values_list("slug", flat=True))
+    counts = Counter(bases)
+    collisions = {base for base in bases if base in taken or counts[base] > 1}
+    if collisions:
+        prefixes = Q()
+        for base in collisions:
+            prefixes |= Q(slug__startswith=f"{base}-")
+        taken.update(Movie.objects.filter(prefixes).values_list("slug", flat=True))
+
+    slugs = []
+    for base in bases:
+        slug, suffix = base, 2
+        while slug in taken:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+class CatalogueImporter:
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        create_missing: bool = False,
+        log: Callable[[str], None] = lambda message: None,
+    ):
+        self.batch_size = batch_size
+        self.categories = TaxonomyMap(Category, create_missing)
+        self.languages = TaxonomyMap(Language, create_missing)
+        self.log = log
+
+    def write_batch(self, rows: list[tuple[int, dict]], result: ImportResult) -> None:
+        prepared = []
+        for line_number, record in rows:
+            try:
+                values = _clean(record)
+            except ValidationError as exc:
+                result.skipped += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append((line_number, "; ".join(exc.messages)))
+                continue
+            categories = self.categories.resolve(record.get("categories"))
+            languages = self.languages.resolve(record.get("languages"))
+            prepared.append((slugify(record.get("slug") or ""), values, categories, languages))
+        if not prepared:
+            return
+        # A slug repeated within the batch keeps only its last record; writing
+        # both would insert the same M2M through rows twice.
+        last = {slug: index for index, (slug, *_) in enumerate(prepared) if slug}
+        prepared = [entry for index, entry in enumerate(prepared) if not entry[0] or last[entry[0]] == index]
+
+        # Records whose slug already exists update that movie in place.
+        explicit = [slug for slug, *_ in prepared if slug]
+        existing = Movie.objects.in_bulk(explicit, field_name="slug") if explicit else {}
+        slugs = iter(
+            allocate_slugs([slug or slugify(values["title"]) for slug, values, *_ in prepared if slug not in existing])
+        )
+
+        created, updated, assignments = [], {}, []
+        # bulk_update() skips auto_now; exports and ETags key off updated_at.
+        now = timezone.now()
+        update_fields = {"cached_category_names", "cached_language_names", "updated_at"}
+        for slug, values, categories, languages in prepared:
+            if slug in existing:
+                movie = existing[slug]
+                for name, value in values.items():
+                    setattr(movie, name, value)
+                update_fields.update(values)
+                updated[movie.pk] = movie
+            else:
+                movie = Movie(**values, slug=next(slugs))
+                created.append(movie)
+            movie.updated_at = now
+            movie.cached_category_names = [name for _, name in categories]
+            movie.cached_language_names = [name for _, name in languages]
+            assignments.append((movie, categories, languages))
+
+        with transaction.atomic():
+            Movie.objects.bulk_create(created, batch_size=self.batch_size)
+            if updated:
+                Movie.objects.bulk_update(updated.values(), sorted(update_fields), batch_size=self.batch_size)
+                Movie.categories.through.objects.filter(movie_id__in=updated).delete()
+                Movie.languages.through.objects.filter(movie_id__in=updated).delete()
+            Movie.categories.through.objects.bulk_create(
+                [
+                    Movie.categories.through(movie_id=movie.pk, category_id=category_id)
+                    for movie, categories, _ in assignments
+                    for category_id, _ in categories
+                ],
+                batch_size=self.batch_size,
+            )
+            Movie.languages.through.objects.bulk_create(
+                [
+                    Movie.languages.through(movie_id=movie.pk, language_id=language_id)
+                    for movie, _, languages in assignments
+                    for language_id, _ in languages
+                ],
+                batch_size=self.batch_size,
+            )
+            search.index_movies(
+                (movie.pk, movie.title, movie.tagline, movie.description) for movie, *_ in assignments
+            )
+        result.created += len(created)
+        result.updated += len(updated)
+        result.movie_ids.update(movie.pk for movie, *_ in assignments)
+
+    def run(
+        self,
+        path: str,
+        file_format: str | None = None,
+        checkpoint: str | None = None,
+        resume: bool = False,
+        refresh_related: bool = True,
+    ) -> ImportResult:
+        file_format = file_format or detect_format(path)
+        checkpoint = checkpoint or f"{path}.checkpoint"
+        skip = load_checkpoint(checkpoint, path) if resume else 0
+        if skip:
+            self.log(f"Resuming after record {skip}")
+
+        result = ImportResult()
+        started = time.perf_counter()
+        consumed = 0
+        batch: list[tuple[int, dict]] = []
+        for line_number, record in read_records(path, file_format):
+            consumed += 1
+            if consumed <= skip:
+                continue
+            batch.append((line_number, record))
+            if len(batch) >= self.batch_size:
+                self._commit(batch, result, consumed, checkpoint, path, started)
+                batch = []
+        if batch:
+            self._commit(batch, result, consumed, checkpoint, path, started)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        if result.created or result.updated:
+            if refresh_related:
+                self.log("Refreshing related movies")
+                if skip:
+                    # The interrupted run never refreshed the movies it wrote.
+                    rebuild_related_movies()
+                else:
+                    refresh_related_movies(result.movie_ids)
+            bump_catalogue_version()
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _commit(self, batch, result, consumed, checkpoint, path, started) -> None:
+        self.write_batch(batch, result)
+        result.records += len(batch)
+        save_checkpoint(checkpoint, path, consumed)
+        elapsed = time.perf_counter() - started
+        rate = result.records / elapsed if elapsed else 0.0
+        self.log(f"Imported {result.records} records ({rate:.0f} rows/sec)")
+
+
+def save_checkpoint(checkpoint: str, path: str, records: int) -> None:
+    stat = os.stat(path)
+    state = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime, "records": records}
+    temporary = f"{checkpoint}.tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(state, handle)
+    os.replace(temporary, checkpoint)
+
+
+def load_checkpoint(checkpoint: str, path: str) -> int:
+    if not os.path.exists(checkpoint):
+        return 0
+    with open(checkpoint, encoding="utf-8") as handle:
+        state = json.load(handle)
+    stat = os.stat(path)
+    if state.get("size") != stat.st_size or state.get("mtime") != stat.st_mtime:
+        raise CatalogueImportError(f"{path} changed since the checkpoint was written; refusing to resume.")
+    return int(state.get("records", 0))
@@ -0,0 +1,25 @@
+from movies.benchmarks import run_load_benchmark
+
+from .benchmark_views import Command as BenchmarkViewsCommand
+
+
+class Command(BenchmarkViewsCommand):
+    help = (
+        "Seed a synthetic catalogue into a throwaway test database and compare WSGI and ASGI "
+        "throughput and latency of the catalogue pages under concurrent load, as JSON."
+    )
+
+    def add_run_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=64, help="Requests kept in flight.")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and interface.")
+
+    def run(self, handles, options):
+        return run_load_benchmark(
+            handles,
+            concurrency=options["concurrency"],
+            requests=options["requests"],
+            only=options["only"],
+        )
+
+    def run_settings(self, options):
+        return {"concurrency": options["concurrency"], "requests": options["requests"]}
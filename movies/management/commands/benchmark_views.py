@@ -0,0 +1,126 @@
+import json
+import platform
+import subprocess
+import sys
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from movies.benchmarks import DEFAULT_SCALE, run_benchmarks, seed_catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic catalogue into a throwaway test database and record query count, "
+        "wall time and peak memory for every view as JSON."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SCALE.items():
+            parser.add_argument(f"--{name}", type=int, default=default, help=f"Rows to seed (default: {default}).")
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiply every seed size, e.g. 0.01 for a quick smoke run.",
+        )
+        self.add_run_arguments(parser)
+        parser.add_argument(
+            "--only",
+            action="append",
+            default=[],
+            help="Only run scenarios whose name starts with this prefix (repeatable).",
+        )
+        parser.add_argument("--output", help="Write JSON results to this file instead of stdout.")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the seeded benchmark database and reuse it on the next run.",
+        )
+
+    def add_run_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20, help="Warm requests per scenario.")
+
+    def run(self, handles, options):
+        return run_benchmarks(handles, iterations=options["iterations"], only=options["only"])
+
+    def run_settings(self, options):
+        return {"iterations": options["iterations"]}
+
+    def handle(self, *args, **options):
+        sizes = {name: max(1, int(options[name] * options["scale"])) for name in DEFAULT_SCALE}
+        log = lambda message: self.stderr.write(message)  # noqa: E731
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            with override_settings(
+                DEBUG=False,
+                DOWNLOAD_TRACKING_BACKGROUND=False,
+                POPULARITY_BACKGROUND=False,
+                RELATED_REFRESH_BACKGROUND=False,
+            ):
+                handles = self._seed_or_reuse(sizes, log)
+                log("Running scenarios")
+                results = self.run(handles, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "git_revision": self._git_revision(),
+            "python": sys.version.split()[0],
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "sizes": sizes,
+            **self.run_settings(options),
+            "results": results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(payload + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+    def _seed_or_reuse(self, sizes, log):
+        from movies.models import Movie
+
+        if not Movie.objects.exists():
+            return seed_catalogue(**sizes, log=log)
+        log("Reusing seeded benchmark database")
+        return self._handles()
+
+    @staticmethod
+    def _handles():
+        from movies.models import Category, Language, Movie
+
+        slugs = list(
+            Movie.objects.filter(related_entries__isnull=False).values_list("slug", flat=True).distinct()[:5]
+        )
+        return {
+            "detail_slugs": slugs or list(Movie.objects.values_list("slug", flat=True)[:1]),
+            "category_slug": Category.objects.values_list("slug", flat=True).first(),
+            "language_slug": Language.objects.values_list("slug", flat=True).first(),
+        }
+
+    @staticmethod
+    def _git_revision():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
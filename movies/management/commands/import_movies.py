@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.importer import CatalogueImporter, CatalogueImportError
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a JSONL or CSV movie catalogue into the database in batches. "
+        "Rows whose slug already exists update that movie."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Catalogue file (.jsonl/.ndjson or .csv).")
+        parser.add_argument("--format", choices=("jsonl", "csv"), help="Override format detection.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Records written per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file used by --resume (default: <path>.checkpoint).",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the records committed by a previous, interrupted run.",
+        )
+        parser.add_argument(
+            "--create-missing",
+            action="store_true",
+            help="Create categories and languages that do not exist yet instead of ignoring them.",
+        )
+        parser.add_argument(
+            "--skip-related",
+            action="store_true",
+            help="Do not rebuild related-movie rankings afterwards (run rebuild_related_movies later).",
+        )
+
+    def handle(self, *args, **options):
+        importer = CatalogueImporter(
+            batch_size=options["batch_size"],
+            create_missing=options["create_missing"],
+            log=lambda message: self.stderr.write(message),
+        )
+        try:
+            result = importer.run(
+                options["path"],
+                file_format=options["format"],
+                checkpoint=options["checkpoint"],
+                resume=options["resume"],
+                refresh_related=not options["skip_related"],
+            )
+        except (OSError, CatalogueImportError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for line_number, message in result.errors:
+            self.stderr.write(self.style.WARNING(f"Line {line_number}: {message}"))
+        for label, taxonomy in (("categories", importer.categories), ("languages", importer.languages)):
+            if taxonomy.missing:
+                self.stderr.write(
+                    self.style.WARNING(f"Ignored unknown {label}: {', '.join(sorted(taxonomy.missing))}")
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.records} records in {result.seconds:.1f}s "
+                f"({result.rows_per_second:.0f} rows/sec): {result.created} created, "
+                f"{result.updated} updated, {result.skipped} skipped."
+            )
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from movies.related import rebuild_related_movies
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed related-movie rankings for every movie."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of movies refreshed per transaction (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_related_movies(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed related movies for {total} movies."))
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from movies.search import FTS_TABLE, create_index_schema, drop_index_schema
+
+
+def create_search_index(apps, schema_editor):
+    create_index_schema(schema_editor)
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, tagline, description) "
+            "SELECT id, title, tagline, description FROM movies_movie"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    drop_index_schema(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_category_is_active_language_is_active_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
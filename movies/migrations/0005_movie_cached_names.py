@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+
+def backfill_cached_names(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    names = {}
+    for movie_id, name in Movie.languages.through.objects.order_by('language__name').values_list(
+        'movie_id', 'language__name'
+    ):
+        names.setdefault(movie_id, ([], []))[0].append(name)
+    for movie_id, name in Movie.categories.through.objects.order_by('category__name').values_list(
+        'movie_id', 'category__name'
+    ):
+        names.setdefault(movie_id, ([], []))[1].append(name)
+    Movie.objects.bulk_update(
+        [
+            Movie(pk=movie_id, cached_language_names=languages, cached_category_names=categories)
+            for movie_id, (languages, categories) in names.items()
+        ],
+        ['cached_language_names', 'cached_category_names'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='cached_category_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='cached_language_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_cached_names, migrations.RunPython.noop),
+    ]
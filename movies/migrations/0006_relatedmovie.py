@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_movie_cached_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedMovie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('shared_categories', models.PositiveSmallIntegerField(default=0)),
+                ('shared_languages', models.PositiveSmallIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='movies.movie')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_by', to='movies.movie')),
+            ],
+            options={
+                'ordering': ('movie', '-score'),
+                'indexes': [models.Index(fields=['movie', '-score'], name='movies_related_rank_idx')],
+                'unique_together': {('movie', 'related')},
+            },
+        ),
+    ]
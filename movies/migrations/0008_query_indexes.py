@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_moviepopularity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['movie', '-created_at'], name='movies_comment_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-release_date', '-created_at', '-id'], name='movies_movie_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_trending', True)), fields=['-release_date', '-created_at'], name='movies_movie_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_year', '-release_date', '-created_at', '-id'], name='movies_movie_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['quality', '-release_date', '-created_at', '-id'], name='movies_movie_quality_idx'),
+        ),
+    ]
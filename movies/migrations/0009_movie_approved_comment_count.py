@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_approved_comment_count(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    Comment = apps.get_model('movies', 'Comment')
+    total = (
+        Comment.objects.filter(movie=OuterRef('pk'), is_approved=True)
+        .order_by()
+        .values('movie')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Movie.objects.update(approved_comment_count=Coalesce(Subquery(total), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='movies_comment_approved_idx',
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['movie', '-created_at', '-id'], name='movies_comment_approved_idx'),
+        ),
+        migrations.RunPython(backfill_approved_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+def analyze_movies(apps, schema_editor):
+    # Without statistics SQLite prefers any partial index whose condition
+    # matches the WHERE clause, even to drive joins ordered by another table.
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("ANALYZE movies_movie")
+        schema_editor.execute("ANALYZE movies_moviepopularity")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_movie_approved_comment_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movie_latest_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movie_trending_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movie_year_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movie_quality_idx',
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['-release_date', '-created_at', '-id'], name='movies_movie_live_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False), ('is_trending', True)), fields=['-release_date', '-created_at'], name='movies_movie_live_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['release_year', '-release_date', '-created_at', '-id'], name='movies_movie_live_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['quality', '-release_date', '-created_at', '-id'], name='movies_movie_live_quality_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['-rating', '-release_date', '-id'], name='movies_movie_live_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['title', 'id'], name='movies_movie_live_title_idx'),
+        ),
+        migrations.RunPython(analyze_movies, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 
@@ -46,6 +48,68 @@ class Language(models.Model):
         super().save(*args, **kwargs)
 
 
+# Rows the public catalogue shows; the partial indexes below use the same condition.
+LIVE_CONDITION = models.Q(is_active=True, is_deleted=False)
+
+
+class MovieQuerySet(models.QuerySet):
+    # Heavy columns that listing cards never render.
+    CARD_DEFERRED_FIELDS = ("description", "download_options", "server_options", "screenshots")
+
+    def live(self):
+        """Movies visible to the public: active and not soft-deleted."""
+        return self.filter(LIVE_CONDITION)
+
+    def cards(self):
+        """Card-ready rows: names come from the denormalized columns, no prefetch needed."""
+        return self.defer(*self.CARD_DEFERRED_FIELDS)
+
+    def with_popularity(self):
+        """Annotate ``trending_score`` (NULL for movies without recorded hits)."""
+        return self.annotate(trending_score=models.F("popularity__log_score"))
+
+    def refresh_name_caches(self) -> int:
+        """Recompute ``cached_language_names``/``cached_category_names`` for these movies.
+
+        ``updated_at`` is bumped too, so incremental exports pick up the new names.
+        """
+        movie_ids = list(self.values_list("pk", flat=True))
+        if not movie_ids:
+            return 0
+        names = {movie_id: ([], []) for movie_id in movie_ids}
+        language_rows = (
+            Movie.languages.through.objects.filter(movie_id__in=movie_ids)
+            .order_by("language__name")
+            .values_list("movie_id", "language__name")
+        )
+        for movie_id, name in language_rows:
+            names[movie_id][0].append(name)
+        category_rows = (
+            Movie.categories.through.objects.filter(movie_id__in=movie_ids)
+            .order_by("category__name")
+            .values_list("movie_id", "category__name")
+        )
+        for movie_id, name in category_rows:
+            names[movie_id][1].append(name)
+        # bulk_update() skips auto_now.
+        now = timezone.now()
+        movies = [
+            Movie(pk=movie_id, cached_language_names=languages, cached_category_names=categories, updated_at=now)
+            for movie_id, (languages, categories) in names.items()
+        ]
+        Movie.objects.bulk_update(
+            movies, ["cached_language_names", "cached_category_names", "updated_at"], batch_size=500
+        )
+        return len(movies)
+
+
+class LiveMovieManager(models.Manager.from_queryset(MovieQuerySet)):
+    """``Movie.live``: the public catalogue, used by every public view."""
+
+    def get_queryset(self):
+        return super().get_queryset().live()
+
+
 class Movie(models.Model):
     """Represents a single movie entry rendered across the CineHub templates."""
 
@@ -84,6 +148,11 @@ class Movie(models.Model):
     )
     categories = models.ManyToManyField(Category, related_name="movies", blank=True)
     languages = models.ManyToManyField(Language, related_name="movies", blank=True)
+    # Denormalized copies of the M2M names so listing cards render without joins.
+    cached_language_names = models.JSONField(default=list, blank=True, editable=False)
+    cached_category_names = models.JSONField(default=list, blank=True, editable=False)
+    # Maintained by the Comment signals in movies.signals.
+    approved_comment_count = models.PositiveIntegerField(default=0, editable=False)
     screenshots = models.JSONField(default=list, blank=True)
     quality = models.CharField(max_length=10, choices=QUALITY_CHOICES, blank=True)
     is_active = models.BooleanField(default=True)
@@ -91,8 +160,44 @@ class Movie(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MovieQuerySet.as_manager()
+    live = LiveMovieManager()
+
     class Meta:
         ordering = ("-release_date", "-created_at")
+        # Public listings only read live rows (Movie.live), so their indexes
+        # are partial and skip hidden and soft-deleted movies entirely.
+        indexes = [
+            # "latest" listings and the default model ordering; the trailing id
+            # matches the keyset paginator's tiebreaker.
+            models.Index(
+                fields=["-release_date", "-created_at", "-id"],
+                condition=LIVE_CONDITION,
+                name="movies_movie_live_latest_idx",
+            ),
+            # Editor-flagged trending titles on the home page.
+            models.Index(
+                fields=["-release_date", "-created_at"],
+                condition=LIVE_CONDITION & models.Q(is_trending=True),
+                name="movies_movie_live_trending_idx",
+            ),
+            models.Index(
+                fields=["release_year", "-release_date", "-created_at", "-id"],
+                condition=LIVE_CONDITION,
+                name="movies_movie_live_year_idx",
+            ),
+            models.Index(
+                fields=["quality", "-release_date", "-created_at", "-id"],
+                condition=LIVE_CONDITION,
+                name="movies_movie_live_quality_idx",
+            ),
+            models.Index(
+                fields=["-rating", "-release_date", "-id"],
+                condition=LIVE_CONDITION,
+                name="movies_movie_live_rating_idx",
+            ),
+            models.Index(fields=["title", "id"], condition=LIVE_CONDITION, name="movies_movie_live_title_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -144,7 +249,59 @@ class Movie(models.Model):
         ]
 
     def language_names(self) -> list[str]:
-        return [language.name for language in self.languages.all()]
+        return list(self.cached_language_names)
+
+    def category_names(self) -> list[str]:
+        return list(self.cached_category_names)
+
+    def refresh_approved_comment_count(self) -> None:
+        approved = Comment.objects.filter(movie=models.OuterRef("pk"), is_approved=True)
+        total = approved.order_by().values("movie").annotate(total=models.Count("pk")).values("total")
+        Movie.objects.filter(pk=self.pk).update(
+            approved_comment_count=Coalesce(models.Subquery(total), 0)
+        )
+
+
+class RelatedMovie(models.Model):
+    """Precomputed "related movies" entry, ranked by overlap and popularity."""
+
+    movie = models.ForeignKey(Movie, related_name="related_entries", on_delete=models.CASCADE)
+    related = models.ForeignKey(Movie, related_name="related_by", on_delete=models.CASCADE)
+    score = models.FloatField()
+    shared_categories = models.PositiveSmallIntegerField(default=0)
+    shared_languages = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ("movie", "-score")
+        unique_together = ("movie", "related")
+        indexes = [models.Index(fields=["movie", "-score"], name="movies_related_rank_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.related} related to {self.movie} ({self.score:.2f})"
+
+
+class MoviePopularity(models.Model):
+    """Time-decayed engagement score fed by ``movies.popularity``.
+
+    ``log_score`` is ``log(sum(weight * exp(decay * (hit_time - epoch))))``,
+    so ordering by it equals ordering by the decayed score at any moment,
+    and old rows never need rewriting as time passes.
+    """
+
+    movie = models.OneToOneField(
+        Movie, related_name="popularity", on_delete=models.CASCADE, primary_key=True
+    )
+    views = models.PositiveIntegerField(default=0)
+    downloads = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    log_score = models.FloatField(default=0.0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "movie popularity"
+
+    def __str__(self) -> str:
+        return f"Popularity of {self.movie}"
 
 
 class Comment(models.Model):
@@ -160,6 +317,13 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["movie", "-created_at", "-id"],
+                condition=models.Q(is_approved=True),
+                name="movies_comment_approved_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} on {self.movie}"
@@ -0,0 +1,239 @@
+"""Keyset (cursor) pagination for movie listings.
+
+Instead of OFFSET, each page remembers the sort key of its last row and the
+next page filters for rows strictly after it. Deep pages therefore cost the
+same as the first one, and ``has_next`` is answered by fetching one extra row
+rather than running ``COUNT(*)``.
+
+:class:`CachedKeysetPaginator` also caches the sort keys of a listing's first
+rows, so popular listings are served by primary key with one ``in_bulk``
+query. Its cursors are interchangeable with the uncached ones.
+"""
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Sequence
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q, QuerySet
+
+from core.replicas import reading_primary
+
+CURSOR_SALT = "movies.pagination.cursor"
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor was tampered with or built for another ordering."""
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder truncates to milliseconds, but the strict "after"
+        # predicate needs the exact key or rows in the same millisecond are skipped.
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat(timespec="microseconds")
+        return super().default(o)
+
+
+class _CursorSerializer:
+    def dumps(self, obj):
+        return _CursorEncoder(separators=(",", ":")).encode(obj).encode("latin-1")
+
+    def loads(self, data):
+        return signing.JSONSerializer().loads(data)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    next_cursor: str | None = None
+    ordering: Sequence[str] = field(default_factory=tuple)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+def _split(ordering: Iterable[str]) -> list[tuple[str, bool]]:
+    keys = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+    if not any(name in ("pk", "id") for name, _ in keys):
+        # Always finish with the primary key so every row has a unique position.
+        keys.append(("pk", keys[-1][1] if keys else False))
+    return keys
+
+
+def _after(name: str, descending: bool, value: Any, nullable: bool) -> Q | None:
+    # NULLs always sort last, so nothing can follow a NULL in the same column.
+    if value is None:
+        return None
+    lookup = "lt" if descending else "gt"
+    after = Q(**{f"{name}__{lookup}": value})
+    if nullable:
+        after |= Q(**{f"{name}__isnull": True})
+    return after
+
+
+def _equal(name: str, value: Any) -> Q:
+    if value is None:
+        return Q(**{f"{name}__isnull": True})
+    return Q(**{name: value})
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by ``ordering`` using opaque, signed cursors."""
+
+    def __init__(self, queryset: QuerySet, ordering: Sequence[str], per_page: int = 24):
+        self.keys = _split(ordering)
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.nullable = [self._is_nullable(queryset.model, name) for name, _ in self.keys]
+        # NULLS LAST only where NULLs can occur: an explicit null ordering on
+        # a NOT NULL column still keeps SQLite from sorting by an index.
+        order_by = [
+            F(name).desc(nulls_last=nullable or None) if descending else F(name).asc(nulls_last=nullable or None)
+            for (name, descending), nullable in zip(self.keys, self.nullable)
+        ]
+        self.queryset = queryset.order_by(*order_by)
+
+    @staticmethod
+    def _is_nullable(model, name: str) -> bool:
+        if name == "pk":
+            return False
+        try:
+            return model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            # Annotations such as ``search_rank`` may be NULL.
+            return True
+
+    def encode_cursor(self, obj) -> str:
+        return self.encode_values([getattr(obj, name) for name, _ in self.keys])
+
+    def encode_values(self, values: Sequence) -> str:
+        payload = {"o": list(self.ordering), "v": list(values)}
+        return signing.dumps(payload, salt=CURSOR_SALT, serializer=_CursorSerializer, compress=True)
+
+    def decode_cursor(self, cursor: str) -> list:
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT, serializer=_CursorSerializer)
+        except signing.BadSignature as exc:
+            raise InvalidCursor("Malformed cursor.") from exc
+        if payload.get("o") != list(self.ordering) or len(payload.get("v", [])) != len(self.keys):
+            raise InvalidCursor("Cursor does not match the requested ordering.")
+        return payload["v"]
+
+    def _predicate(self, values: list) -> Q:
+        predicate = Q(pk__in=[])
+        prefix = Q()
+        for (name, descending), nullable, value in zip(self.keys, self.nullable, values):
+            after = _after(name, descending, value, nullable)
+            if after is not None:
+                predicate |= prefix & after
+            prefix &= _equal(name, value)
+        return predicate
+
+    def _window(self, cursor: str | None) -> QuerySet:
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._predicate(self.decode_cursor(cursor)))
+        return queryset[: self.per_page + 1]
+
+    def _page(self, rows: list) -> KeysetPage:
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        next_cursor = self.encode_cursor(rows[-1]) if has_next else None
+        return KeysetPage(rows, has_next, next_cursor, self.ordering)
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        return self._page(list(self._window(cursor)))
+
+    async def aget_page(self, cursor: str | None = None) -> KeysetPage:
+        return self._page([row async for row in self._window(cursor)])
+
+
+class CachedKeysetPaginator(KeysetPaginator):
+    """``KeysetPaginator`` serving the first ``limit`` rows from a cached list of sort keys.
+
+    The cache holds the sort key tuples (primary key included) of the first
+    ``limit`` rows of the ordered listing under ``cache_key``. A page inside
+    that window is hydrated with a single ``in_bulk`` on ``hydrate``; a page
+    reaching past it falls back to the keyset query. The key must change
+    whenever the listing's rows or order can (e.g. a catalogue version).
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        ordering: Sequence[str],
+        per_page: int = 24,
+        *,
+        hydrate: QuerySet,
+        cache_key: str,
+        limit: int = 240,
+        timeout: int | None = None,
+    ):
+        super().__init__(queryset, ordering, per_page)
+        self.hydrate = hydrate
+        self.cache_key = cache_key
+        self.limit = limit
+        self.timeout = timeout
+        self._pk_index = next(index for index, (name, _) in enumerate(self.keys) if name in ("pk", "id"))
+
+    def _key_rows(self) -> QuerySet:
+        # One row more than the window tells whether the listing goes on.
+        return self.queryset.prefetch_related(None).values_list(*(name for name, _ in self.keys))[: self.limit + 1]
+
+    def _store(self, rows: list) -> tuple[list, bool]:
+        entry = ([tuple(row) for row in rows[: self.limit]], len(rows) > self.limit)
+        cache.set(self.cache_key, entry, self.timeout)
+        return entry
+
+    def _slice(self, entry: tuple[list, bool], cursor: str | None) -> tuple[list, bool] | None:
+        """The window rows for this page and ``has_next``, or ``None`` to query instead."""
+        rows, truncated = entry
+        start = 0
+        if cursor:
+            last_pk = self.decode_cursor(cursor)[self._pk_index]
+            start = next((index + 1 for index, row in enumerate(rows) if row[self._pk_index] == last_pk), None)
+            if start is None:
+                return None
+        end = start + self.per_page
+        if end < len(rows):
+            return rows[start:end], True
+        if truncated:
+            return None
+        return rows[start:end], False
+
+    def _cached_page(self, window: list, has_next: bool, objects: dict) -> KeysetPage:
+        object_list = [objects[row[self._pk_index]] for row in window if row[self._pk_index] in objects]
+        next_cursor = self.encode_values(window[-1]) if has_next else None
+        return KeysetPage(object_list, has_next, next_cursor, self.ordering)
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        entry = cache.get(self.cache_key)
+        if entry is None:
+            with reading_primary():
+                entry = self._store(list(self._key_rows()))
+        sliced = self._slice(entry, cursor)
+        if sliced is None:
+            return super().get_page(cursor)
+        window, has_next = sliced
+        return self._cached_page(window, has_next, self.hydrate.in_bulk([row[self._pk_index] for row in window]))
+
+    async def aget_page(self, cursor: str | None = None) -> KeysetPage:
+        entry = cache.get(self.cache_key)
+        if entry is None:
+            with reading_primary():
+                entry = self._store([row async for row in self._key_rows()])
+        sliced = self._slice(entry, cursor)
+        if sliced is None:
+            return await super().aget_page(cursor)
+        window, has_next = sliced
+        objects = await self.hydrate.ain_bulk([row[self._pk_index] for row in window])
+        return self._cached_page(window, has_next, objects)
@@ -0,0 +1,152 @@
+"""Write-behind popularity counters behind the "trending" ordering.
+
+Detail views, downloads and new favourites call :func:`record_hit`, which
+only bumps an in-process counter. The counters are flushed to
+``MoviePopularity`` in one locked read plus one bulk write per batch by a
+background thread (see ``core.tracking.WriteBehindBuffer``). Each hit
+contributes ``weight * exp(decay * (t - EPOCH))`` to a forward-decayed score
+stored in log space, so a hit loses half its weight every
+``POPULARITY_HALF_LIFE``.
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.tracking import BUFFERS, WriteBehindBuffer
+
+from .models import Movie, MoviePopularity
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+POPULARITY_VERSION_KEY = "movies:popularity-version"
+
+HIT_WEIGHTS = {
+    "views": 1.0,
+    "downloads": 5.0,
+    "favorites": 10.0,
+}
+
+
+def half_life_seconds() -> float:
+    return getattr(settings, "POPULARITY_HALF_LIFE", 3 * 24 * 60 * 60)
+
+
+def log_weight(weight: float, when: datetime) -> float:
+    """``log(weight * exp(decay * (when - EPOCH)))`` without overflowing."""
+    decay = math.log(2) / half_life_seconds()
+    return math.log(weight) + decay * (when - EPOCH).total_seconds()
+
+
+def log_add(a: float, b: float) -> float:
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def get_popularity_version() -> int:
+    version = cache.get(POPULARITY_VERSION_KEY)
+    if version is None:
+        # Seed with a timestamp so a flushed cache never reuses an old version.
+        version = int(time.time() * 1000)
+        if not cache.add(POPULARITY_VERSION_KEY, version, timeout=None):
+            version = cache.get(POPULARITY_VERSION_KEY, version)
+    return version
+
+
+def bump_popularity_version() -> None:
+    try:
+        cache.incr(POPULARITY_VERSION_KEY)
+    except ValueError:
+        get_popularity_version()
+
+
+class PopularityCounter(WriteBehindBuffer):
+    batch_size_setting = "POPULARITY_FLUSH_THRESHOLD"
+    flush_interval_setting = "POPULARITY_FLUSH_INTERVAL"
+    background_setting = "POPULARITY_BACKGROUND"
+    default_batch_size = 5000
+    default_flush_interval = 60.0
+
+    def __init__(self):
+        super().__init__()
+        self._hits: Counter = Counter()
+        self._total = 0
+
+    def add(self, hit: tuple[int, str]) -> int:
+        self._hits[hit] += 1
+        self._total += 1
+        return self._total
+
+    def drain(self) -> Counter:
+        hits, self._hits, self._total = self._hits, Counter(), 0
+        return hits
+
+    def write(self, hits: Counter) -> int:
+        now = timezone.now()
+        per_movie: dict[int, Counter] = {}
+        for (movie_id, kind), count in hits.items():
+            per_movie.setdefault(movie_id, Counter())[kind] += count
+
+        # Several processes flush into the same rows: make sure every row
+        # exists, then lock them, so no flush works from a stale read.
+        with transaction.atomic():
+            rows = _locked_rows(per_movie)
+            missing = [movie_id for movie_id in per_movie if movie_id not in rows]
+            if missing:
+                # Movies deleted since their hit was recorded would fail the
+                # foreign key and take the whole batch down with them.
+                missing = list(Movie.objects.filter(pk__in=missing).values_list("pk", flat=True))
+            if missing:
+                MoviePopularity.objects.bulk_create(
+                    [MoviePopularity(movie_id=movie_id) for movie_id in missing], batch_size=500, ignore_conflicts=True
+                )
+                rows.update(_locked_rows(missing))
+            for movie_id, counts in per_movie.items():
+                if movie_id not in rows:
+                    continue
+                weight = sum(HIT_WEIGHTS[kind] * count for kind, count in counts.items())
+                contribution = log_weight(weight, now)
+                row = rows[movie_id]
+                if row.views or row.downloads or row.favorites:
+                    row.log_score = log_add(row.log_score, contribution)
+                else:
+                    # Every hit bumps a counter, so this row has none yet.
+                    row.log_score = contribution
+                row.views += counts["views"]
+                row.downloads += counts["downloads"]
+                row.favorites += counts["favorites"]
+                row.updated_at = now
+            MoviePopularity.objects.bulk_update(
+                rows.values(), ["views", "downloads", "favorites", "log_score", "updated_at"], batch_size=500
+            )
+        bump_popularity_version()
+        return len(rows)
+
+
+def _locked_rows(movie_ids) -> dict[int, MoviePopularity]:
+    # Locked in primary-key order so concurrent flushes cannot deadlock.
+    rows = MoviePopularity.objects.select_for_update().filter(pk__in=list(movie_ids)).order_by("pk")
+    return {row.pk: row for row in rows}
+
+
+counter = PopularityCounter()
+BUFFERS.append(counter)
+
+
+def record_hit(movie_id: int, kind: str = "views") -> None:
+    if kind not in HIT_WEIGHTS:
+        raise ValueError(f"Unknown popularity hit kind: {kind!r}")
+    counter.record((movie_id, kind))
+
+
+def decayed_score(popularity: MoviePopularity, at: datetime | None = None) -> float:
+    """Current decayed score of a row, for display and debugging."""
+    at = at or timezone.now()
+    decay = math.log(2) / half_life_seconds()
+    return math.exp(popularity.log_score - decay * (at - EPOCH).total_seconds())
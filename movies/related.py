@@ -0,0 +1,169 @@
+"""Precomputed related-movie rankings for the detail page.
+
+Neighbours must share at least one category with the movie (or a language
+when it has no categories). They are ranked by::
+
+    CATEGORY_WEIGHT * shared categories + LANGUAGE_WEIGHT * shared languages
+    + popularity (rating / 10, plus a bonus for trending titles)
+
+Rankings are refreshed incrementally from ``m2m_changed`` (see
+``movies.signals``) and in full with ``manage.py rebuild_related_movies``.
+Signal-driven refreshes run after the transaction commits, on the
+:data:`refresher` write-behind worker rather than in the saving request,
+and their cascade is capped at ``RELATED_CASCADE_LIMIT`` movies; rankings
+beyond the cap catch up on the next full rebuild.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from core.tracking import BUFFERS, WriteBehindBuffer
+
+from .models import Movie, RelatedMovie
+
+RELATED_MOVIES_LIMIT = getattr(settings, "RELATED_MOVIES_LIMIT", 12)
+CATEGORY_WEIGHT = 3.0
+LANGUAGE_WEIGHT = 1.0
+TRENDING_BONUS = 1.0
+
+
+def popularity_expression():
+    return Coalesce(Cast("rating", FloatField()), Value(0.0)) / 10.0 + Case(
+        When(is_trending=True, then=Value(TRENDING_BONUS)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def compute_related(movie_id: int, limit: int = RELATED_MOVIES_LIMIT) -> list[RelatedMovie]:
+    category_ids = list(
+        Movie.categories.through.objects.filter(movie_id=movie_id).values_list("category_id", flat=True)
+    )
+    language_ids = list(
+        Movie.languages.through.objects.filter(movie_id=movie_id).values_list("language_id", flat=True)
+    )
+    if category_ids:
+        candidates = Q(categories__in=category_ids)
+    elif language_ids:
+        candidates = Q(languages__in=language_ids)
+    else:
+        return []
+
+    neighbours = (
+        Movie.live.filter(candidates)
+        .exclude(pk=movie_id)
+        .order_by()
+        .values("pk")
+        .annotate(
+            shared_categories=Count("categories", filter=Q(categories__in=category_ids), distinct=True),
+            shared_languages=Count("languages", filter=Q(languages__in=language_ids), distinct=True),
+        )
+        .annotate(
+            score=F("shared_categories") * CATEGORY_WEIGHT
+            + F("shared_languages") * LANGUAGE_WEIGHT
+            + popularity_expression()
+        )
+        .order_by("-score", "-pk")[:limit]
+    )
+    return [
+        RelatedMovie(
+            movie_id=movie_id,
+            related_id=row["pk"],
+            score=row["score"],
+            shared_categories=row["shared_categories"],
+            shared_languages=row["shared_languages"],
+        )
+        for row in neighbours
+    ]
+
+
+def _replace(movie_id: int) -> set[int]:
+    entries = compute_related(movie_id)
+    RelatedMovie.objects.filter(movie_id=movie_id).delete()
+    RelatedMovie.objects.bulk_create(entries)
+    return {entry.related_id for entry in entries}
+
+
+@transaction.atomic
+def refresh_related_movies(movie_ids: Iterable[int], cascade: bool = True) -> int:
+    """Recompute rankings for ``movie_ids``.
+
+    With ``cascade`` the movies that listed them, or that they now list, are
+    refreshed as well so the relation stays roughly symmetric without a full
+    rebuild.
+    """
+    movie_ids = set(movie_ids)
+    affected: set[int] = set()
+    if cascade:
+        affected.update(
+            RelatedMovie.objects.filter(related_id__in=movie_ids).values_list("movie_id", flat=True)
+        )
+    for movie_id in movie_ids:
+        affected |= _replace(movie_id)
+    affected -= movie_ids
+    if not cascade:
+        return len(movie_ids)
+    # A popular category can reach much of the catalogue; the rest waits for
+    # the next full rebuild.
+    cascaded = sorted(affected)[: cascade_limit()]
+    for movie_id in cascaded:
+        _replace(movie_id)
+    return len(movie_ids) + len(cascaded)
+
+
+def cascade_limit() -> int:
+    return getattr(settings, "RELATED_CASCADE_LIMIT", 500)
+
+
+class RelatedRefresher(WriteBehindBuffer):
+    """Refreshes rankings for changed movies off the request thread."""
+
+    batch_size_setting = "RELATED_REFRESH_BATCH_SIZE"
+    flush_interval_setting = "RELATED_REFRESH_INTERVAL"
+    background_setting = "RELATED_REFRESH_BACKGROUND"
+    # Any pending change wakes the worker; it drains everything at once.
+    default_batch_size = 1
+    default_flush_interval = 5.0
+
+    def __init__(self):
+        super().__init__()
+        self._pending: set[int] = set()
+
+    def add(self, movie_ids: frozenset[int]) -> int:
+        self._pending.update(movie_ids)
+        return len(self._pending)
+
+    def drain(self) -> set[int]:
+        pending, self._pending = self._pending, set()
+        return pending
+
+    def write(self, movie_ids: set[int]) -> int:
+        return refresh_related_movies(movie_ids)
+
+
+refresher = RelatedRefresher()
+BUFFERS.append(refresher)
+
+
+def schedule_refresh(movie_ids: Iterable[int]) -> None:
+    """Refresh the rankings of ``movie_ids`` once the current transaction commits."""
+    movie_ids = frozenset(movie_ids)
+    transaction.on_commit(lambda: refresher.record(movie_ids))
+
+
+def rebuild_related_movies(batch_size: int = 500) -> int:
+    total = 0
+    batch: list[int] = []
+    for movie_id in Movie.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=batch_size):
+        batch.append(movie_id)
+        if len(batch) >= batch_size:
+            total += refresh_related_movies(batch, cascade=False)
+            batch = []
+    if batch:
+        total += refresh_related_movies(batch, cascade=False)
+    return total
@@ -0,0 +1,162 @@
+"""Full-text search over movie titles, taglines and descriptions.
+
+SQLite deployments keep an FTS5 virtual table (``movies_movie_fts``) whose
+``rowid`` mirrors ``Movie.id``; it is maintained by the signal handlers in
+``movies.signals`` and can be rebuilt with ``manage.py rebuild_search_index``.
+PostgreSQL deployments use a weighted ``SearchVector`` backed by the GIN
+expression index created in the same migration.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+from django.db import connection
+from django.db.models import FloatField, QuerySet
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "movies_movie_fts"
+
+# Column weights used by bm25(); title matches outrank tagline and description.
+TITLE_WEIGHT = 10.0
+TAGLINE_WEIGHT = 4.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_expression(query: str) -> str:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term so punctuation typed into the
+    search box can never be interpreted as FTS5 query syntax.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_movies(queryset: QuerySet, query: str) -> QuerySet:
+    """Filter ``queryset`` to movies matching ``query`` and annotate ``search_rank``.
+
+    Higher ``search_rank`` means a better match on every backend.
+    """
+    if connection.vendor == "sqlite":
+        match = build_match_expression(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, %s, %s, %s) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = movies_movie.id",
+                (TITLE_WEIGHT, TAGLINE_WEIGHT, DESCRIPTION_WEIGHT, match),
+                output_field=FloatField(),
+            )
+        )
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(query, search_type="websearch", config="english")
+        return queryset.annotate(
+            search_document=search_vector(),
+            search_rank=SearchRank(search_vector(), search_query),
+        ).filter(search_document=search_query)
+
+    from django.db.models import Q, Value
+
+    return queryset.filter(
+        Q(title__icontains=query) | Q(description__icontains=query) | Q(tagline__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def search_vector():
+    """Weighted vector matching the PostgreSQL GIN expression index."""
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector("title", weight="A", config="english")
+        + SearchVector("tagline", weight="B", config="english")
+        + SearchVector("description", weight="C", config="english")
+    )
+
+
+def index_movie(movie) -> None:
+    """Insert or refresh a single movie in the SQLite FTS table."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [movie.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, tagline, description) VALUES (%s, %s, %s, %s)",
+            [movie.pk, movie.title, movie.tagline, movie.description],
+        )
+
+
+def remove_movie(movie_id: int) -> None:
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [movie_id])
+
+
+def index_movies(rows: Iterable[tuple[int, str, str, str]]) -> int:
+    """Bulk (re)index ``(id, title, tagline, description)`` rows; returns the row count."""
+    if connection.vendor != "sqlite":
+        return 0
+    rows = list(rows)
+    if not rows:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, tagline, description) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+    return len(rows)
+
+
+def rebuild_index(batch_size: int = 2000) -> int:
+    """Drop every FTS row and re-populate the table from ``Movie``."""
+    from .models import Movie
+
+    if connection.vendor != "sqlite":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    total = 0
+    batch = []
+    rows = Movie.objects.order_by().values_list("id", "title", "tagline", "description")
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += index_movies(batch)
+            batch = []
+    total += index_movies(batch)
+    return total
+
+
+def create_index_schema(schema_editor) -> None:
+    """Create the backend specific search structures (used by migrations)."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, tagline, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS movies_movie_search_gin ON movies_movie USING GIN (("
+            "setweight(to_tsvector('english', COALESCE(title, '')), 'A') || "
+            "setweight(to_tsvector('english', COALESCE(tagline, '')), 'B') || "
+            "setweight(to_tsvector('english', COALESCE(description, '')), 'C')))"
+        )
+
+
+def drop_index_schema(schema_editor) -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS movies_movie_search_gin")
@@ -0,0 +1,139 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, popularity, related, search
+from .cache import bump_catalogue_version
+from .models import Category, Comment, Language, Movie
+
+# Category/Language columns that appear in exported movie records.
+EXPORTED_TAXONOMY_FIELDS = ("name", "slug", "is_active")
+
+
+@receiver(post_save, sender=Movie)
+def index_movie_for_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_movie(instance)
+
+
+@receiver(post_delete, sender=Movie)
+def remove_movie_from_search(sender, instance, **kwargs):
+    search.remove_movie(instance.pk)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Language)
+def invalidate_catalogue_on_change(sender, **kwargs):
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(m2m_changed, sender=Movie.categories.through)
+@receiver(m2m_changed, sender=Movie.languages.through)
+def invalidate_catalogue_on_m2m_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(bump_catalogue_version)
+
+
+def _changed_movie_ids(instance, action, reverse, pk_set) -> list[int] | None:
+    """Movie ids affected by an ``m2m_changed`` event, or ``None`` for pre_* actions."""
+    if not reverse:
+        return [instance.pk] if action in ("post_add", "post_remove", "post_clear") else None
+    # Reverse side: ``instance`` is a Category/Language and ``pk_set`` holds movie ids.
+    if action == "pre_clear":
+        instance._cleared_movie_ids = list(instance.movies.values_list("pk", flat=True))
+    elif action == "post_clear":
+        return getattr(instance, "_cleared_movie_ids", [])
+    elif action in ("post_add", "post_remove"):
+        return list(pk_set)
+    return None
+
+
+@receiver(m2m_changed, sender=Movie.categories.through)
+@receiver(m2m_changed, sender=Movie.languages.through)
+def refresh_movie_derived_data(sender, instance, action, reverse, pk_set, **kwargs):
+    movie_ids = _changed_movie_ids(instance, action, reverse, pk_set)
+    if not movie_ids:
+        return
+    Movie.objects.filter(pk__in=movie_ids).refresh_name_caches()
+    related.schedule_refresh(movie_ids)
+    transaction.on_commit(partial(autocomplete.index.refresh_movies, movie_ids))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def refresh_autocomplete_on_change(sender, instance, raw=False, **kwargs):
+    # Registered after the catalogue version bump, so it runs right after it.
+    if raw:
+        return
+    transaction.on_commit(partial(autocomplete.index.refresh_movies, [instance.pk]))
+
+
+@receiver(pre_save, sender=Movie)
+def remember_previous_visibility(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._was_live = Movie.live.filter(pk=instance.pk).exists()
+
+
+@receiver(post_save, sender=Movie)
+def refresh_related_on_visibility_change(sender, instance, created, raw=False, **kwargs):
+    # Hidden movies drop out of other movies' rankings (and come back) at once.
+    is_live = instance.is_active and not instance.is_deleted
+    if raw or created or getattr(instance, "_was_live", is_live) == is_live:
+        return
+    related.schedule_refresh([instance.pk])
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Language)
+def remember_previous_name(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._previous_state = (
+        sender.objects.filter(pk=instance.pk).values_list(*EXPORTED_TAXONOMY_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Language)
+def refresh_name_caches_on_rename(sender, instance, created, raw=False, **kwargs):
+    # Renames change the cached names; any exported field change must also
+    # bump the movies' updated_at so incremental exports resend them.
+    if raw or created:
+        return
+    state = tuple(getattr(instance, name) for name in EXPORTED_TAXONOMY_FIELDS)
+    if getattr(instance, "_previous_state", state) != state:
+        instance.movies.all().refresh_name_caches()
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Language)
+def remember_movies_before_delete(sender, instance, **kwargs):
+    instance._deleted_movie_ids = list(instance.movies.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Language)
+def refresh_name_caches_after_delete(sender, instance, **kwargs):
+    Movie.objects.filter(pk__in=getattr(instance, "_deleted_movie_ids", [])).refresh_name_caches()
+
+
+@receiver(post_save, sender="core.FavoriteMovie")
+def count_favorite(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        popularity.record_hit(instance.movie_id, "favorites")
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_approved_comment_count(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Movie(pk=instance.movie_id).refresh_approved_comment_count()
@@ -8,12 +8,44 @@ document.querySelectorAll(".category-btn").forEach((btn) => {
 
 // Search Functionality
 const searchInput = document.getElementById("searchInput")
-if (searchInput) {
-  searchInput.addEventListener("keyup", function () {
-    const query = this.value.toLowerCase()
-    console.log("[v0] Search query:", query)
+
+// Typeahead: suggestions come from /search/suggest/ (an in-memory index)
+document.querySelectorAll("input[data-suggest-url]").forEach((input) => {
+  const list = document.getElementById(input.getAttribute("list"))
+  let urls = {}
+  let timer = null
+  input.addEventListener("input", function (event) {
+    // Picking a suggestion fires "insertReplacementText" (or a plain Event
+    // without inputType); typing a title out in full must not navigate.
+    const picked = event.inputType === undefined || event.inputType === "insertReplacementText"
+    if (picked && urls[this.value]) {
+      window.location.href = urls[this.value]
+      return
+    }
+    clearTimeout(timer)
+    const query = this.value.trim()
+    if (!query) {
+      list.innerHTML = ""
+      return
+    }
+    timer = setTimeout(() => {
+      fetch(input.dataset.suggestUrl + "?q=" + encodeURIComponent(query))
+        .then((response) => response.json())
+        .then((data) => {
+          urls = {}
+          list.innerHTML = ""
+          data.results.forEach((movie) => {
+            const option = document.createElement("option")
+            option.value = movie.title
+            if (movie.release_year) option.label = movie.release_year
+            urls[movie.title] = movie.url
+            list.appendChild(option)
+          })
+        })
+        .catch(() => {})
+    }, 80)
   })
-}
+})
 
 // Search Button
 const searchBtn = document.querySelector(".search-btn")
@@ -227,3 +259,44 @@ document.querySelectorAll(".history-action .btn").forEach((btn) => {
 document.addEventListener("DOMContentLoaded", () => {
   console.log("[v0] CineHub website loaded")
 })
+
+// Load More Comments
+const loadMoreComments = document.querySelector(".load-more-comments")
+if (loadMoreComments) {
+  const commentsList = document.querySelector(".comments-list")
+  loadMoreComments.addEventListener("click", function () {
+    this.disabled = true
+    fetch(this.dataset.url, { headers: { Accept: "application/json" } })
+      .then((response) => response.json())
+      .then((data) => {
+        data.results.forEach((comment) => {
+          const item = document.createElement("div")
+          item.className = "comment-item mb-4"
+          const header = document.createElement("div")
+          header.className = "comment-header"
+          const name = document.createElement("strong")
+          name.textContent = comment.name
+          const date = document.createElement("span")
+          date.className = "comment-date"
+          date.textContent = " " + comment.timesince + " ago"
+          header.append(name, date)
+          const body = document.createElement("p")
+          body.className = "comment-text"
+          body.textContent = comment.body
+          item.append(header, body)
+          commentsList.appendChild(item)
+        })
+        if (data.has_next) {
+          const url = new URL(this.dataset.url, window.location.href)
+          url.searchParams.set("cursor", data.next_cursor)
+          this.dataset.url = url.toString()
+          this.disabled = false
+        } else {
+          this.remove()
+        }
+      })
+      .catch(() => {
+        this.disabled = false
+      })
+  })
+}
@@ -1,3 +1,1066 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tracking import discard_pending
+
+from . import search
+from .facets import facet_counts
+from .filters import parse_search_state
+from .models import Category, Comment, Language, Movie, MoviePopularity, RelatedMovie
+
+
+def make_movie(title, **kwargs):
+    defaults = {
+        "description": f"{title} description",
+        "release_year": 2020,
+        "duration_minutes": 120,
+    }
+    defaults.update(kwargs)
+    return Movie.objects.create(title=title, **defaults)
+
+
+@override_settings(
+    POPULARITY_BACKGROUND=False,
+    DOWNLOAD_TRACKING_BACKGROUND=False,
+    AUTOCOMPLETE_BACKGROUND=False,
+    RELATED_REFRESH_BACKGROUND=False,
+)
+class CatalogueTestCase(TestCase):
+    def setUp(self):
+        # Catalogue caches and write-behind buffers outlive the per-test rollback.
+        cache.clear()
+        discard_pending()
+        self.addCleanup(discard_pending)
+
+
+class MovieSearchIndexTests(CatalogueTestCase):
+    def test_search_ranks_title_matches_first(self):
+        description_hit = make_movie("Quiet Harbour", description="A heist aboard a ship.")
+        title_hit = make_movie("The Heist")
+
+        results = list(search.search_movies(Movie.objects.all(), "heist").order_by("-search_rank"))
+
+        self.assertEqual(results, [title_hit, description_hit])
+
+    def test_index_follows_saves_and_deletes(self):
+        movie = make_movie("Old Title", description="Plot summary.")
+        movie.title = "Brand New Title"
+        movie.save()
+
+        self.assertFalse(search.search_movies(Movie.objects.all(), "old").exists())
+        self.assertTrue(search.search_movies(Movie.objects.all(), "brand").exists())
+
+        movie.delete()
+        self.assertFalse(search.search_movies(Movie.objects.all(), "brand").exists())
+
+    def test_query_syntax_is_escaped(self):
+        make_movie("Mission: Impossible")
+
+        results = search.search_movies(Movie.objects.all(), 'mission: "(*')
+
+        self.assertEqual(results.count(), 1)
+
+    def test_rebuild_command_restores_index(self):
+        make_movie("Rebuilt Movie")
+        search.remove_movie(Movie.objects.get().pk)
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertTrue(search.search_movies(Movie.objects.all(), "rebuilt").exists())
+
+    def test_search_view_orders_by_relevance(self):
+        make_movie("Space")
+        make_movie("Space Drama", description="space space space")
+
+        response = self.client.get(reverse("movies:search"), {"q": "space"})
+
+        self.assertEqual(response.context["active_sort"], "relevance")
+        # The exact title match wins; "latest" would list "Space Drama" first.
+        self.assertEqual([movie.title for movie in response.context["movies"]], ["Space", "Space Drama"])
+
+
+class SearchPaginationTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(7):
+            make_movie(f"Movie {index}", rating=f"{index % 3}.0", release_date=f"2020-01-0{index + 1}")
+        make_movie("Undated", rating=None)
+
+    def walk(self, sort, page_size=3):
+        slugs, cursor = [], None
+        while True:
+            params = {"sort": sort, "page_size": page_size}
+            if cursor:
+                params["cursor"] = cursor
+            payload = self.client.get(reverse("movies:search_api"), params).json()
+            slugs.extend(result["slug"] for result in payload["results"])
+            if not payload["has_next"]:
+                return slugs
+            cursor = payload["next_cursor"]
+
+    def test_cursor_walk_matches_full_ordering(self):
+        from .views import SEARCH_SORT_MAPPING
+
+        for sort in SEARCH_SORT_MAPPING:
+            if sort == "relevance":
+                continue
+            with self.subTest(sort=sort):
+                slugs = self.walk(sort)
+                self.assertEqual(slugs, self.walk(sort, page_size=100))
+                self.assertEqual(len(slugs), Movie.objects.count())
+                self.assertEqual(len(set(slugs)), len(slugs))
+
+    def test_cursor_walk_follows_the_sort(self):
+        by_title = list(Movie.objects.order_by("title").values_list("slug", flat=True))
+        self.assertEqual(self.walk("name-asc"), by_title)
+        self.assertEqual(self.walk("name-desc"), by_title[::-1])
+        # Unrated movies sort last whichever way ratings go.
+        ratings = [Movie.objects.get(slug=slug).rating for slug in self.walk("rating-high")]
+        self.assertEqual(ratings, sorted(ratings[:-1], reverse=True) + [None])
+        self.assertEqual(self.walk("latest")[:2], ["movie-6", "movie-5"])
+
+    def test_deep_page_uses_constant_queries_and_no_count(self):
+        first = self.client.get(reverse("movies:search_api"), {"page_size": 2}).json()
+        with self.assertNumQueries(1) as captured:
+            self.client.get(
+                reverse("movies:search_api"), {"page_size": 2, "cursor": first["next_cursor"]}
+            )
+        self.assertFalse(any("COUNT(" in query["sql"] for query in captured.captured_queries))
+
+    def test_cached_window_and_keyset_fallback_agree(self):
+        from unittest import mock
+
+        expected = {}
+        for limit in (0, 4, 240):
+            with mock.patch("movies.views.SEARCH_RESULT_CACHE_SIZE", limit):
+                for sort in ("latest", "rating-low", "name-desc"):
+                    cache.clear()
+                    with self.subTest(limit=limit, sort=sort):
+                        self.assertEqual(self.walk(sort), expected.setdefault(sort, self.walk(sort)))
+
+    def test_tampered_cursor_is_rejected(self):
+        response = self.client.get(reverse("movies:search_api"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_year_is_ignored(self):
+        from django.http import QueryDict
+
+        for year in ("abc", "1990-x", "-", "12345", "２０２０"):
+            with self.subTest(year=year):
+                response = self.client.get(reverse("movies:search_api"), {"year": year, "page_size": 10})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["results"]), Movie.objects.count())
+        self.assertEqual(parse_search_state(QueryDict("year=2019-2021"))["year"], "2019-2021")
+
+    def test_search_page_links_next_page(self):
+        response = self.client.get(reverse("movies:search"))
+        self.assertEqual(len(response.context["movies"]), 8)
+        self.assertIsNone(response.context["next_page_url"])
+
+
+class SearchResultCacheTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.action = Category.objects.create(name="Action")
+        self.drama = Category.objects.create(name="Drama")
+        for index in range(3):
+            movie = make_movie(f"Chase {index}", quality="HD", release_date=f"2021-01-0{index + 1}")
+            movie.categories.add(self.action, self.drama)
+        make_movie("Still Life", quality="SD")
+
+    def titles(self, response):
+        return [movie.title for movie in response.context["movies"]]
+
+    def test_equivalent_filters_are_served_from_cached_ids(self):
+        url = reverse("movies:search")
+        first = self.client.get(url, {"categories": ["drama", "action"], "qualities": "HD"})
+        with self.assertNumQueries(1) as captured:
+            again = self.client.get(url, {"categories": [" Action", "drama", "action"], "qualities": "hd"})
+        self.assertEqual(self.titles(again), ["Chase 2", "Chase 1", "Chase 0"])
+        self.assertEqual(self.titles(again), self.titles(first))
+        self.assertNotIn("DISTINCT", captured.captured_queries[0]["sql"])
+
+    def test_catalogue_changes_invalidate_cached_results(self):
+        url = reverse("movies:search")
+        self.client.get(url, {"categories": "action"})
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = make_movie("Chase 3", release_date="2021-02-01")
+            movie.categories.add(self.action)
+
+        self.assertEqual(self.titles(self.client.get(url, {"categories": "action"}))[0], "Chase 3")
+
+
+class FacetCountTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.action = Category.objects.create(name="Action")
+        self.drama = Category.objects.create(name="Drama")
+        self.english = Language.objects.create(name="English")
+        first = make_movie("First", quality="HD", release_year=2020)
+        first.categories.add(self.action, self.drama)
+        first.languages.add(self.english)
+        second = make_movie("Second", quality="HD", release_year=2021)
+        second.categories.add(self.action)
+        make_movie("Third", quality="SD", release_year=2021)
+
+    def state(self, **params):
+        from django.http import QueryDict
+
+        query = QueryDict(mutable=True)
+        for key, value in params.items():
+            query.setlist(key, value if isinstance(value, list) else [value])
+        return parse_search_state(query)
+
+    def test_counts_for_unfiltered_catalogue(self):
+        facets = facet_counts(self.state())
+
+        self.assertEqual(
+            {item["slug"]: item["count"] for item in facets["categories"]},
+            {"action": 2, "drama": 1},
+        )
+        self.assertEqual({item["value"]: item["count"] for item in facets["qualities"]}["HD"], 2)
+        self.assertEqual(facets["years"], [{"value": 2021, "count": 2}, {"value": 2020, "count": 1}])
+
+    def test_facets_ignore_their_own_filter(self):
+        facets = facet_counts(self.state(categories="drama", year="2020-2021"))
+
+        categories = {item["slug"]: item["count"] for item in facets["categories"]}
+        qualities = {item["value"]: item["count"] for item in facets["qualities"]}
+        self.assertEqual(categories, {"action": 2, "drama": 1})
+        self.assertEqual(qualities, {"SD": 0, "HD": 1, "FHD": 0, "UHD": 0})
+
+    def test_cached_until_catalogue_changes(self):
+        state = self.state(qualities="HD")
+        facet_counts(state)
+        with self.assertNumQueries(0):
+            facet_counts(state)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_movie("Fourth", quality="HD", release_year=1999)
+        years = [item["value"] for item in facet_counts(state)["years"]]
+        self.assertIn(1999, years)
+
+    def test_hidden_movies_and_inactive_categories_are_not_counted(self):
+        Movie.objects.filter(title="Second").update(is_deleted=True)
+        Category.objects.filter(pk=self.drama.pk).update(is_active=False)
+
+        facets = facet_counts(self.state())
+
+        self.assertEqual({item["slug"]: item["count"] for item in facets["categories"]}, {"action": 1})
+        self.assertEqual(facets["years"], [{"value": 2021, "count": 1}, {"value": 2020, "count": 1}])
+        filtered = self.client.get(reverse("movies:search"), {"categories": "drama"})
+        self.assertEqual(len(filtered.context["movies"]), 0)
+
+
+class LiveCatalogueTests(CatalogueTestCase):
+    def test_hidden_and_deleted_movies_are_not_public(self):
+        live = make_movie("Live Show", is_trending=True)
+        hidden = make_movie("Hidden Show", is_trending=True, is_active=False)
+        deleted = make_movie("Deleted Show", is_trending=True, is_deleted=True)
+
+        self.assertEqual(list(Movie.live.all()), [live])
+        home = self.client.get(reverse("movies:home"))
+        self.assertEqual([movie.title for movie in home.context["latest_movies"]], ["Live Show"])
+        search = self.client.get(reverse("movies:search"), {"q": "show"})
+        self.assertEqual([movie.title for movie in search.context["movies"]], ["Live Show"])
+        for movie in (hidden, deleted):
+            with self.subTest(movie.title):
+                self.assertEqual(self.client.get(movie.get_absolute_url()).status_code, 404)
+                self.assertEqual(
+                    self.client.get(reverse("movies:movie_download", args=[movie.slug])).status_code, 404
+                )
+
+
+class HomeCacheTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        make_movie("Cached Hit", is_trending=True)
+        Language.objects.create(name="Bangla")
+
+    def test_steady_state_home_skips_database(self):
+        self.client.get(reverse("movies:home"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("movies:home"))
+        self.assertContains(response, "Cached Hit")
+
+    def test_movie_edit_invalidates_fragments(self):
+        self.client.get(reverse("movies:home"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_movie("Fresh Upload")
+        self.assertContains(self.client.get(reverse("movies:home")), "Fresh Upload")
+
+    def test_language_m2m_change_invalidates_fragments(self):
+        movie = Movie.objects.get()
+        self.client.get(reverse("movies:home"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.languages.add(Language.objects.get())
+        self.assertContains(self.client.get(reverse("movies:home")), "Bangla", count=3)
+
+
+class MovieNameCacheTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.movie = make_movie("Polyglot")
+        self.hindi = Language.objects.create(name="Hindi")
+        self.english = Language.objects.create(name="English")
+
+    def cached_names(self):
+        self.movie.refresh_from_db()
+        return self.movie.language_names()
+
+    def test_forward_and_reverse_m2m_changes_are_mirrored(self):
+        self.movie.languages.add(self.hindi, self.english)
+        self.assertEqual(self.cached_names(), ["English", "Hindi"])
+
+        self.hindi.movies.remove(self.movie)
+        self.assertEqual(self.cached_names(), ["English"])
+
+        self.english.movies.clear()
+        self.assertEqual(self.cached_names(), [])
+
+    def test_rename_and_delete_refresh_movies(self):
+        self.movie.languages.add(self.hindi)
+        self.hindi.name = "Hindustani"
+        self.hindi.save()
+        self.assertEqual(self.cached_names(), ["Hindustani"])
+
+        self.hindi.delete()
+        self.assertEqual(self.cached_names(), [])
+
+    def test_card_listing_is_single_query(self):
+        category = Category.objects.create(name="Thriller")
+        for index in range(5):
+            movie = make_movie(f"Card {index}")
+            movie.languages.add(self.hindi)
+            movie.categories.add(category)
+
+        with self.assertNumQueries(1):
+            rows = [
+                (movie.language_names(), movie.category_names())
+                for movie in Movie.objects.cards()
+            ]
+        self.assertIn((["Hindi"], ["Thriller"]), rows)
+
+
+class RelatedMovieTests(CatalogueTestCase):
+    # Rankings are refreshed once the change commits.
+    def setUp(self):
+        super().setUp()
+        self.action = Category.objects.create(name="Action")
+        self.drama = Category.objects.create(name="Drama")
+        self.english = Language.objects.create(name="English")
+        self.movie = make_movie("Anchor")
+        self.close = make_movie("Close Match")
+        self.loose = make_movie("Loose Match", rating="9.0")
+        self.unrelated = make_movie("Unrelated")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.categories.add(self.action, self.drama)
+            self.movie.languages.add(self.english)
+            self.close.categories.add(self.action, self.drama)
+            self.close.languages.add(self.english)
+            self.loose.categories.add(self.action)
+
+    def related_titles(self, movie):
+        return [entry.related.title for entry in RelatedMovie.objects.filter(movie=movie)]
+
+    def test_neighbours_ranked_by_overlap_then_popularity(self):
+        self.assertEqual(self.related_titles(self.movie), ["Close Match", "Loose Match"])
+
+    def test_incremental_refresh_updates_neighbours(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unrelated.categories.add(self.drama)
+            # Nothing is recomputed inside the saving transaction.
+            self.assertNotIn("Unrelated", self.related_titles(self.movie))
+
+        self.assertIn("Unrelated", self.related_titles(self.movie))
+        self.assertIn("Anchor", self.related_titles(self.unrelated))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unrelated.categories.clear()
+        self.assertNotIn("Unrelated", self.related_titles(self.movie))
+
+    @override_settings(RELATED_CASCADE_LIMIT=1)
+    def test_cascade_is_capped(self):
+        from .related import refresh_related_movies
+
+        # Anchor is listed by Close Match and Loose Match; only one of them
+        # is refreshed in cascade.
+        self.assertEqual(refresh_related_movies([self.movie.pk]), 2)
+
+    def test_hiding_a_movie_removes_it_from_rankings(self):
+        self.close.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.close.save()
+        self.assertEqual(self.related_titles(self.movie), ["Loose Match"])
+
+        self.close.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.close.save()
+        self.assertEqual(self.related_titles(self.movie), ["Close Match", "Loose Match"])
+
+    def test_detail_page_reads_precomputed_table(self):
+        response = self.client.get(self.movie.get_absolute_url())
+
+        self.assertEqual(
+            [related.title for related in response.context["related_movies"]],
+            ["Close Match", "Loose Match"],
+        )
+
+
+class PopularityTests(CatalogueTestCase):
+    def test_hits_are_buffered_until_flush(self):
+        from .popularity import counter
+
+        movie = make_movie("Buzzing")
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(movie.get_absolute_url())
+        self.assertTrue(all(query["sql"].startswith("SELECT") for query in captured.captured_queries))
+        self.assertFalse(MoviePopularity.objects.exists())
+
+        self.assertEqual(counter.flush(), 1)
+        self.assertEqual(MoviePopularity.objects.get(movie=movie).views, 1)
+
+    def test_version_never_restarts_after_the_key_is_lost(self):
+        import time
+
+        from .popularity import POPULARITY_VERSION_KEY, get_popularity_version
+
+        cache.delete(POPULARITY_VERSION_KEY)
+        started = int(time.time() * 1000)
+        self.assertGreaterEqual(get_popularity_version(), started)
+
+    def test_recent_hits_outrank_older_ones(self):
+        from datetime import timedelta
+
+        from .popularity import HIT_WEIGHTS, log_add, log_weight
+
+        now = timezone.now()
+        old = log_weight(HIT_WEIGHTS["views"] * 10, now - timedelta(days=30))
+        recent = log_weight(HIT_WEIGHTS["views"], now)
+        self.assertGreater(recent, old)
+        self.assertGreater(log_add(recent, old), recent)
+
+    def test_trending_sort_uses_popularity(self):
+        from .popularity import counter, record_hit
+
+        quiet = make_movie("Quiet", is_trending=True)
+        loud = make_movie("Loud")
+        record_hit(loud.pk, "downloads")
+        counter.flush()
+
+        payload = self.client.get(reverse("movies:search_api"), {"sort": "trending"}).json()
+        self.assertEqual([row["slug"] for row in payload["results"]], [loud.slug, quiet.slug])
+        home = self.client.get(reverse("movies:home"))
+        self.assertEqual(list(home.context["trending_movies"]), [loud, quiet])
+
+
+@override_settings(POPULARITY_BACKGROUND=False)
+class PopularityConcurrencyTests(TransactionTestCase):
+    # Committed rows: each flushing thread uses its own connection, and
+    # foreign keys are only checked when a flush commits.
+    def setUp(self):
+        discard_pending()
+        self.addCleanup(discard_pending)
+
+    def test_concurrent_flushes_keep_every_hit(self):
+        import threading
+        import time
+        from collections import Counter
+
+        from django.db import OperationalError, connections
+
+        from .popularity import PopularityCounter
+
+        movie = make_movie("Contested")
+        errors = []
+
+        def flush_repeatedly():
+            flusher = PopularityCounter()
+            try:
+                for _ in range(20):
+                    # The shared in-memory test database reports contention
+                    # as "table is locked" instead of waiting out a busy
+                    # timeout like a database file does; retry instead.
+                    while True:
+                        try:
+                            flusher.write(Counter({(movie.pk, "views"): 1, (movie.pk, "downloads"): 1}))
+                            break
+                        except OperationalError:
+                            time.sleep(0.001)
+            except Exception as exc:  # noqa: BLE001 - reported below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=flush_repeatedly) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        popularity = MoviePopularity.objects.get(movie=movie)
+        self.assertEqual((popularity.views, popularity.downloads), (80, 80))
+
+
+    def test_hits_for_a_deleted_movie_do_not_drop_the_batch(self):
+        from .popularity import counter, record_hit
+
+        kept, deleted = make_movie("Kept"), make_movie("Deleted")
+        record_hit(kept.pk)
+        record_hit(deleted.pk)
+        deleted.delete()
+
+        self.assertEqual(counter.flush(), 1)
+        self.assertEqual(MoviePopularity.objects.get().movie, kept)
+
+
+class AutocompleteTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        from unittest import mock
+
+        from .autocomplete import PrefixIndex
+
+        self.enterContext(mock.patch("movies.autocomplete.index", PrefixIndex()))
+        self.drama = Category.objects.create(name="Drama")
+        self.knight = make_movie("The Dark Knight")
+        self.night = make_movie("Night Shift", tagline="Knights of the road")
+        self.amelie = make_movie("Amélie", is_trending=True)
+        self.amelie.categories.add(self.drama)
+        make_movie("Knightfall", is_active=False)
+
+    def suggest(self, query, **params):
+        response = self.client.get(reverse("movies:suggest"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result["title"] for result in response.json()["results"]]
+
+    def test_title_matches_rank_before_tagline_and_names(self):
+        MoviePopularity.objects.create(movie=self.night, log_score=5.0)
+        self.assertEqual(self.suggest("kni"), ["The Dark Knight", "Night Shift"])
+        self.assertEqual(self.suggest("dark k"), ["The Dark Knight"])
+        self.assertEqual(self.suggest("AMEL"), ["Amélie"])
+        self.assertEqual(self.suggest("dra"), ["Amélie"])
+        self.assertEqual(self.suggest("n", limit=1), ["Night Shift"])
+
+    def test_keystrokes_do_not_query_the_database(self):
+        self.suggest("nig")
+        with self.assertNumQueries(0):
+            for query in ("n", "ni", "nig", "nigh", "night", "night s"):
+                self.suggest(query)
+
+    def test_saved_movies_are_reindexed_incrementally(self):
+        self.suggest("kni")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.knight.title = "Dark Waters"
+            self.knight.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("dark"), ["Dark Waters"])
+            self.assertEqual(self.suggest("kni"), ["Night Shift"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.night.is_deleted = True
+            self.night.save()
+        self.assertEqual(self.suggest("nig"), [])
+
+
+class CommentPaginationTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.movie = make_movie("Talkative")
+        for index in range(25):
+            Comment.objects.create(movie=self.movie, name=f"Viewer {index}", body="Great", is_approved=index != 0)
+
+    def test_approved_count_is_maintained(self):
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.approved_comment_count, 24)
+        self.movie.comments.filter(name="Viewer 24").delete()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.approved_comment_count, 23)
+
+    def test_detail_renders_first_page_and_load_more_follows_cursor(self):
+        from .views import COMMENTS_PAGE_SIZE
+
+        response = self.client.get(self.movie.get_absolute_url())
+        self.assertEqual(len(response.context["comments"]), COMMENTS_PAGE_SIZE)
+        self.assertEqual(response.context["comments"][0].name, "Viewer 24")
+
+        seen = [comment.name for comment in response.context["comments"]]
+        url = response.context["comments_more_url"]
+        while url:
+            payload = self.client.get(url).json()
+            self.assertEqual(payload["total"], 24)
+            seen += [row["name"] for row in payload["results"]]
+            url = (
+                f"{reverse('movies:movie_comments', kwargs={'slug': self.movie.slug})}?cursor={payload['next_cursor']}"
+                if payload["has_next"]
+                else None
+            )
+        self.assertEqual(len(seen), 24)
+        self.assertEqual(len(set(seen)), 24)
+        self.assertNotIn("Viewer 0", seen)
+
+    def test_cursor_keeps_microseconds_of_shared_millisecond(self):
+        from datetime import timedelta
+
+        from .views import _comments_paginator
+
+        created = timezone.now().replace(microsecond=123000)
+        for offset in range(4):
+            Comment.objects.filter(name=f"Viewer {offset + 1}").update(
+                created_at=created + timedelta(microseconds=offset * 100)
+            )
+        paginator = _comments_paginator(self.movie.pk)
+        paginator.per_page = 1
+        seen, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            seen += [comment.name for comment in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 24)
+        self.assertEqual(len(set(seen)), 24)
+
+    def test_bad_cursor_is_rejected(self):
+        url = reverse("movies:movie_comments", kwargs={"slug": self.movie.slug})
+        self.assertEqual(self.client.get(url, {"cursor": "nope"}).status_code, 400)
+
+
+class QueryPlanTests(CatalogueTestCase):
+    """The hot view queries must be answered from indexes, not scans or temp sorts."""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plan assertions are written against SQLite's EXPLAIN output.")
+        from django.contrib.auth import get_user_model
+
+        from core.models import DownloadHistory, FavoriteMovie
+
+        self.user = get_user_model().objects.create_user("plans", "plans@example.com", "pass12345")
+        self.movie = make_movie("Indexed", quality="HD", release_date="2020-05-01")
+        Comment.objects.create(movie=self.movie, name="Ann", body="Great")
+        DownloadHistory.objects.create(user=self.user, movie=self.movie)
+        FavoriteMovie.objects.create(user=self.user, movie=self.movie)
+        # Plans are checked with statistics, as on a migrated, analyzed
+        # database; without them SQLite prefers scanning any partial index
+        # whose condition the query implies, even for joins ordered elsewhere.
+        filler = Movie.objects.bulk_create(
+            Movie(title=f"Filler {index}", slug=f"filler-{index}", release_year=2019, duration_minutes=90, is_active=index % 10 != 0)
+            for index in range(200)
+        )
+        MoviePopularity.objects.bulk_create(
+            MoviePopularity(movie=movie, log_score=index / 10) for index, movie in enumerate(filler)
+        )
+        RelatedMovie.objects.bulk_create(
+            RelatedMovie(movie=movie, related=filler[index - 1], score=1.0) for index, movie in enumerate(filler)
+        )
+        with connection.cursor() as cursor:
+            for table in ("movies_movie", "movies_moviepopularity", "movies_relatedmovie"):
+                cursor.execute(f"ANALYZE {table}")
+
+    def assert_indexed(self, url, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        selects = [query["sql"] for query in captured.captured_queries if query["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        with connection.cursor() as cursor:
+            for sql in selects:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[-1] for row in cursor.fetchall()]
+                for step in plan:
+                    self.assertNotIn("TEMP B-TREE", step, f"{sql}\n{plan}")
+                    if step.startswith("SCAN"):
+                        self.assertIn("INDEX", step, f"{sql}\n{plan}")
+
+    def test_home_queries(self):
+        self.assert_indexed(reverse("movies:home"))
+
+    def test_detail_queries(self):
+        self.assert_indexed(self.movie.get_absolute_url())
+
+    def test_search_queries(self):
+        url = reverse("movies:search")
+        for params in ({}, {"year": "2020"}, {"qualities": "HD"}, {"sort": "rating-high"}, {"sort": "name-asc"}):
+            with self.subTest(params=params):
+                self.client.get(url, params)  # warm the facet cache
+                self.assert_indexed(url, params)
+
+    def test_account_list_queries(self):
+        self.client.force_login(self.user)
+        self.assert_indexed(reverse("core:download_history"))
+        self.assert_indexed(reverse("core:favorites"))
+
+
+class ConditionalGetTests(CatalogueTestCase):
+    def test_unchanged_pages_return_304(self):
+        movie = make_movie("Cached Page")
+        for url in (reverse("movies:home"), movie.get_absolute_url(), reverse("movies:movie_download", args=[movie.slug])):
+            with self.subTest(url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(1 if url != reverse("movies:home") else 0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_changes_with_catalogue_and_still_counts_views(self):
+        from .cache import bump_catalogue_version
+        from .popularity import counter
+
+        movie = make_movie("Evolving")
+        etag = self.client.get(movie.get_absolute_url())["ETag"]
+        self.assertEqual(self.client.get(movie.get_absolute_url(), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        counter.flush()
+        self.assertEqual(MoviePopularity.objects.get(movie=movie).views, 2)
+
+        bump_catalogue_version()
+        response = self.client.get(movie.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_download_etag_changes_when_a_category_is_renamed(self):
+        category = Category.objects.create(name="Thriller")
+        movie = make_movie("Renamed")
+        movie.categories.add(category)
+        url = reverse("movies:movie_download", args=[movie.slug])
+        etag = self.client.get(url)["ETag"]
+
+        category.name = "Suspense"
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Suspense")
+
+    def test_download_page_sends_no_last_modified(self):
+        from django.utils.http import http_date
+
+        movie = make_movie("Dated")
+        url = reverse("movies:movie_download", args=[movie.slug])
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        self.assertIn("ETag", response)
+        # updated_at does not change when a category is renamed.
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(movie.updated_at.timestamp() + 60))
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncViewTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        from .benchmarks import serving_async_views
+
+        self.enterContext(serving_async_views())
+        self.category = Category.objects.create(name="Drama")
+        self.movie = make_movie("Async Harbour", is_trending=True)
+        self.movie.categories.add(self.category)
+        self.other = make_movie("Async Lighthouse")
+        self.other.categories.add(self.category)
+
+    async def test_pages_render_the_same_context_as_sync_views(self):
+        from asgiref.sync import iscoroutinefunction, sync_to_async
+
+        from .benchmarks import serving_async_views
+
+        pages = {
+            reverse("movies:home"): ("trending_movies", "latest_movies", "languages"),
+            self.movie.get_absolute_url(): ("movie", "related_movies", "comments"),
+            reverse("movies:movie_download", args=[self.movie.slug]): ("movie", "quality_options", "server_options"),
+            reverse("movies:search") + "?q=async": ("movies", "categories", "year_facets"),
+            reverse("payments:plan"): ("plans", "faqs"),
+        }
+        for url, keys in pages.items():
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+                await sync_to_async(cache.clear)()
+
+                def sync_get(url=url):
+                    with serving_async_views(False):
+                        return self.client.get(url)
+
+                expected = await sync_to_async(sync_get)()
+                for key in keys:
+                    self.assertEqual(_listed(response.context[key]), _listed(expected.context[key]), key)
+
+    async def test_unchanged_home_returns_304(self):
+        response = await self.async_client.get(reverse("movies:home"))
+        response = await self.async_client.get(reverse("movies:home"), headers={"if-none-match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_comment_post_is_handled(self):
+        response = await self.async_client.post(self.movie.get_absolute_url(), {"name": "Ada", "body": "Async hello"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(await Comment.objects.filter(movie=self.movie, body="Async hello").aexists())
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+    async def test_instrumentation_counts_async_queries(self):
+        response = await self.async_client.get(reverse("movies:search"))
+        queries = int(response["Server-Timing"].split('desc="')[1].split()[0])
+        self.assertGreater(queries, 0)
+
+
+def _listed(value):
+    # Querysets, pages and lists compare by their items.
+    if hasattr(value, "object_list"):
+        value = value.object_list
+    if isinstance(value, (list, tuple, QuerySet)):
+        return list(value)
+    return value
+
+
+class ImportMoviesTests(CatalogueTestCase):
+    def setUp(self):
+        import tempfile
+
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        Category.objects.create(name="Action")
+        Language.objects.create(name="English")
+
+    def write(self, name, content):
+        import os
+
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def jsonl(self, rows):
+        import json
+
+        return self.write("catalogue.jsonl", "".join(json.dumps(row) + "\n" for row in rows))
+
+    def test_jsonl_import_fills_derived_data(self):
+        path = self.jsonl(
+            [
+                {"title": "Storm Rider", "release_year": 2020, "duration_minutes": 100,
+                 "categories": ["Action"], "languages": ["english"], "rating": "7.5"},
+                {"title": "Storm Rider", "release_year": 2021, "duration_minutes": 95},
+                {"title": "No Year", "duration_minutes": 90},
+            ]
+        )
+        call_command("import_movies", path, "--batch-size", "2", stdout=StringIO(), stderr=StringIO())
+
+        first, second = Movie.objects.order_by("pk")
+        self.assertEqual((first.slug, second.slug), ("storm-rider", "storm-rider-2"))
+        self.assertEqual(first.category_names(), ["Action"])
+        self.assertEqual(first.language_names(), ["English"])
+        self.assertEqual(list(first.categories.values_list("name", flat=True)), ["Action"])
+        self.assertEqual(
+            set(search.search_movies(Movie.objects.all(), "storm").values_list("pk", flat=True)),
+            {first.pk, second.pk},
+        )
+        self.assertFalse(Movie.objects.filter(title="No Year").exists())
+
+    def test_csv_rows_with_existing_slug_update_in_place(self):
+        from datetime import timedelta
+
+        movie = make_movie("Old Title", slug="kept-slug", tagline="keep me")
+        Movie.objects.filter(pk=movie.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        movie.refresh_from_db()
+        path = self.write(
+            "catalogue.csv",
+            "slug,title,release_year,duration_minutes,categories,release_date\n"
+            "kept-slug,New Title,2019,110,Action|Unknown,2019-05-01\n",
+        )
+        stderr = StringIO()
+        call_command("import_movies", path, stdout=StringIO(), stderr=stderr)
+
+        movie.refresh_from_db()
+        self.assertEqual((movie.title, movie.tagline, str(movie.release_date)), ("New Title", "keep me", "2019-05-01"))
+        self.assertGreater(movie.updated_at, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(movie.category_names(), ["Action"])
+        self.assertEqual(Movie.objects.count(), 1)
+        self.assertIn("unknown", stderr.getvalue())
+
+    def test_repeated_slug_in_a_batch_keeps_the_last_record(self):
+        movie = make_movie("Old Title", slug="kept-slug")
+        path = self.jsonl(
+            [
+                {"slug": "kept-slug", "title": "First Edit", "release_year": 2019, "duration_minutes": 90,
+                 "categories": ["Action"]},
+                {"slug": "kept-slug", "title": "Second Edit", "release_year": 2019, "duration_minutes": 90,
+                 "categories": ["Action"], "languages": ["English"]},
+                {"slug": "new-slug", "title": "New", "release_year": 2020, "duration_minutes": 90},
+                {"slug": "new-slug", "title": "Newer", "release_year": 2020, "duration_minutes": 90},
+            ]
+        )
+        call_command("import_movies", path, stdout=StringIO(), stderr=StringIO())
+
+        movie.refresh_from_db()
+        self.assertEqual(movie.title, "Second Edit")
+        self.assertEqual(list(movie.categories.values_list("name", flat=True)), ["Action"])
+        self.assertEqual(movie.language_names(), ["English"])
+        self.assertEqual(list(Movie.objects.exclude(pk=movie.pk).values_list("slug", "title")), [("new-slug", "Newer")])
+
+    def test_import_refreshes_only_the_imported_rankings(self):
+        from unittest import mock
+
+        from . import importer
+
+        action = Category.objects.get(name="Action")
+        existing = make_movie("Existing")
+        existing.categories.add(action)
+        path = self.jsonl(
+            [{"title": "Imported", "release_year": 2020, "duration_minutes": 90, "categories": ["Action"]}]
+        )
+        with mock.patch.object(importer, "rebuild_related_movies") as rebuild:
+            call_command("import_movies", path, stdout=StringIO(), stderr=StringIO())
+
+        rebuild.assert_not_called()
+        imported = Movie.objects.get(title="Imported")
+        self.assertEqual(
+            list(RelatedMovie.objects.filter(movie=imported).values_list("related", flat=True)), [existing.pk]
+        )
+        self.assertEqual(
+            list(RelatedMovie.objects.filter(movie=existing).values_list("related", flat=True)), [imported.pk]
+        )
+
+    def test_resume_continues_after_a_failed_batch(self):
+        from unittest import mock
+
+        from .importer import CatalogueImporter
+
+        rows = [{"title": f"Movie {index}", "release_year": 2000, "duration_minutes": 90} for index in range(5)]
+        path = self.jsonl(rows)
+        original = CatalogueImporter.write_batch
+        calls = []
+
+        def flaky(importer, batch, result):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            return original(importer, batch, result)
+
+        with mock.patch.object(CatalogueImporter, "write_batch", flaky), self.assertRaises(RuntimeError):
+            call_command("import_movies", path, "--batch-size", "2", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Movie.objects.count(), 2)
+
+        call_command("import_movies", path, "--batch-size", "2", "--resume", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            sorted(Movie.objects.values_list("title", flat=True)), [row["title"] for row in rows]
+        )
+
+
+@override_settings(CATALOGUE_EXPORT_TOKEN="partner-token")
+class CatalogueExportTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.action = Category.objects.create(name="Action")
+        self.movie = make_movie("Exported", download_options=[{"label": "HD"}])
+        self.movie.categories.add(self.action)
+        make_movie("Hidden", is_active=False)
+
+    def export(self, **params):
+        import json
+
+        response = self.client.get(reverse("movies:export"), params, HTTP_AUTHORIZATION="Bearer partner-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        return response, [json.loads(line) for line in lines]
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get(reverse("movies:export")).status_code, 403)
+
+    def test_full_export_streams_active_movies(self):
+        with self.assertNumQueries(4):
+            response, records = self.export()
+        self.assertEqual([record["slug"] for record in records], [self.movie.slug])
+        self.assertEqual(records[0]["categories"], [{"slug": "action", "name": "Action"}])
+        self.assertEqual(records[0]["download_options"], [{"label": "HD"}])
+        self.assertTrue(response["X-Export-Until"])
+
+    def test_incremental_export_includes_changes_and_removals(self):
+        response, _ = self.export()
+        until = response["X-Export-Until"]
+        _, records = self.export(since=until)
+        self.assertEqual(records, [])
+
+        Movie.objects.filter(pk=self.movie.pk).update(is_deleted=True, updated_at=timezone.now())
+        added = make_movie("Fresh")
+        _, records = self.export(since=until)
+        self.assertEqual(
+            [(record["slug"], record.get("removed", False)) for record in records],
+            [(self.movie.slug, True), (added.slug, False)],
+        )
+
+    def test_taxonomy_changes_resend_their_movies(self):
+        response, _ = self.export()
+        until = response["X-Export-Until"]
+
+        self.action.name = "Action & Adventure"
+        self.action.save()
+        response, records = self.export(since=until)
+        self.assertEqual(
+            [(record["slug"], record["categories"]) for record in records],
+            [(self.movie.slug, [{"slug": "action", "name": "Action & Adventure"}])],
+        )
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.cached_category_names, ["Action & Adventure"])
+
+        until = response["X-Export-Until"]
+        self.action.is_active = False
+        self.action.save()
+        _, records = self.export(since=until)
+        self.assertEqual([(record["slug"], record["categories"]) for record in records], [(self.movie.slug, [])])
+
+    def test_command_writes_ndjson(self):
+        stdout = StringIO()
+        call_command("export_movies", stdout=stdout, stderr=StringIO())
+        self.assertEqual(len(stdout.getvalue().splitlines()), 1)
+
+
+class BenchmarkSmokeTests(CatalogueTestCase):
+    def test_every_scenario_renders_on_a_tiny_catalogue(self):
+        from .benchmarks import run_benchmarks, seed_catalogue
+
+        handles = seed_catalogue(movies=30, categories=3, languages=2, comments=50, users=5)
+        results = run_benchmarks(handles, iterations=2)
+
+        self.assertEqual({result["status"] for result in results}, {200})
+        for result in results:
+            self.assertEqual(
+                set(result["warm"]),
+                {"queries", "sql_ms_median", "wall_ms_median", "wall_ms_p95", "wall_ms_min", "peak_kib_max", "bytes"},
+            )
+
+
+@override_settings(
+    POPULARITY_BACKGROUND=False,
+    DOWNLOAD_TRACKING_BACKGROUND=False,
+    RELATED_REFRESH_BACKGROUND=False,
+    INSTRUMENTATION_SAMPLE_RATE=0,
+)
+class LoadBenchmarkSmokeTests(TransactionTestCase):
+    # Committed rows: the WSGI run reads them from pool threads, and catalogue
+    # reads outside a transaction may be routed to a (mirrored) replica.
+    databases = "__all__"
+
+    def test_load_benchmark_runs_both_interfaces(self):
+        from .benchmarks import LOAD_SCENARIOS, run_load_benchmark, seed_catalogue
+
+        handles = seed_catalogue(movies=20, categories=2, languages=2, comments=10, users=2)
+        results = run_load_benchmark(handles, concurrency=2, requests=4)
+        discard_pending()
+
+        self.assertEqual([result["name"] for result in results], list(LOAD_SCENARIOS))
+        for result in results:
+            for interface in ("wsgi", "asgi"):
+                self.assertEqual(result[interface]["requests"], 4)
+                self.assertEqual(result[interface]["errors"], 0)
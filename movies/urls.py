@@ -1,12 +1,21 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+# ASGI deployments serve the async-native twins (see CineHub/asgi.py).
+catalogue = async_views if settings.ASYNC_VIEWS else views
 
 app_name = "movies"
 
 urlpatterns = [
-    path("", views.home, name="home"),
-    path("search/", views.movie_search, name="search"),
-    path("movies/<slug:slug>/", views.movie_detail, name="movie_detail"),
-    path("movies/<slug:slug>/download/", views.movie_download, name="movie_download"),
+    path("", catalogue.home, name="home"),
+    path("search/", catalogue.movie_search, name="search"),
+    path("search/api/", catalogue.movie_search_api, name="search_api"),
+    path("search/suggest/", catalogue.movie_suggest, name="suggest"),
+    path("catalogue/export.ndjson", catalogue.movie_export, name="export"),
+    path("movies/<slug:slug>/", catalogue.movie_detail, name="movie_detail"),
+    path("movies/<slug:slug>/comments/", catalogue.movie_comments, name="movie_comments"),
+    path("movies/<slug:slug>/download/", catalogue.movie_download, name="movie_download"),
+    path("movies/<slug:slug>/download/go/", catalogue.movie_download_go, name="movie_download_go"),
 ]
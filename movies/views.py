@@ -1,50 +1,139 @@
 from __future__ import annotations
 
+import hashlib
 from typing import Iterable
 
 from django.contrib import messages
-from django.db.models import Q
+from django.conf import settings
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from django.utils.timesince import timesince
 
+from core.conditional import conditional_response, page_etag, set_validators
+from core.tracking import record_download
+
+from . import autocomplete
+from .cache import HOME_CACHE_TIMEOUT, cached_catalogue, catalogue_key, get_catalogue_version
+from .export import export_window, format_until, iter_ndjson, parse_since
+from .facets import facet_counts
+from .filters import SEARCH_SORT_MAPPING, canonical_state, filter_movies, parse_search_state
 from .forms import CommentForm
-from .models import Category, Language, Movie
+from .models import Comment, Language, Movie
+from .pagination import CachedKeysetPaginator, InvalidCursor, KeysetPage, KeysetPaginator
+from .popularity import get_popularity_version, record_hit
 
 
-def home(request):
-    languages = Language.objects.filter(is_active=True).order_by("name")
-    trending_movies = (
-        Movie.objects.filter(is_trending=True)
-        .prefetch_related("categories", "languages")
-        .order_by("-release_date", "-created_at")[:8]
+def _home_languages():
+    return Language.objects.filter(is_active=True).order_by("name")
+
+
+def _popular_movies(limit: int):
+    return Movie.live.cards().filter(popularity__isnull=False).order_by("-popularity__log_score")[:limit]
+
+
+def _trending_fill(movies: list, limit: int):
+    return (
+        Movie.live.cards()
+        .filter(is_trending=True)
+        .exclude(pk__in=[movie.pk for movie in movies])
+        .order_by("-release_date", "-created_at")[: limit - len(movies)]
     )
-    latest_movies = (
-        Movie.objects.all()
-        .prefetch_related("categories", "languages")
+
+
+def _home_trending_movies(limit: int = 8):
+    # Measured popularity first; editor-flagged titles fill any remaining slots.
+    movies = list(_popular_movies(limit))
+    if len(movies) < limit:
+        movies += _trending_fill(movies, limit)
+    return movies
+
+
+def _home_latest_movies():
+    return (
+        Movie.live.cards()
         .order_by("-release_date", "-created_at")[:12]
     )
 
-    context = {
+
+def home(request):
+    catalogue_version = get_catalogue_version()
+    popularity_version = get_popularity_version()
+    etag = page_etag(request, "home", catalogue_version, popularity_version)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Blocks load lazily so a fragment-cache hit in index.html never touches them.
+    context = _home_context(
+        catalogue_version,
+        popularity_version,
+        languages=SimpleLazyObject(lambda: cached_catalogue("home:languages", _home_languages)),
+        trending_movies=SimpleLazyObject(
+            lambda: cached_catalogue(f"home:trending:{popularity_version}", _home_trending_movies)
+        ),
+        latest_movies=SimpleLazyObject(lambda: cached_catalogue("home:latest", _home_latest_movies)),
+    )
+    return set_validators(request, render(request, "index.html", context), etag)
+
+
+def _home_context(catalogue_version, popularity_version, languages, trending_movies, latest_movies) -> dict:
+    return {
         "active_page": "home",
+        "catalogue_version": catalogue_version,
+        "popularity_version": popularity_version,
+        "home_cache_timeout": HOME_CACHE_TIMEOUT,
         "languages": languages,
         "trending_movies": trending_movies,
         "latest_movies": latest_movies,
     }
-    return render(request, "index.html", context)
 
 
-def movie_detail(request, slug: str):
-    movie = get_object_or_404(
-        Movie.objects.prefetch_related("categories", "comments", "languages"),
-        slug=slug,
-    )
-    related_movies = (
-        Movie.objects.filter(categories__in=movie.categories.all())
-        .exclude(pk=movie.pk)
-        .distinct()
-        .prefetch_related("languages")
-        .order_by("-release_date", "-created_at")[:8]
+COMMENTS_PAGE_SIZE = 10
+
+
+def _comments_paginator(movie_id: int) -> KeysetPaginator:
+    comments = Comment.objects.filter(movie_id=movie_id, is_approved=True)
+    return KeysetPaginator(comments, ("-created_at",), per_page=COMMENTS_PAGE_SIZE)
+
+
+def _comments_page(movie_id: int, cursor: str | None = None) -> KeysetPage:
+    return _comments_paginator(movie_id).get_page(cursor)
+
+
+def _related_movies(movie: Movie):
+    return Movie.live.cards().filter(related_by__movie=movie).order_by("-related_by__score")[:8]
+
+
+def _detail_etag(request, movie: Movie) -> str | None:
+    # Related rankings only move when the catalogue version does.
+    return page_etag(
+        request, "detail", get_catalogue_version(), movie.pk, movie.updated_at, movie.approved_comment_count
     )
-    comments = movie.comments.filter(is_approved=True)
+
+
+def _detail_context(movie: Movie, related_movies, comments_page: KeysetPage, comment_form) -> dict:
+    return {
+        "active_page": "details",
+        "movie": movie,
+        "related_movies": related_movies,
+        "comments": comments_page.object_list,
+        "comments_page": comments_page,
+        "comments_more_url": (
+            f"{reverse('movies:movie_comments', kwargs={'slug': movie.slug})}"
+            f"?cursor={comments_page.next_cursor}"
+            if comments_page.has_next
+            else None
+        ),
+        "comment_form": comment_form,
+    }
+
+
+def movie_detail(request, slug: str):
+    movie = get_object_or_404(Movie.live, slug=slug)
+    etag = _detail_etag(request, movie)
 
     if request.method == "POST":
         comment_form = CommentForm(request.POST)
@@ -57,88 +146,187 @@ def movie_detail(request, slug: str):
         messages.error(request, "Please correct the errors below.")
     else:
         comment_form = CommentForm()
+        record_hit(movie.pk, "views")
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
 
-    context = {
-        "active_page": "details",
-        "movie": movie,
-        "related_movies": related_movies,
-        "comments": comments,
-        "comment_form": comment_form,
-    }
-    return render(request, "movie-details.html", context)
+    context = _detail_context(movie, _related_movies(movie), _comments_page(movie.pk), comment_form)
+    return set_validators(request, render(request, "movie-details.html", context), etag)
 
 
-def movie_download(request, slug: str):
-    movie = get_object_or_404(Movie.objects.prefetch_related("languages"), slug=slug)
+def movie_comments(request, slug: str):
+    """JSON "load more" endpoint for approved comments, newest first."""
+    movie = get_object_or_404(Movie.live.only("pk", "slug", "approved_comment_count"), slug=slug)
+    try:
+        page = _comments_page(movie.pk, request.GET.get("cursor"))
+    except InvalidCursor as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    return JsonResponse(
+        {
+            "results": [
+                {
+                    "id": comment.pk,
+                    "name": comment.name,
+                    "body": comment.body,
+                    "created_at": comment.created_at.isoformat(),
+                    "timesince": timesince(comment.created_at),
+                }
+                for comment in page
+            ],
+            "total": movie.approved_comment_count,
+            "has_next": page.has_next,
+            "next_cursor": page.next_cursor,
+        }
+    )
+
 
-    context = {
+QUALITY_KEYWORDS = (
+    ("UHD", ("4k", "2160", "uhd")),
+    ("FHD", ("1080", "full hd", "fhd")),
+    ("HD", ("720", "hd")),
+    ("SD", ("480", "360", "sd")),
+)
+
+
+def _quality_code(option: dict) -> str:
+    """Map a free-form download option onto ``DownloadHistory.QUALITY_CHOICES``."""
+    text = f"{option.get('quality', '')} {option.get('label', '')} {option.get('resolution', '')}".lower()
+    for code, keywords in QUALITY_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return code
+    return ""
+
+
+def _download_etag(request, movie: Movie) -> str | None:
+    # Category and language names are rendered too; renaming one bumps only
+    # the catalogue version. No Last-Modified: updated_at alone cannot see that.
+    return page_etag(request, "download", get_catalogue_version(), movie.pk, movie.updated_at)
+
+
+def _download_context(movie: Movie) -> dict:
+    go_url = reverse("movies:movie_download_go", kwargs={"slug": movie.slug})
+    return {
         "active_page": "download",
         "movie": movie,
-        "quality_options": movie.get_download_options(),
-        "server_options": movie.get_server_options(),
+        "quality_options": [
+            {**option, "tracking_url": f"{go_url}?quality={index}"}
+            for index, option in enumerate(movie.get_download_options())
+        ],
+        "server_options": [
+            {**option, "tracking_url": f"{go_url}?server={index}"}
+            for index, option in enumerate(movie.get_server_options())
+        ],
     }
-    return render(request, "download.html", context)
 
 
-def movie_search(request):
-    movies = Movie.objects.all().prefetch_related("categories", "languages")
-    query = request.GET.get("q", "").strip()
-    if query:
-        movies = movies.filter(
-            Q(title__icontains=query)
-            | Q(description__icontains=query)
-            | Q(tagline__icontains=query)
-        )
-
-    category_slugs = request.GET.getlist("categories")
-    if category_slugs:
-        movies = movies.filter(categories__slug__in=category_slugs).distinct()
-
-    language_slugs = request.GET.getlist("languages")
-    if language_slugs:
-        movies = movies.filter(languages__slug__in=language_slugs).distinct()
-
-    active_year = request.GET.get("year", "").strip()
-    if active_year:
-        if "-" in active_year:
-            start_year, end_year = (int(value) for value in active_year.split("-", 1))
-            movies = movies.filter(release_year__gte=start_year, release_year__lte=end_year)
-        else:
-            movies = movies.filter(release_year=int(active_year))
-
-    active_qualities = request.GET.getlist("qualities")
-    if active_qualities:
-        movies = movies.filter(quality__in=active_qualities)
-
-    active_sort = request.GET.get("sort", "latest")
-    sort_mapping = {
-        "latest": ("-release_date", "-created_at"),
-        "trending": ("-is_trending", "-release_date"),
-        "rating-high": ("-rating", "-release_date"),
-        "rating-low": ("rating", "-release_date"),
-        "name-asc": ("title",),
-        "name-desc": ("-title",),
-    }
-    order_by_fields: Iterable[str] = sort_mapping.get(active_sort, ("-release_date", "-created_at"))
-    movies = movies.order_by(*order_by_fields)
-
-    categories = Category.objects.all()
-    available_languages = Language.objects.all()
-    quality_choices = Movie.QUALITY_CHOICES
-    year_choices = sorted(
-        set(Movie.objects.values_list("release_year", flat=True)),
-        reverse=True,
+def movie_download(request, slug: str):
+    movie = get_object_or_404(Movie.live, slug=slug)
+    etag = _download_etag(request, movie)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    response = render(request, "download.html", _download_context(movie))
+    return set_validators(request, response, etag)
+
+
+def _option_at(options: list[dict], index: str | None) -> dict | None:
+    try:
+        return options[int(index)]
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def movie_download_go(request, slug: str):
+    """Record the chosen download option and redirect to its link."""
+    movie = get_object_or_404(Movie.live, slug=slug)
+    quality = _option_at(movie.get_download_options(), request.GET.get("quality"))
+    server = _option_at(movie.get_server_options(), request.GET.get("server"))
+    if quality is None and server is None:
+        return redirect("movies:movie_download", slug=movie.slug)
+
+    record_hit(movie.pk, "downloads")
+    record_download(
+        request.user,
+        movie,
+        quality=_quality_code(quality) if quality else "",
+        server=server.get("name", "") if server else "",
+        file_size=quality.get("file_size", "") if quality else "",
+    )
+    target = (quality or {}).get("download_url") or (server or {}).get("url")
+    return redirect(target or movie.get_download_url())
+
+
+SEARCH_PAGE_SIZE = 24
+SEARCH_API_MAX_PAGE_SIZE = 100
+
+SEARCH_CACHE_TIMEOUT = getattr(settings, "SEARCH_CACHE_TIMEOUT", 60 * 60)
+SEARCH_RESULT_CACHE_SIZE = getattr(settings, "SEARCH_RESULT_CACHE_SIZE", 240)
+
+
+def _search_cache_key(state: dict) -> str:
+    # Filters are canonicalised (trimmed, lower-cased, sorted) so equivalent
+    # query strings share one entry; "trending" also moves with popularity.
+    canonical = (canonical_state(state), state["sort"])
+    if state["sort"] == "trending":
+        canonical += (get_popularity_version(),)
+    digest = hashlib.md5(repr(canonical).encode("utf-8")).hexdigest()
+    return catalogue_key("search", digest)
+
+
+def _search_paginator(state: dict, per_page: int) -> KeysetPaginator:
+    order_by_fields: Iterable[str] = SEARCH_SORT_MAPPING[state["sort"]]
+    movies = filter_movies(Movie.live.cards(), state)
+    if state["sort"] == "trending":
+        movies = movies.with_popularity()
+    return CachedKeysetPaginator(
+        movies,
+        order_by_fields,
+        per_page=per_page,
+        hydrate=Movie.live.cards(),
+        cache_key=_search_cache_key(state),
+        limit=SEARCH_RESULT_CACHE_SIZE,
+        timeout=SEARCH_CACHE_TIMEOUT,
     )
 
-    context = {
+
+def _search_page(state: dict, cursor: str | None, per_page: int) -> KeysetPage:
+    return _search_paginator(state, per_page).get_page(cursor)
+
+
+def movie_search(request):
+    state = parse_search_state(request.GET)
+    try:
+        page = _search_page(state, request.GET.get("cursor"), SEARCH_PAGE_SIZE)
+    except InvalidCursor:
+        page = _search_page(state, None, SEARCH_PAGE_SIZE)
+
+    context = _search_context(request, state, page, facet_counts(state))
+    return render(request, "search.html", context)
+
+
+def _search_context(request, state: dict, page: KeysetPage, facets: dict) -> dict:
+    next_page_url = None
+    if page.has_next:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        next_page_url = f"{reverse('movies:search')}?{params.urlencode()}"
+
+    query = state["query"]
+    return {
         "active_page": "search",
         "query": query,
-        "movies": movies,
-        "categories": categories,
-        "languages": available_languages,
-        "quality_choices": quality_choices,
-        "year_choices": year_choices,
+        "movies": page.object_list,
+        "page": page,
+        "next_page_url": next_page_url,
+        "is_paginated": bool(request.GET.get("cursor")) or page.has_next,
+        "categories": facets["categories"],
+        "languages": facets["languages"],
+        "quality_facets": facets["qualities"],
+        "year_facets": facets["years"],
         "sort_options": [
+            *([("relevance", "Relevance")] if query else []),
             ("latest", "Latest"),
             ("trending", "Trending"),
             ("rating-high", "Rating (High to Low)"),
@@ -146,10 +334,77 @@ def movie_search(request):
             ("name-asc", "Name (A-Z)"),
             ("name-desc", "Name (Z-A)"),
         ],
-        "active_categories": category_slugs,
-        "active_languages": language_slugs,
-        "active_qualities": active_qualities,
-        "active_year": active_year,
-        "active_sort": active_sort,
+        "active_categories": state["categories"],
+        "active_languages": state["languages"],
+        "active_qualities": state["qualities"],
+        "active_year": state["year"],
+        "active_sort": state["sort"],
     }
-    return render(request, "search.html", context)
+
+
+def movie_search_api(request):
+    state = parse_search_state(request.GET)
+    try:
+        per_page = int(request.GET.get("page_size", SEARCH_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "page_size must be an integer."}, status=400)
+    per_page = max(1, min(per_page, SEARCH_API_MAX_PAGE_SIZE))
+
+    try:
+        page = _search_page(state, request.GET.get("cursor"), per_page)
+    except InvalidCursor as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    results = [
+        {
+            "id": movie.pk,
+            "title": movie.title,
+            "slug": movie.slug,
+            "url": movie.get_absolute_url(),
+            "poster_url": movie.poster_url,
+            "release_year": movie.release_year,
+            "rating": str(movie.rating) if movie.rating is not None else None,
+            "quality": movie.quality,
+            "languages": movie.language_names(),
+            "categories": movie.category_names(),
+        }
+        for movie in page
+    ]
+    return JsonResponse(
+        {
+            "results": results,
+            "sort": state["sort"],
+            "has_next": page.has_next,
+            "next_cursor": page.next_cursor,
+        }
+    )
+
+
+def movie_suggest(request):
+    """Typeahead for the search box, answered from the in-process prefix index."""
+    try:
+        limit = int(request.GET.get("limit", autocomplete.max_suggestions()))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+    query = request.GET.get("q", "")[:100]
+    suggestions = autocomplete.index.suggest(query, max(1, limit))
+    response = JsonResponse({"query": query, "results": [suggestion.as_json() for suggestion in suggestions]})
+    response["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+def movie_export(request):
+    """Stream the catalogue as NDJSON; ``?since=<X-Export-Until>`` for increments."""
+    token = getattr(settings, "CATALOGUE_EXPORT_TOKEN", "")
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not (token and constant_time_compare(supplied, token)) and not request.user.is_staff:
+        return HttpResponseForbidden()
+    try:
+        window = export_window(parse_since(request.GET.get("since")))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    response = StreamingHttpResponse(iter_ndjson(window), content_type="application/x-ndjson")
+    response["X-Export-Until"] = format_until(window)
+    response["Cache-Control"] = "no-store"
+    return response
@@ -0,0 +1,102 @@
+"""Cache-aside storage for the active plans, their features and the FAQs.
+
+Plans only change when an admin edits them, yet the pricing page, the
+account pages and two forms all read them on every request. The data is
+kept at two levels: a process-local copy for the fast path and a shared
+cache entry so a fresh worker does not hit the database. Both are keyed by
+``PLANS_VERSION_KEY``, which ``payments.signals`` bumps whenever a ``Plan``,
+``PlanFeature``, ``PlanFeatureAssignment`` or FAQ changes; stale copies are
+simply never read again. The version itself is read from the shared cache on
+every call, so an edit saved by one worker is picked up by all of them.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from core.replicas import reading_primary
+
+PLANS_VERSION_KEY = "payments:plans-version"
+PLANS_CACHE_TIMEOUT = getattr(settings, "PLANS_CACHE_TIMEOUT", 60 * 60)
+
+
+@dataclass(frozen=True)
+class PlanCatalogue:
+    version: int
+    plans: tuple
+    faqs: tuple
+
+    def get_plan(self, pk):
+        for plan in self.plans:
+            if str(plan.pk) == str(pk):
+                return plan
+        return None
+
+
+# Replaced wholesale, never mutated, so readers need no lock.
+_local: PlanCatalogue | None = None
+
+
+def get_plans_version() -> int:
+    version = cache.get(PLANS_VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(PLANS_VERSION_KEY, version, timeout=None):
+            version = cache.get(PLANS_VERSION_KEY, version)
+    return version
+
+
+def bump_plans_version() -> None:
+    try:
+        cache.incr(PLANS_VERSION_KEY)
+    except ValueError:
+        get_plans_version()
+
+
+def load_plan_catalogue(version: int) -> PlanCatalogue:
+    from .models import FrequentlyQuestionAndAnswer, Plan, PlanFeatureAssignment
+
+    plans = (
+        Plan.objects.filter(is_active=True)
+        .prefetch_related(
+            Prefetch(
+                "feature_assignments",
+                queryset=PlanFeatureAssignment.objects.select_related("feature"),
+            )
+        )
+        .order_by("display_order", "price")
+    )
+    return PlanCatalogue(version, tuple(plans), tuple(FrequentlyQuestionAndAnswer.objects.all()))
+
+
+def get_plan_catalogue() -> PlanCatalogue:
+    """Return the active plans and FAQs, loading them at most once per version."""
+    global _local
+
+    version = get_plans_version()
+    local = _local
+    if local is not None and local.version == version:
+        return local
+
+    key = f"payments:{version}:plans"
+    catalogue = cache.get(key)
+    if catalogue is None:
+        with reading_primary():
+            catalogue = load_plan_catalogue(version)
+        cache.set(key, catalogue, PLANS_CACHE_TIMEOUT)
+    _local = catalogue
+    return catalogue
+
+
+def active_plans() -> tuple:
+    return get_plan_catalogue().plans
+
+
+def clear_local_cache() -> None:
+    global _local
+
+    _local = None
@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_plans_version
+from .models import FrequentlyQuestionAndAnswer, Plan, PlanFeature, PlanFeatureAssignment
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+@receiver(post_save, sender=PlanFeature)
+@receiver(post_delete, sender=PlanFeature)
+@receiver(post_save, sender=PlanFeatureAssignment)
+@receiver(post_delete, sender=PlanFeatureAssignment)
+@receiver(post_save, sender=FrequentlyQuestionAndAnswer)
+@receiver(post_delete, sender=FrequentlyQuestionAndAnswer)
+def invalidate_plans_on_change(sender, **kwargs):
+    transaction.on_commit(bump_plans_version)
+
+
+@receiver(m2m_changed, sender=Plan.features.through)
+def invalidate_plans_on_features_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(bump_plans_version)
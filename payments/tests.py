@@ -1,3 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from .cache import clear_local_cache, get_plan_catalogue
+from .models import FrequentlyQuestionAndAnswer, Plan, PlanFeature, PlanFeatureAssignment
+
+
+class PlanCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.addCleanup(clear_local_cache)
+        self.feature = PlanFeature.objects.create(name="4K streaming")
+        self.plan = Plan.objects.create(title="Premium", price="14.99")
+        PlanFeatureAssignment.objects.create(plan=self.plan, feature=self.feature)
+        FrequentlyQuestionAndAnswer.objects.create(question="Can I cancel?", answer="Any time.")
+
+    def test_pricing_page_is_served_from_cache(self):
+        url = reverse("payments:plan")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual([plan.title for plan in response.context["plans"]], ["Premium"])
+        self.assertEqual(len(response.context["faqs"]), 1)
+
+    def test_shared_cache_survives_a_cold_process(self):
+        get_plan_catalogue()
+        clear_local_cache()
+        with self.assertNumQueries(0):
+            catalogue = get_plan_catalogue()
+        plan = catalogue.plans[0]
+        with self.assertNumQueries(0):
+            self.assertEqual([row.feature.name for row in plan.feature_assignments.all()], ["4K streaming"])
+
+    def test_edits_invalidate_the_catalogue(self):
+        get_plan_catalogue()
+        with self.captureOnCommitCallbacks(execute=True):
+            Plan.objects.create(title="Basic", price="4.99")
+        self.assertEqual([plan.title for plan in get_plan_catalogue().plans], ["Basic", "Premium"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.feature.name = "8K streaming"
+            self.feature.save()
+        plan = get_plan_catalogue().get_plan(self.plan.pk)
+        self.assertEqual(plan.feature_assignments.all()[0].feature.name, "8K streaming")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.features.clear()
+        self.assertEqual(list(get_plan_catalogue().get_plan(self.plan.pk).feature_assignments.all()), [])
+
+    def test_local_copy_follows_a_bump_from_another_worker(self):
+        from .cache import bump_plans_version
+
+        get_plan_catalogue()
+        # Another worker saved the plan: its signal bumped the shared version,
+        # and this process's local copy was never cleared.
+        Plan.objects.filter(pk=self.plan.pk).update(title="Premium Plus")
+        bump_plans_version()
+        self.assertEqual([plan.title for plan in get_plan_catalogue().plans], ["Premium Plus"])
+
+    def test_plan_selection_validates_from_cache(self):
+        from core.forms import PlanSelectionForm
+
+        get_plan_catalogue()
+        with self.assertNumQueries(0):
+            form = PlanSelectionForm({"plan": str(self.plan.pk)})
+            self.assertTrue(form.is_valid())
+            self.assertIn(f'value="{self.plan.pk}"', str(form["plan"]))
+        self.assertEqual(form.cleaned_data["plan"], self.plan)
+        self.assertFalse(PlanSelectionForm({"plan": "999"}).is_valid())
+
+    def test_inactive_plans_are_not_offered(self):
+        user = get_user_model().objects.create_user("member", "member@example.com", "pass12345")
+        with self.captureOnCommitCallbacks(execute=True):
+            Plan.objects.create(title="Legacy", price="1.00", is_active=False)
+        self.client.force_login(user)
+        response = self.client.get(reverse("core:subscription"))
+        self.assertEqual([plan.title for plan in response.context["plans"]], ["Premium"])
+
+    def test_pricing_page_answers_conditional_requests(self):
+        url = reverse("payments:plan")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Plan.objects.create(title="Basic", price="4.99")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import SubscriptionView
+from .views import AsyncSubscriptionView, SubscriptionView
+
+PricingView = AsyncSubscriptionView if settings.ASYNC_VIEWS else SubscriptionView
 
 app_name = "payments"
 
 urlpatterns = [
-    path("plan/", SubscriptionView.as_view(), name="plan"),
+    path("plan/", PricingView.as_view(), name="plan"),
 ]
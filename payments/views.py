@@ -1,30 +1,48 @@
-from django.db.models import Prefetch
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+from django.views import View
 from django.views.generic import TemplateView
 
-from .models import FrequentlyQuestionAndAnswer, Plan, PlanFeatureAssignment
+from core.conditional import conditional_response, page_etag, set_validators
+
+from .cache import get_plan_catalogue, get_plans_version
+
+
+def _pricing_context(catalogue) -> dict:
+    return {
+        "plans": catalogue.plans,
+        "faqs": catalogue.faqs,
+        "active_page": "plan",
+    }
 
 
 class SubscriptionView(TemplateView):
     template_name = "payments/subscription.html"
 
+    def get(self, request, *args, **kwargs):
+        etag = page_etag(request, "plans", get_plans_version())
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(request, super().get(request, *args, **kwargs), etag)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        plans = (
-            Plan.objects.filter(is_active=True)
-            .prefetch_related(
-                Prefetch(
-                    "feature_assignments",
-                    queryset=PlanFeatureAssignment.objects.select_related("feature"),
-                )
-            )
-            .order_by("display_order", "price")
-        )
-        faqs = FrequentlyQuestionAndAnswer.objects.all()
-        context.update(
-            {
-                "plans": plans,
-                "faqs": faqs,
-                "active_page": "plan",
-            }
-        )
+        context.update(_pricing_context(get_plan_catalogue()))
         return context
+
+
+class AsyncSubscriptionView(View):
+    """Async twin of :class:`SubscriptionView`, routed under ASGI."""
+
+    template_name = SubscriptionView.template_name
+
+    async def get(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        etag = page_etag(request, "plans", get_plans_version())
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        catalogue = await sync_to_async(get_plan_catalogue)()
+        response = render(request, self.template_name, _pricing_context(catalogue))
+        return set_validators(request, response, etag)